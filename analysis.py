@@ -0,0 +1,264 @@
+import time
+import logging
+import tkinter as tk
+from tkinter import ttk
+
+import numpy as np
+
+
+class RunningStats:
+    # Mínimo, máximo, média, desvio padrão e RMS por canal, desde o último reset.
+    # Cada bloco vira estatísticas parciais (NumPy) combinadas às acumuladas pela
+    # fórmula de Chan/Welford: custo O(1) por amostra e nada guardado além dos
+    # acumuladores, sem o cancelamento numérico de somar x e x² direto
+    def __init__(self, channels=1):
+        self.reset(channels)
+
+    def reset(self, channels=None):
+        channels = getattr(self, 'channels', 1) if channels is None else max(int(channels), 1)
+        self.channels = channels
+        self.count = np.zeros(channels, dtype=np.int64)
+        self.mean = np.zeros(channels)
+        self.m2 = np.zeros(channels)  # soma dos quadrados dos desvios
+        self.square_mean = np.zeros(channels)  # média de x², para o RMS
+        self.minimum = np.full(channels, np.inf)
+        self.maximum = np.full(channels, -np.inf)
+
+    def grow(self, channels):
+        extra = channels - self.channels
+        self.count = np.concatenate([self.count, np.zeros(extra, dtype=np.int64)])
+        self.mean = np.concatenate([self.mean, np.zeros(extra)])
+        self.m2 = np.concatenate([self.m2, np.zeros(extra)])
+        self.square_mean = np.concatenate([self.square_mean, np.zeros(extra)])
+        self.minimum = np.concatenate([self.minimum, np.full(extra, np.inf)])
+        self.maximum = np.concatenate([self.maximum, np.full(extra, -np.inf)])
+        self.channels = channels
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if values.ndim == 1:
+            values = values.reshape(-1, 1)
+        if not len(values):
+            return
+        if values.shape[1] > self.channels:
+            self.grow(values.shape[1])
+        width = values.shape[1]
+        valid = np.isfinite(values)
+        n = valid.sum(axis=0)
+        if not n.any():
+            return
+        # Estatísticas do bloco, ignorando campos vazios (NaN)
+        filled = np.where(valid, values, 0.0)
+        safe_n = np.maximum(n, 1)
+        batch_mean = filled.sum(axis=0) / safe_n
+        deviation = np.where(valid, values - batch_mean, 0.0)
+        batch_m2 = (deviation * deviation).sum(axis=0)
+        batch_square = (filled * filled).sum(axis=0) / safe_n
+
+        count = self.count[:width]
+        total = count + n
+        safe_total = np.maximum(total, 1)
+        delta = batch_mean - self.mean[:width]
+        self.mean[:width] += delta * n / safe_total
+        self.m2[:width] += batch_m2 + delta * delta * count * n / safe_total
+        self.square_mean[:width] += (batch_square - self.square_mean[:width]) * n / safe_total
+        self.count[:width] = total
+        self.minimum[:width] = np.minimum(self.minimum[:width], np.where(valid, values, np.inf).min(axis=0))
+        self.maximum[:width] = np.maximum(self.maximum[:width], np.where(valid, values, -np.inf).max(axis=0))
+
+    def std(self):
+        # Desvio padrão amostral (n - 1)
+        return np.sqrt(self.m2 / np.maximum(self.count - 1, 1))
+
+    def rms(self):
+        return np.sqrt(self.square_mean)
+
+    def summary(self):
+        return {
+            'count': self.count.tolist(),
+            'min': self.minimum.tolist(),
+            'max': self.maximum.tolist(),
+            'mean': self.mean.tolist(),
+            'std': self.std().tolist(),
+            'rms': self.rms().tolist()
+        }
+
+
+class RateEstimator:
+    # Amostras por segundo, medidas em janelas de 'period' segundos pelo
+    # instante de chegada dos blocos (a taxa real do sinal não é conhecida)
+    def __init__(self, period=1.0, smoothing=0.5):
+        self.period = period
+        self.smoothing = smoothing
+        self.rate = None
+        self.window_start = None
+        self.window_count = 0
+
+    def update(self, count, timestamp):
+        if self.window_start is None:
+            self.window_start = timestamp
+            return
+        self.window_count += count
+        elapsed = timestamp - self.window_start
+        if elapsed >= self.period:
+            rate = self.window_count / elapsed
+            self.rate = rate if self.rate is None else self.rate + self.smoothing * (rate - self.rate)
+            self.window_start = timestamp
+            self.window_count = 0
+
+    def reset(self):
+        self.rate = None
+        self.window_start = None
+        self.window_count = 0
+
+
+WINDOWS = {
+    'hann': np.hanning,
+    'hamming': np.hamming,
+    'blackman': np.blackman,
+    'rectangular': np.ones
+}
+
+
+def power_spectrum(values, sample_rate=None, window='hann'):
+    # Densidade espectral de potência unilateral das últimas amostras, uma
+    # coluna por canal. Sem taxa de amostragem, a frequência sai em ciclos/amostra
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        values = values.reshape(-1, 1)
+    n = len(values)
+    rate = sample_rate or 1.0
+    taper = WINDOWS[window](n).reshape(-1, 1)
+    # Remove o nível DC; campos vazios viram zero depois disso
+    with np.errstate(invalid='ignore'):
+        centered = values - np.nanmean(values, axis=0)
+    centered = np.nan_to_num(centered)
+    spectrum = np.fft.rfft(centered * taper, axis=0)
+    psd = (np.abs(spectrum) ** 2) / (rate * (taper ** 2).sum())
+    if n % 2 == 0:
+        psd[1:-1] *= 2
+    else:
+        psd[1:] *= 2
+    frequencies = np.fft.rfftfreq(n, d=1.0 / rate)
+    return frequencies, psd
+
+
+class AnalysisPanel:
+    # Janela de análise da sessão ativa: estatísticas acumuladas por canal e o
+    # espectro das últimas amostras. Roda na thread do Tk, mas só a cada
+    # 'interval' ms e com o intervalo aumentado se o cálculo ficar caro, para não
+    # competir com a recepção e o gráfico
+    def __init__(self, master, get_session, translate, interval=500, size=1024, budget=0.05):
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+        self.master = master
+        self.get_session = get_session
+        self.translate = translate
+        self.base_interval = interval
+        self.interval = interval
+        self.budget = budget  # fração do intervalo que a análise pode ocupar
+        self.size = tk.StringVar(value=str(size))
+        self.window = tk.StringVar(value='hann')
+        self.job = None
+        self.session = None
+
+        columns = ('count', 'min', 'max', 'mean', 'std', 'rms')
+        self.tree = ttk.Treeview(master, columns=columns, height=4)
+        self.tree.heading('#0', text=translate('channel'))
+        self.tree.column('#0', width=100)
+        for column in columns:
+            self.tree.heading(column, text=translate(f'stat_{column}'))
+            self.tree.column(column, width=90, anchor=tk.E)
+        self.tree.pack(padx=5, pady=5, fill=tk.X)
+
+        controls = ttk.Frame(master)
+        controls.pack(padx=5, fill=tk.X)
+        ttk.Label(controls, text=translate('fft_size')).pack(side=tk.LEFT, padx=5)
+        ttk.Combobox(controls, textvariable=self.size, values=['256', '1024', '4096', '16384'], width=7).pack(side=tk.LEFT, padx=5)
+        ttk.Label(controls, text=translate('fft_window')).pack(side=tk.LEFT, padx=5)
+        ttk.Combobox(controls, textvariable=self.window, values=list(WINDOWS), state='readonly', width=11).pack(side=tk.LEFT, padx=5)
+        ttk.Button(controls, text=translate('reset_stats'), command=self.reset).pack(side=tk.LEFT, padx=5)
+        self.rate_label = ttk.Label(controls, text='')
+        self.rate_label.pack(side=tk.RIGHT, padx=5)
+
+        self.fig = Figure(figsize=(6, 3))
+        self.ax = self.fig.add_subplot()
+        self.lines = []
+        self.canvas = FigureCanvasTkAgg(self.fig, master=master)
+        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
+        self.job = master.after(0, self.refresh)
+
+    def reset(self):
+        session = self.get_session()
+        if session is not None:
+            session.stats.reset()
+
+    def close(self):
+        if self.job is not None:
+            self.master.after_cancel(self.job)
+            self.job = None
+
+    def refresh(self):
+        self.job = None
+        start = time.perf_counter()
+        try:
+            session = self.get_session()
+            if session is not None:
+                self.update_stats(session)
+                self.update_spectrum(session)
+        except Exception as e:
+            logging.error(f"Error updating analysis: {e}")
+        # Mesmo critério do RenderScheduler: se estourar o orçamento, espaça as atualizações
+        elapsed = (time.perf_counter() - start) * 1000
+        self.interval = min(max(self.base_interval, elapsed / self.budget), 10000)
+        self.job = self.master.after(int(self.interval), self.refresh)
+
+    def update_stats(self, session):
+        stats = session.stats
+        rows = self.tree.get_children()
+        if session is not self.session or len(rows) != stats.channels:
+            self.tree.delete(*rows)
+            rows = [self.tree.insert('', tk.END, text=session.channel_parser.channel_name(index)) for index in range(stats.channels)]
+            self.session = session
+        std = stats.std()
+        rms = stats.rms()
+        for index, item in enumerate(rows):
+            if not stats.count[index]:
+                self.tree.item(item, values=(0, '', '', '', '', ''))
+                continue
+            self.tree.item(item, values=(
+                int(stats.count[index]),
+                f"{stats.minimum[index]:.6g}",
+                f"{stats.maximum[index]:.6g}",
+                f"{stats.mean[index]:.6g}",
+                f"{std[index]:.6g}",
+                f"{rms[index]:.6g}"
+            ))
+
+    def update_spectrum(self, session):
+        try:
+            size = max(int(self.size.get()), 8)
+        except ValueError:
+            return
+        values = session.samples.latest(size)
+        if len(values) < 8:
+            return
+        rate = session.sample_rate.rate
+        frequencies, psd = power_spectrum(values, rate, self.window.get())
+        self.rate_label.config(text=f"{rate:.1f} {self.translate('samples_per_second')}" if rate else '')
+        psd = 10 * np.log10(np.maximum(psd, 1e-20))  # dB
+        if len(self.lines) != psd.shape[1]:
+            self.ax.clear()
+            self.lines = [self.ax.plot([], [], linewidth=0.8)[0] for _ in range(psd.shape[1])]
+            self.ax.set_ylabel('dB')
+            self.ax.grid(True, alpha=0.3)
+        self.ax.set_xlabel('Hz' if rate else self.translate('cycles_per_sample'))
+        for index, line in enumerate(self.lines):
+            line.set_data(frequencies, psd[:, index])
+        finite = psd[np.isfinite(psd)]
+        if frequencies[-1] > 0 and finite.size:
+            self.ax.set_xlim(0, frequencies[-1])
+            self.ax.set_ylim(finite.min() - 5, finite.max() + 5)
+        self.canvas.draw_idle()
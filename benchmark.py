@@ -0,0 +1,426 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+
+import numpy as np
+
+
+# Benchmarks dos caminhos de recepção, decodificação, gráfico e Modbus.
+# Cada resultado é um dicionário simples; a saída JSON pode ser comparada
+# entre versões (ex.: python benchmark.py -o antes.json ... -o depois.json)
+
+def percentiles(values, points=(50, 90, 99)):
+    if not len(values):
+        return {}
+    result = {f"p{point}": round(float(np.percentile(values, point)), 4) for point in points}
+    result['max'] = round(float(np.max(values)), 4)
+    result['mean'] = round(float(np.mean(values)), 4)
+    return result
+
+
+def synthetic_lines(size, channels=4, seed=0):
+    # Texto CSV como o de um microcontrolador: uma amostra por linha
+    rng = np.random.default_rng(seed)
+    rows = max(size // (channels * 8), 1)
+    values = np.cumsum(rng.normal(size=(rows, channels)), axis=0)
+    lines = '\n'.join(','.join(f"{value:.3f}" for value in row) for row in values)
+    return (lines + '\n').encode('ascii')[:size]
+
+
+def synthetic_modbus(size):
+    from decoders import with_crc
+    request = with_crc(bytes.fromhex('010300000002'))
+    response = with_crc(bytes.fromhex('0103040001000a'))
+    pair = request + response
+    return pair * max(size // len(pair), 1)
+
+
+def synthetic_frames(size, encode, length=32, seed=0):
+    # Quadros binários aleatórios (com bytes especiais) já codificados
+    rng = np.random.default_rng(seed)
+    frame = encode(rng.integers(0, 256, length, dtype=np.uint8).tobytes())
+    return frame * max(size // len(frame), 1)
+
+
+def chunks(data, size=4096):
+    return [data[start:start + size] for start in range(0, len(data), size)]
+
+
+def timed(function, data_chunks):
+    start = time.perf_counter()
+    count = 0
+    for chunk in data_chunks:
+        result = function(chunk)
+        count += len(result) if result is not None else 0
+    return time.perf_counter() - start, count
+
+
+def bench_decode(size):
+    from channel_parser import ChannelParser
+    from decoders import DelimiterDecoder, ModbusRtuDecoder, SlipDecoder, CobsDecoder, slip_encode, cobs_encode
+    from hexdump import HexDumper
+
+    text = chunks(synthetic_lines(size))
+    binary = chunks(synthetic_modbus(size))
+    results = {}
+
+    parser = ChannelParser()
+    elapsed, samples = timed(parser.feed, text)
+    results['channel_parser'] = {
+        'bytes_per_sec': round(size / elapsed),
+        'samples_per_sec': round(samples / elapsed)
+    }
+    for name, decoder, data in (
+        ('delimiter', DelimiterDecoder(), text),
+        ('modbus_rtu', ModbusRtuDecoder(115200), binary),
+        ('slip', SlipDecoder(), chunks(synthetic_frames(size, slip_encode))),
+        ('cobs', CobsDecoder(), chunks(synthetic_frames(size, lambda frame: cobs_encode(frame) + b'\x00')))
+    ):
+        elapsed, frames = timed(decoder.feed, data)
+        total = sum(len(chunk) for chunk in data)
+        results[name] = {'bytes_per_sec': round(total / elapsed), 'frames_per_sec': round(frames / elapsed)}
+    dumper = HexDumper()
+    elapsed, _ = timed(dumper.format, binary)
+    results['hexdump'] = {'bytes_per_sec': round(sum(len(chunk) for chunk in binary) / elapsed)}
+    return results
+
+
+def bench_receive(rate, duration, interval=0.05):
+    # SerialReader + ChannelParser + RingBuffer, como no caminho da interface,
+    # com dados sintéticos entregues no ritmo de 'rate' baud (0 = sem limite);
+    # o consumidor drena a cada 'interval' segundos, como o poll_serial
+    from replay import ReplaySerial
+    from serial_reader import SerialReader
+    from channel_parser import ChannelParser
+    from ring_buffer import RingBuffer
+
+    with tempfile.NamedTemporaryFile(suffix='.bin', delete=False) as f:
+        f.write(synthetic_lines(1000000))
+        path = f.name
+    try:
+        baudrate = rate or 115200
+        ser = ReplaySerial(path, speed=1.0 if rate else 0, baudrate=baudrate, timeout=0.1, loop=True)
+        reader = SerialReader(ser)
+        parser = ChannelParser()
+        samples = RingBuffer(10000)
+        memory = []
+        received = 0
+        parsed = 0
+        tracemalloc.start()
+        reader.start()
+        start = time.perf_counter()
+        next_sample = start
+        while time.perf_counter() - start < duration:
+            for timestamp, data in reader.read_chunks():
+                received += len(data)
+                values = parser.feed(data)
+                if len(values):
+                    samples.extend(values)
+                    parsed += len(values)
+            now = time.perf_counter()
+            if now >= next_sample:
+                memory.append((round(now - start, 3), tracemalloc.get_traced_memory()[0]))
+                next_sample = now + duration / 20
+            time.sleep(interval)
+        elapsed = time.perf_counter() - start
+        reader.stop()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        ser.close()
+    finally:
+        os.remove(path)
+    return {
+        'offered_bytes_per_sec': round(rate / 10) if rate else None,
+        'bytes_per_sec': round(received / elapsed),
+        'samples_per_sec': round(parsed / elapsed),
+        'dropped_bytes': reader.dropped_bytes,
+        'memory': memory_report(memory, peak)
+    }
+
+
+def memory_report(memory, peak):
+    # Crescimento entre a primeira e a última metade da execução: perto de
+    # zero quando os buffers são limitados
+    values = [value for _, value in memory]
+    half = len(values) // 2
+    growth = (np.mean(values[half:]) - np.mean(values[:half])) if half else 0
+    return {
+        'samples': memory,
+        'peak_bytes': peak,
+        'growth_bytes': round(float(growth))
+    }
+
+
+def bench_plot(window, channels, frames):
+    # Mesma sequência do update_graph: decimação min/máx, set_data e blit
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from ring_buffer import RingBuffer, minmax_decimate
+    from render_scheduler import RenderScheduler, AxisScaler
+
+    fig, ax = plt.subplots(figsize=(8, 4), dpi=100)
+    lines = [ax.plot([], [], animated=True)[0] for _ in range(channels)]
+    ax.set_xlim(0, window)
+    samples = RingBuffer(window, channels)
+    scaler = AxisScaler()
+    rng = np.random.default_rng(0)
+
+    def draw():
+        x, y = minmax_decimate(samples.view(), ax.bbox.width)
+        for index, line in enumerate(lines):
+            line.set_data(x[:, index], y[:, index])
+        limits = scaler.update(float(np.nanmin(y)), float(np.nanmax(y)))
+        if limits:
+            ax.set_ylim(*limits)
+        return lines, limits is not None
+
+    scheduler = RenderScheduler(None, fig.canvas, ax, draw)
+    times = []
+    full_redraws = 0
+    for _ in range(frames):
+        samples.extend(rng.normal(size=(window // 20, channels)))
+        start = time.perf_counter()
+        artists, full = draw()
+        if full or scheduler.background is None:
+            fig.canvas.draw()
+            full_redraws += 1
+        else:
+            scheduler.artists = artists
+            fig.canvas.restore_region(scheduler.background)
+            scheduler.draw_artists()
+            fig.canvas.blit(ax.bbox)
+        times.append((time.perf_counter() - start) * 1000)
+    plt.close(fig)
+    return {
+        'window': window,
+        'channels': channels,
+        'frames': frames,
+        'full_redraws': full_redraws,
+        'frame_ms': percentiles(times)
+    }
+
+
+def bench_history(samples, channels, chunk=1000, width=1500):
+    # Atualização da pirâmide no ritmo da recepção (blocos de 'chunk' amostras)
+    # e consultas de larguras crescentes, todas com a mesma largura de tela
+    from pyramid import MinMaxPyramid
+    history = MinMaxPyramid(samples, channels)
+    block = np.random.default_rng(0).normal(size=(chunk, channels))
+    start = time.perf_counter()
+    for _ in range(samples // chunk):
+        history.extend(block)
+    elapsed = time.perf_counter() - start
+    queries = {}
+    span = 1000
+    while span < history.total:
+        times = []
+        for _ in range(20):
+            began = time.perf_counter()
+            x, _, _, _, scale = history.query(history.total - span, history.total, width)
+            times.append((time.perf_counter() - began) * 1000)
+        queries[str(span)] = {'scale': scale, 'points': len(x), 'query_ms': percentiles(times)}
+        span *= 10
+    return {
+        'samples': history.total,
+        'channels': channels,
+        'levels': [level.scale for level in history.levels],
+        'samples_per_sec': round(history.total / elapsed),
+        'queries': queries
+    }
+
+
+def bench_fanout(clients, duration, rate=1000000, chunk=4096):
+    # Repasse de 'rate' bytes/s a 'clients' clientes TCP, lidos por um processo
+    # separado; mede o custo de publish() na thread de recepção
+    from fanout import serve, get_fanout
+
+    server = serve('benchmark', port=0)
+    script = (
+        "import socket, selectors, sys\n"
+        "port, count = int(sys.argv[1]), int(sys.argv[2])\n"
+        "selector = selectors.DefaultSelector()\n"
+        "for index in range(count):\n"
+        "    selector.register(socket.create_connection(('127.0.0.1', port)), selectors.EVENT_READ)\n"
+        "print('ready', flush=True)\n"
+        "while selector.get_map():\n"
+        "    for key, _ in selector.select():\n"
+        "        if not key.fileobj.recv(1 << 20):\n"
+        "            selector.unregister(key.fileobj)\n"
+    )
+    readers = subprocess.Popen([sys.executable, '-c', script, str(server.port), str(clients)], stdout=subprocess.PIPE, text=True)
+    try:
+        readers.stdout.readline()
+        deadline = time.monotonic() + 5
+        while len(server.clients) < clients and time.monotonic() < deadline:
+            time.sleep(0.01)
+        data = os.urandom(chunk)
+        interval = chunk / rate
+        times = []
+        start = time.perf_counter()
+        next_time = start
+        while time.perf_counter() - start < duration:
+            began = time.perf_counter()
+            server.publish(data)
+            times.append((time.perf_counter() - began) * 1e6)
+            next_time += interval
+            time.sleep(max(next_time - time.perf_counter(), 0))
+        elapsed = time.perf_counter() - start
+        time.sleep(0.5)
+        stats = server.stats()
+    finally:
+        get_fanout().stop()
+        readers.wait(5)
+    return {
+        'clients': clients,
+        'offered_bytes_per_sec': round(len(times) * chunk / elapsed),
+        'sent_bytes_per_sec': round(stats['bytes_sent'] / elapsed),
+        'dropped_clients': stats['dropped_clients'],
+        'publish_us': percentiles(times)
+    }
+
+
+def bench_modbus(duration, tags=10, latency=0.0):
+    # Escravo simulado em um pty (só Linux/macOS); mede o tempo de ida e volta
+    # pelo cliente síncrono e a vazão do motor assíncrono
+    from simulator import ModbusSimulator
+    from modbus_scheduler import PollScheduler, create_client, default_tags
+    from modbus_engine import ModbusEngine, drain_events, EVENT_VALUES
+
+    simulator = ModbusSimulator(units=(1,), latency=latency)
+    port = simulator.start()
+    options = {'baudrate': 115200, 'bytesize': 8, 'parity': 'N', 'stopbits': 1, 'timeout': 1}
+    results = {}
+    try:
+        client = create_client(port, options)
+        client.connect()
+        scheduler = PollScheduler(client, default_tags(count=tags, period=0), baudrate=options['baudrate'])
+        request = scheduler.requests[0]
+        rtt = []
+        start = time.perf_counter()
+        while time.perf_counter() - start < duration:
+            begin = time.perf_counter()
+            _, error = scheduler.execute(request)
+            if error is None:
+                rtt.append((time.perf_counter() - begin) * 1000)
+        client.close()
+        results['sync'] = {'requests': len(rtt), 'errors': scheduler.stats.errors, 'rtt_ms': percentiles(rtt)}
+
+        engine = ModbusEngine()
+        poller = engine.add_poller(port, options, default_tags(count=tags, period=0))
+        updates = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < duration:
+            updates += sum(1 for kind, _, _ in drain_events(poller.events) if kind == EVENT_VALUES)
+            time.sleep(0.05)
+        elapsed = time.perf_counter() - start
+        engine.stop()
+        results['async'] = {'updates_per_sec': round(updates / elapsed, 1), 'bus': poller.stats.summary()}
+    finally:
+        simulator.stop()
+    return results
+
+
+def bench_startup(runs):
+    # Importação do main.py em um processo novo a cada vez (a janela precisa de
+    # tela; a importação é o que a precede). Lista também os módulos pesados que
+    # já foram carregados nesse ponto e deveriam ficar para o primeiro uso
+    repo = os.path.dirname(os.path.abspath(__file__))
+    code = (
+        "import sys, time, json\n"
+        f"sys.path.insert(0, {repo!r})\n"
+        "start = time.perf_counter()\n"
+        "import main\n"
+        "elapsed = time.perf_counter() - start\n"
+        "heavy = [name for name in ('matplotlib', 'pymodbus', 'asyncio', 'contator', 'hexdump') if name in sys.modules]\n"
+        "print(json.dumps({'elapsed': elapsed, 'heavy': heavy}))\n"
+    )
+    times = []
+    heavy = []
+    with tempfile.TemporaryDirectory() as directory:
+        for _ in range(runs):
+            # Diretório temporário: o main.py cria o serialuz.log no diretório atual
+            output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, cwd=directory, timeout=60)
+            if output.returncode != 0:
+                return {'error': output.stderr.strip().splitlines()[-1:]}
+            result = json.loads(output.stdout.strip().splitlines()[-1])
+            times.append(result['elapsed'] * 1000)
+            heavy = result['heavy']
+    return {'runs': runs, 'import_ms': percentiles(times), 'heavy_modules_loaded': heavy}
+
+
+def version():
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], capture_output=True, text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ''
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="serialuz-benchmark", description="SeriaLuz performance benchmarks")
+    parser.add_argument("--only", default="startup,decode,receive,plot,history,fanout,modbus", help="comma-separated benchmarks to run")
+    parser.add_argument("--sizes", default="1000000,4000000", help="bytes of synthetic data per decode step")
+    parser.add_argument("--rates", default="115200,921600,4000000,0", help="receive rates in baud (0 = as fast as possible)")
+    parser.add_argument("--duration", type=float, default=3.0, help="seconds per receive/Modbus step")
+    parser.add_argument("--windows", default="1000,10000,100000", help="graph window sizes (samples)")
+    parser.add_argument("--channels", type=int, default=4)
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--history", type=int, default=10000000, help="samples fed to the history pyramid")
+    parser.add_argument("--clients", default="1,10,50", help="fan-out client counts")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated Modbus slave latency (s)")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters for the startup benchmark")
+    parser.add_argument("-o", "--output", help="write the JSON report here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    only = set(args.only.split(','))
+    sizes = [int(size) for size in args.sizes.split(',')]
+    report = {
+        'version': version(),
+        'time': time.time(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': {}
+    }
+    results = report['results']
+    if 'startup' in only:
+        results['startup'] = bench_startup(args.runs)
+    # Taxas crescentes: um resultado por tamanho/janela
+    if 'decode' in only:
+        results['decode'] = {str(size): bench_decode(size) for size in sizes}
+    if 'receive' in only:
+        rates = [int(rate) for rate in args.rates.split(',')]
+        results['receive'] = {str(rate or 'max'): bench_receive(rate, args.duration) for rate in rates}
+    if 'plot' in only:
+        windows = [int(window) for window in args.windows.split(',')]
+        results['plot'] = {str(window): bench_plot(window, args.channels, args.frames) for window in windows}
+    if 'history' in only:
+        results['history'] = bench_history(args.history, args.channels)
+    if 'fanout' in only:
+        counts = [int(count) for count in args.clients.split(',')]
+        results['fanout'] = {str(count): bench_fanout(count, args.duration) for count in counts}
+    if 'modbus' in only:
+        if hasattr(os, 'openpty'):
+            results['modbus'] = bench_modbus(args.duration, latency=args.latency)
+        else:
+            results['modbus'] = {'skipped': 'pseudo-terminals are not available on this platform'}
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+import io
+import re
+import numpy as np
+
+
+SEPARATORS = bytes.maketrans(b';\t', b',,')
+SPACES = re.compile(rb' +')
+KEY_VALUE = re.compile(rb'([A-Za-z_][\w.\-]*)\s*[=:]\s*')
+
+
+class ChannelParser:
+    def __init__(self, max_channels=16, max_line=65536):
+        self.max_channels = max_channels
+        self.max_line = max_line
+        self.pending = b''
+        self.channels = 0
+        self.names = []
+        self.lines_parsed = 0
+        self.lines_dropped = 0
+
+    def reset(self):
+        self.pending = b''
+
+    def feed(self, data):
+        lines = (self.pending + data).split(b'\n')
+        self.pending = lines.pop()
+        if len(self.pending) > self.max_line:
+            # Linha sem terminador: provavelmente dado binário
+            self.pending = b''
+            self.lines_dropped += 1
+        return self.parse_lines(lines)
+
+    def parse_lines(self, lines):
+        lines = [line.strip() for line in lines]
+        lines = [line for line in lines if line]
+        if not lines:
+            return np.empty((0, max(self.channels, 1)))
+
+        blob = b'\n'.join(lines)
+        keys = KEY_VALUE.findall(lines[0])
+        if keys:
+            self.learn_names([key.decode('ascii', 'replace') for key in keys])
+            blob = KEY_VALUE.sub(b'', blob)
+        # Normaliza os separadores para vírgula; espaço junto de outro
+        # separador é só alinhamento
+        blob = blob.translate(SEPARATORS).replace(b', ', b',').replace(b' ,', b',')
+        if b' ' in blob:
+            blob = SPACES.sub(b',', blob)
+
+        try:
+            # Caminho rápido: o lote inteiro convertido de uma vez pelo parser em C
+            values = np.loadtxt(io.BytesIO(blob), delimiter=',', comments=None, ndmin=2, dtype=np.float64)
+        except ValueError:
+            values = self.parse_slow(blob.split(b'\n'))
+        if values.shape[1] > self.max_channels:
+            values = values[:, :self.max_channels]
+
+        self.channels = max(self.channels, values.shape[1])
+        self.lines_parsed += len(values)
+        return values
+
+    def parse_slow(self, lines):
+        # Linhas com quantidade de campos diferente ou texto misturado
+        rows = []
+        width = 1
+        for line in lines:
+            row = []
+            for field in line.split(b',')[:self.max_channels]:
+                try:
+                    row.append(float(field))
+                except ValueError:
+                    row.append(np.nan)
+            if all(value != value for value in row):
+                self.lines_dropped += 1
+                continue
+            rows.append(row)
+            width = max(width, len(row))
+        values = np.full((len(rows), width), np.nan)
+        for i, row in enumerate(rows):
+            values[i, :len(row)] = row
+        return values
+
+    def learn_names(self, keys):
+        for key in keys:
+            if key not in self.names and len(self.names) < self.max_channels:
+                self.names.append(key)
+
+    def channel_name(self, index):
+        if index < len(self.names):
+            return self.names[index]
+        return f"CH{index + 1}"
@@ -0,0 +1,264 @@
+import sys
+import time
+import json
+import signal
+import logging
+import argparse
+import threading
+
+from settings import load_settings_file, serial_options, SETTINGS_FILE
+from serial_reader import SerialReader
+from replay import open_port
+
+
+# Modo sem interface: só serial, replay e gravação; Tk, Matplotlib e NumPy
+# não são importados, o pymodbus só quando o polling Modbus é pedido e os
+# gatilhos só quando há regras
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="serialuz-cli", description="SeriaLuz headless serial logger")
+    parser.add_argument("--settings", default=SETTINGS_FILE, help="settings file written by the GUI")
+    parser.add_argument("--port", help="serial port or replay:// URL (overrides settings)")
+    parser.add_argument("--baudrate", help="baudrate (overrides settings)")
+    parser.add_argument("--output", choices=["raw", "hex", "none"], default="raw", help="what to write to stdout")
+    parser.add_argument("--capture", help="record every chunk to this .slzcap file")
+    parser.add_argument("--framing", help="split the stream into frames (delimiter, fixed, length, slip, cobs, modbus); defaults to the settings")
+    parser.add_argument("--trigger", action="append", metavar="RULE", help="trigger rule ('text FAULT', 'hex 01 83', 'regex ERR[0-9]+', 'CH1 > 100'); repeatable, defaults to the settings")
+    parser.add_argument("--pre", type=float, help="seconds kept before a trigger (default: settings)")
+    parser.add_argument("--post", type=float, help="seconds recorded after a trigger (default: settings)")
+    parser.add_argument("--capture-dir", help="directory for trigger captures (default: settings)")
+    parser.add_argument("--serve", metavar="[HOST:]PORT", help="re-broadcast the port to TCP clients (e.g. 7700 or 0.0.0.0:7700)")
+    parser.add_argument("--serve-ws", type=int, metavar="PORT", help="also re-broadcast to WebSocket clients on this port")
+    parser.add_argument("--serve-writes", action="store_true", help="let clients write to the port, one client at a time")
+    parser.add_argument("--duration", type=float, help="stop after this many seconds")
+    parser.add_argument("--interval", type=float, default=0.02, help="seconds between buffer drains")
+    parser.add_argument("--modbus", action="store_true", help="poll Modbus registers instead of streaming")
+    parser.add_argument("--tags", help="Modbus tag table (.json or .csv); defaults to modbus_tags in the settings")
+    parser.add_argument("--max-gap", type=int, help="unused registers a merged request may span")
+    parser.add_argument("--modbus-unit", type=int, default=1)
+    parser.add_argument("--modbus-address", type=int, default=0)
+    parser.add_argument("--modbus-count", type=int, default=10)
+    parser.add_argument("--modbus-period", type=float, default=1.0)
+    parser.add_argument("--metrics", help="write performance metrics to this file (.json, otherwise Prometheus text)")
+    parser.add_argument("--metrics-interval", type=float, default=10.0, help="seconds between metrics file updates")
+    parser.add_argument("--verbose", action="store_true", help="log to stderr")
+    return parser.parse_args(argv)
+
+
+def load_settings(args):
+    settings = load_settings_file(args.settings)
+    if args.port:
+        settings['port'] = args.port
+    if args.baudrate:
+        settings['baudrate'] = args.baudrate
+    return settings
+
+
+def write_metrics(args, registry):
+    try:
+        registry.write(args.metrics)
+    except OSError as e:
+        logging.error(f"Error writing metrics file: {e}")
+
+
+def stream(args, settings, stop):
+    from decoders import create_decoder
+    from metrics import get_metrics, StreamMetrics
+
+    if args.framing:
+        settings['framing'] = args.framing
+    decoder = create_decoder(settings)
+    triggers, channels = create_triggers(args, settings, settings['port'])
+    ser = open_port(settings['port'], **serial_options(settings))
+    reader = SerialReader(ser)
+    try:
+        server, transmitter = share_port(args, ser)
+    except (OSError, ValueError):
+        ser.close()
+        raise
+    recorder = None
+    if args.capture:
+        from recorder import CaptureRecorder
+        recorder = CaptureRecorder(args.capture)
+    out = sys.stdout.buffer
+    registry = get_metrics()
+    metrics = StreamMetrics(registry, reader, decoder, session=ser.port)
+    next_metrics = time.monotonic() + args.metrics_interval
+    reader.start()
+    logging.info(f"Streaming {ser.port}")
+    try:
+        while not stop.wait(args.interval):
+            chunks = reader.read_chunks()
+            for timestamp, data in chunks:
+                if server:
+                    server.publish(data)
+                if recorder:
+                    recorder.write(timestamp, data, ser.port)
+                if triggers:
+                    triggers.feed(timestamp, data)
+                    if channels:
+                        values = channels.feed(data)
+                        if len(values):
+                            triggers.feed_values(timestamp, values, channels.channel_name)
+                    for event in triggers.take_events():
+                        logging.warning(f"Trigger '{event.rule.text}': {event.path}")
+                # Com enquadramento, uma linha por quadro completo
+                start = time.perf_counter()
+                frames = decoder.feed(data, timestamp) if decoder else [data]
+                metrics.decode_time.observe(time.perf_counter() - start)
+                for frame in frames:
+                    if args.output == "raw":
+                        out.write(frame + b'\n' if decoder else frame)
+                    elif args.output == "hex":
+                        out.write(f"{timestamp:.6f} {frame.hex(' ')}\n".encode('ascii'))
+            if chunks and args.output != "none":
+                out.flush()
+            if triggers:
+                triggers.tick()
+            while transmitter and not transmitter.finished.empty():
+                job = transmitter.finished.get_nowait()
+                if job.error is not None:
+                    logging.error(f"Error writing client data to the port: {job.error}")
+            if reader.error:
+                raise reader.error
+            if args.metrics and time.monotonic() >= next_metrics:
+                write_metrics(args, registry)
+                next_metrics = time.monotonic() + args.metrics_interval
+    finally:
+        if server:
+            server.close()
+            logging.info(f"Fan-out: {server.stats()}")
+        if transmitter:
+            transmitter.stop()
+        reader.stop()
+        ser.close()
+        if recorder:
+            recorder.close()
+        if triggers:
+            triggers.close()
+            logging.info(f"Triggers: {triggers.fired} fired, {triggers.captures} captures")
+        if args.metrics:
+            write_metrics(args, registry)
+        logging.info(f"Read {reader.bytes_read} bytes, dropped {reader.dropped_bytes}")
+        if decoder:
+            logging.info(f"Frames: {decoder.stats()}")
+
+
+def share_port(args, ser):
+    # Retorna (FanoutServer, Transmitter); as escritas dos clientes entram na
+    # fila de transmissão para não disputar a porta com a leitura
+    if not args.serve:
+        return None, None
+    from fanout import serve
+
+    host, _, port = args.serve.rpartition(':')
+    transmitter = None
+    write = None
+    if args.serve_writes:
+        from transmit import Transmitter, data_job
+        transmitter = Transmitter(ser)
+        write = lambda data: transmitter.submit(data_job(data))
+    server = serve(ser.port, host or '127.0.0.1', int(port), args.serve_ws, write)
+    logging.warning(f"Sharing {ser.port} on {' '.join(server.urls)}")
+    return server, transmitter
+
+
+def create_triggers(args, settings, port):
+    # Retorna (TriggerEngine, ChannelParser ou None); o parser, que usa
+    # NumPy, só quando há regras de limiar
+    lines = args.trigger if args.trigger is not None else settings.get('triggers', [])
+    if not lines:
+        return None, None
+    from triggers import TriggerEngine, parse_rules
+
+    rules = parse_rules(lines)
+    pre = args.pre if args.pre is not None else float(settings.get('trigger_pre', 5))
+    post = args.post if args.post is not None else float(settings.get('trigger_post', 5))
+    directory = args.capture_dir or settings.get('trigger_dir') or 'captures'
+    engine = TriggerEngine(rules, port, pre, post, directory)
+    channels = None
+    if any(rule.kind == 'threshold' for rule in rules):
+        from channel_parser import ChannelParser
+        channels = ChannelParser()
+    logging.info(f"{len(rules)} trigger rules, captures in {directory}")
+    return engine, channels
+
+
+def modbus_tags(args, settings):
+    from modbus_scheduler import load_tags, tags_from_settings, default_tags
+
+    if args.tags:
+        return load_tags(args.tags)
+    if settings.get('modbus_tags'):
+        return tags_from_settings(settings)
+    return default_tags(args.modbus_unit, args.modbus_address, args.modbus_count, args.modbus_period)
+
+
+def poll_modbus(args, settings, stop):
+    from modbus_scheduler import PollScheduler, create_client
+
+    tags = modbus_tags(args, settings)
+    options = serial_options(settings, timeout=1)
+    client = create_client(settings['port'], options)
+    if not client.connect():
+        raise ConnectionError(f"Unable to open Modbus port {settings['port']}")
+    max_gap = args.max_gap if args.max_gap is not None else int(settings.get('modbus_max_gap', 10))
+    scheduler = PollScheduler(client, tags, max_gap=max_gap, baudrate=options['baudrate'])
+    logging.info(f"Polling {len(tags)} tags with {len(scheduler.requests)} requests")
+    out = sys.stdout
+    last_report = time.monotonic()
+    try:
+        while not stop.is_set():
+            values, errors = scheduler.poll_due()
+            if values or errors:
+                record = {
+                    'time': time.time(),
+                    'values': {tag.name: value for tag, value in values.items()},
+                    'errors': [f"{request}: {error}" for request, error in errors]
+                }
+                out.write(json.dumps(record) + '\n')
+                out.flush()
+            if time.monotonic() - last_report >= 60:
+                logging.info(f"Bus: {scheduler.stats.summary()}")
+                last_report = time.monotonic()
+            stop.wait(max(scheduler.next_deadline() - time.monotonic(), 0))
+    finally:
+        client.close()
+        logging.info(f"Bus: {scheduler.stats.summary()}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        stream=sys.stderr,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    settings = load_settings(args)
+    if not settings['port']:
+        logging.error("No port given on the command line or in the settings file")
+        return 2
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    if args.duration:
+        timer = threading.Timer(args.duration, stop.set)
+        timer.daemon = True
+        timer.start()
+    try:
+        if args.modbus:
+            poll_modbus(args, settings, stop)
+        else:
+            stream(args, settings, stop)
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        logging.error(str(e))
+        return 1
+    finally:
+        stop.set()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+import tkinter as tk
+
+
+class ReceiveConsole:
+    def __init__(self, widget, root, max_lines=5000, flush_interval=50, max_pending=1024 * 1024):
+        self.widget = widget
+        self.root = root
+        self.max_lines = max_lines
+        self.flush_interval = flush_interval  # ms entre atualizações do widget
+        self.max_pending = max_pending  # caracteres guardados entre atualizações
+        self.pause_on_scroll = True
+
+        self.pending = []
+        self.pending_size = 0
+        self.job = None
+
+    def write(self, text):
+        if not text:
+            return
+        self.pending.append(text)
+        self.pending_size += len(text)
+        if self.pending_size > self.max_pending:
+            # O widget só mostraria o final de qualquer forma
+            text = ''.join(self.pending)[-self.max_pending:]
+            self.pending = [text]
+            self.pending_size = len(text)
+        if self.job is None:
+            self.job = self.root.after(self.flush_interval, self.flush)
+
+    def flush(self):
+        self.job = None
+        if not self.pending:
+            return
+        text = ''.join(self.pending)
+        self.pending.clear()
+        self.pending_size = 0
+
+        # Com a barra no fim, acompanha os dados; se o usuário rolou para
+        # cima, mantém a posição
+        following = not self.pause_on_scroll or self.widget.yview()[1] >= 1.0
+
+        self.widget.config(state='normal')
+        self.widget.insert(tk.END, text)
+        lines = int(self.widget.index('end-1c').split('.')[0])
+        if lines > self.max_lines:
+            self.widget.delete('1.0', f'{lines - self.max_lines + 1}.0')
+        self.widget.config(state='disabled')
+        if following:
+            self.widget.yview(tk.END)
+
+    def clear(self):
+        if self.job is not None:
+            self.root.after_cancel(self.job)
+            self.job = None
+        self.pending.clear()
+        self.pending_size = 0
+        self.widget.config(state='normal')
+        self.widget.delete('1.0', tk.END)
+        self.widget.config(state='disabled')
@@ -1,10 +1,12 @@
 import tkinter as tk
 from tkinter import messagebox
-import threading
-import time
-from pymodbus.client import ModbusSerialClient as ModbusClient
-import os
-import json
+import queue
+from settings import load_settings_file, serial_options
+from modbus_scheduler import Tag
+from modbus_engine import get_engine, drain_events, EVENT_CONNECTED, EVENT_VALUES, EVENT_ERROR
+from modbus_cache import QUALITY_GOOD
+from metrics import get_metrics
+from translations import load_translations, saved_language
 
 class Contator:
     def __init__(self, master, lang):
@@ -25,6 +27,17 @@ class Contator:
         self.baud_rate = tk.StringVar(value="9600")
         self.unit_id = 1  # ID do dispositivo Modbus
         self.register_address = 0  # Endereço do registro a ser lido
+        self.period = 1.0  # Segundos entre leituras
+        self.settings = {}
+
+        # Leituras feitas pelo loop asyncio compartilhado; a janela só lê a fila
+        self.events = queue.Queue()
+        self.poller = None
+        self.drain_job = None
+        self.drain_interval = 50  # ms
+        metrics = get_metrics()
+        self.modbus_updates = metrics.counter('modbus_updates_total', 'Modbus value updates shown', window='contator')
+        self.modbus_read_errors = metrics.counter('modbus_read_errors_total', 'Modbus read errors shown', window='contator')
 
         self.load_settings()
 
@@ -69,30 +82,43 @@ class Contator:
         self.canvas.create_line(100, 150, 100, 250, fill="#000000", width=2)
         self.canvas.create_line(50, 250, 150, 250, fill="#000000", width=2)
         self.canvas.create_text(100, 270, text=self.translate("connections"), font=("Helvetica", 14))
+        # O texto ao vivo é criado uma vez; as leituras só trocam o conteúdo
+        self.live_text = self.canvas.create_text(300, 100, font=("Helvetica", 24), tags="live")
         self.update_diagram()
 
     def update_diagram(self):
         # Atualizar o diagrama ao vivo
-        self.canvas.delete("live")
-        self.canvas.create_text(300, 100, text=f"{self.translate("score")} {self.counter}", font=("Helvetica", 24), tags="live")
+        self.canvas.itemconfigure(self.live_text, text=f"{self.translate("score")} {self.counter}")
+
+    def show_counter(self, entry):
+        # Chamado pelo cache do poller só quando o valor ou a qualidade mudam
+        if entry.value is not None:
+            self.counter = entry.value
+        self.display.config(text=str(self.counter), fg="#00ff00" if entry.quality == QUALITY_GOOD else "#ff5252")
+        self.update_diagram()
 
     def start_counter(self):
         if not self.running:
             self.running = True
-            self.serial_connected = self.connect_modbus()
-            if self.serial_connected:
-                self.counter_thread = threading.Thread(target=self.update_counter_modbus)
-                self.counter_thread.start()
+            if self.connect_modbus():
+                self.drain_job = self.master.after(self.drain_interval, self.update_counter_modbus)
             else:
                 self.running = False
 
     def stop_counter(self):
         self.running = False
+        if self.drain_job:
+            self.master.after_cancel(self.drain_job)
+            self.drain_job = None
+        if self.poller:
+            self.poller.stop()
+            self.poller = None
+        self.serial_connected = False
 
     def reset_counter(self):
-        self.running = False
+        self.stop_counter()
         self.counter = 0
-        self.display.config(text=str(self.counter))
+        self.display.config(text=str(self.counter), fg="#00ff00")
         self.update_diagram()
 
     def reconnect(self):
@@ -101,33 +127,36 @@ class Contator:
         self.start_counter()
 
     def connect_modbus(self):
+        # A conexão é aberta pelo loop asyncio; o resultado chega como evento
         try:
-            self.client = ModbusClient(method='rtu', port=self.serial_port, baudrate=self.baud_rate, timeout=1)
-            connection = self.client.connect()
-            if connection:
-                self.log(self.translate("connect_modbus"))
-            else:
-                self.log(self.translate("error_connect_modbus"))
-            return connection
+            settings = dict(self.settings, baudrate=self.baud_rate.get())
+            tag = Tag("counter", unit=self.unit_id, function=3, address=self.register_address, period=self.period)
+            self.poller = get_engine().add_poller(self.serial_port.get(), serial_options(settings, timeout=1), [tag], self.events)
+            self.poller.cache.subscribe([tag], self.show_counter)
+            return True
         except Exception as e:
             self.log(f"{self.translate("error_connect_port")} {e}")
             return False
 
     def update_counter_modbus(self):
-        while self.running:
-            try:
-                result = self.client.read_holding_registers(self.register_address, 1, unit=self.unit_id)
-                if not result.isError():
-                    self.counter = result.registers[0]
-                    self.display.config(text=str(self.counter))
-                    self.update_diagram()
-                else:
-                    self.log(self.translate("error_read_read_modbus"))
-                self.master.update_idletasks()
-                time.sleep(1)  # Ajuste conforme necessário para a taxa de atualização
-            except Exception as e:
-                self.log(f"{self.translate("error_read_modbus")} {e}")
-                self.running = False
+        # Drena os eventos do loop Modbus na thread do Tk
+        self.drain_job = None
+        for kind, poller, payload in drain_events(self.events):
+            if poller is not self.poller:
+                continue  # evento de uma conexão já encerrada
+            if kind == EVENT_CONNECTED:
+                self.serial_connected = payload
+                self.log(self.translate("connect_modbus" if payload else "error_connect_modbus"))
+            elif kind == EVENT_VALUES:
+                self.modbus_updates.inc()
+            elif kind == EVENT_ERROR:
+                self.modbus_read_errors.inc()
+                self.log(f"{self.translate("error_read_modbus")} {payload}")
+        # Valores novos vão do cache para o visor, no máximo uma vez por ciclo
+        if self.poller:
+            self.poller.cache.dispatch()
+        if self.running:
+            self.drain_job = self.master.after(self.drain_interval, self.update_counter_modbus)
 
     def log(self, message):
         self.log_text.config(state=tk.NORMAL)
@@ -137,29 +166,21 @@ class Contator:
 
 
     def load_settings(self):
-        if os.path.isfile("settings.json"):
-            with open("settings.json", "r") as file:
-                settings = json.load(file)
-                self.serial_port.set(settings.get("port", ""))
-                self.baud_rate.set(settings.get("baudrate", "9600"))
+        self.settings = load_settings_file()
+        self.serial_port.set(self.settings.get("port", ""))
+        self.baud_rate.set(self.settings.get("baudrate", "9600"))
 
     def load_language(self, lang):
-        lang_file = f"lang/{lang}.json"
         try:
-            with open(lang_file, 'r', encoding='utf-8') as file:
-                self.translations = json.load(file)
+            self.translations = load_translations(lang)
         except FileNotFoundError:
-            messagebox.showerror("Error", f"Language file '{lang_file}' not found.")
+            messagebox.showerror("Error", f"Language file 'lang/{lang}.json' not found.")
 
     def translate(self, text):
         return self.translations.get(text, text)
 
 def main():
-    lang = "pt-br"
-    if os.path.isfile("lang.json"):
-        with open("lang.json", "r") as file:
-            settings = json.load(file)
-            lang = settings.get("language", "")
+    lang = saved_language()
 
     root = tk.Tk()
     app = Contator(root, lang)
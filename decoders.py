@@ -0,0 +1,353 @@
+import struct
+
+from settings import escaped_bytes
+
+
+# Decodificadores de quadros incrementais: recebem blocos na ordem em que
+# chegam da porta (um quadro pode vir partido em vários blocos) e devolvem
+# os quadros completos. O buffer é consumido por um offset e compactado uma
+# vez por bloco, não a cada quadro.
+
+class FrameDecoder:
+    name = 'raw'
+
+    def __init__(self, max_frame=65536):
+        self.max_frame = max_frame
+        self.buffer = bytearray()
+        self.frames = 0
+        self.crc_errors = 0
+        self.framing_errors = 0
+        self.overflows = 0
+
+    def feed(self, data, timestamp=None):
+        self.buffer += data
+        frames = []
+        view = memoryview(self.buffer)
+        try:
+            consumed = self.extract(view, frames, timestamp)
+        finally:
+            view.release()  # o bytearray só pode ser encolhido sem views abertas
+        if consumed:
+            del self.buffer[:consumed]
+        if len(self.buffer) > self.max_frame:
+            # Lixo sem delimitador: descarta para não crescer sem limite
+            self.overflows += 1
+            self.buffer.clear()
+        self.frames += len(frames)
+        return frames
+
+    def extract(self, view, frames, timestamp):
+        # Sem enquadramento: cada bloco é um quadro
+        frames.append(bytes(view))
+        return len(view)
+
+    def reset(self):
+        self.buffer.clear()
+
+    def stats(self):
+        return {
+            'decoder': self.name,
+            'frames': self.frames,
+            'crc_errors': self.crc_errors,
+            'framing_errors': self.framing_errors,
+            'overflows': self.overflows,
+            'pending': len(self.buffer)
+        }
+
+
+class DelimiterDecoder(FrameDecoder):
+    name = 'delimiter'
+
+    def __init__(self, delimiter=b'\n', keep_delimiter=False, max_frame=65536):
+        super().__init__(max_frame)
+        self.delimiter = delimiter
+        self.keep_delimiter = keep_delimiter
+
+    def extract(self, view, frames, timestamp):
+        buffer = self.buffer
+        size = len(self.delimiter)
+        start = 0
+        while True:
+            end = buffer.find(self.delimiter, start)
+            if end < 0:
+                return start
+            frames.append(bytes(view[start:end + size if self.keep_delimiter else end]))
+            start = end + size
+
+
+class FixedLengthDecoder(FrameDecoder):
+    name = 'fixed'
+
+    def __init__(self, length, max_frame=65536):
+        if length <= 0:
+            raise ValueError("Frame length must be positive")
+        super().__init__(max(max_frame, length))
+        self.length = length
+
+    def extract(self, view, frames, timestamp):
+        count = len(view) // self.length
+        for index in range(count):
+            frames.append(bytes(view[index * self.length:(index + 1) * self.length]))
+        return count * self.length
+
+
+class LengthPrefixedDecoder(FrameDecoder):
+    name = 'length'
+
+    def __init__(self, length_format='>H', length_offset=0, length_adjust=0, header=b'', max_frame=65536):
+        # Tamanho total = campo de tamanho + length_adjust + bytes até o fim do campo
+        super().__init__(max_frame)
+        self.length_field = struct.Struct(length_format)
+        self.length_offset = length_offset
+        self.length_adjust = length_adjust
+        self.header = header
+
+    def extract(self, view, frames, timestamp):
+        buffer = self.buffer
+        field_end = self.length_offset + self.length_field.size
+        start = 0
+        while True:
+            if self.header:
+                found = buffer.find(self.header, start)
+                if found < 0:
+                    # Mantém um possível início de cabeçalho partido no fim
+                    return max(start, len(buffer) - len(self.header) + 1)
+                if found > start:
+                    self.framing_errors += 1
+                start = found
+            if len(buffer) - start < field_end:
+                return start
+            length = self.length_field.unpack_from(view, start + self.length_offset)[0]
+            total = field_end + length + self.length_adjust
+            if total < field_end or total > self.max_frame:
+                # Tamanho impossível: perdeu o sincronismo, avança um byte
+                self.framing_errors += 1
+                start += 1
+                continue
+            if len(buffer) - start < total:
+                return start
+            frames.append(bytes(view[start:start + total]))
+            start += total
+
+
+SLIP_END = 0xC0
+SLIP_ESC = 0xDB
+
+
+class SlipDecoder(FrameDecoder):
+    name = 'slip'
+
+    def extract(self, view, frames, timestamp):
+        buffer = self.buffer
+        start = 0
+        while True:
+            end = buffer.find(SLIP_END, start)
+            if end < 0:
+                return start
+            if end > start:
+                frame = bytes(view[start:end])
+                escapes = frame.count(b'\xdb')
+                if escapes:
+                    if escapes != frame.count(b'\xdb\xdc') + frame.count(b'\xdb\xdd'):
+                        self.framing_errors += 1
+                        start = end + 1
+                        continue
+                    frame = frame.replace(b'\xdb\xdc', b'\xc0').replace(b'\xdb\xdd', b'\xdb')
+                frames.append(frame)
+            start = end + 1
+
+
+class CobsDecoder(FrameDecoder):
+    name = 'cobs'
+
+    def extract(self, view, frames, timestamp):
+        buffer = self.buffer
+        start = 0
+        while True:
+            end = buffer.find(0, start)
+            if end < 0:
+                return start
+            if end > start:
+                frame = cobs_decode(view[start:end])
+                if frame is None:
+                    self.framing_errors += 1
+                else:
+                    frames.append(frame)
+            start = end + 1
+
+
+def cobs_decode(data):
+    # Retorna None se o código de algum bloco passar do fim do quadro
+    out = bytearray()
+    index = 0
+    size = len(data)
+    while index < size:
+        code = data[index]
+        end = index + code
+        if code == 0 or end > size:
+            return None
+        out += data[index + 1:end]
+        index = end
+        if code != 0xFF and index < size:
+            out.append(0)
+    return bytes(out)
+
+
+def cobs_encode(data):
+    out = bytearray()
+    for block in bytes(data).split(b'\x00'):
+        while len(block) >= 0xFE:
+            out.append(0xFF)
+            out += block[:0xFE]
+            block = block[0xFE:]
+        out.append(len(block) + 1)
+        out += block
+    return bytes(out)
+
+
+def slip_encode(data):
+    return b'\xc0' + bytes(data).replace(b'\xdb', b'\xdb\xdd').replace(b'\xc0', b'\xdb\xdc') + b'\xc0'
+
+
+def make_crc16_table(polynomial=0xA001):
+    table = []
+    for value in range(256):
+        crc = value
+        for _ in range(8):
+            crc = (crc >> 1) ^ polynomial if crc & 1 else crc >> 1
+        table.append(crc)
+    return tuple(table)
+
+
+CRC16_TABLE = make_crc16_table()
+
+
+def crc16(data, crc=0xFFFF):
+    # CRC-16/MODBUS por tabela: um acesso por byte
+    table = CRC16_TABLE
+    for byte in data:
+        crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
+    return crc
+
+
+def with_crc(frame):
+    return bytes(frame) + crc16(frame).to_bytes(2, 'little')
+
+
+class ModbusRtuDecoder(FrameDecoder):
+    name = 'modbus'
+
+    def __init__(self, baudrate=9600, max_frame=256, margin=0.02):
+        super().__init__(max_frame)
+        # Silêncio de 3,5 caracteres separa quadros; acima de 19200 baud a
+        # especificação fixa 1,75 ms. Blocos lidos pela thread chegam com atraso,
+        # então o silêncio só é usado para descartar restos incompletos.
+        self.char_time = 11 / baudrate
+        self.gap = 3.5 * self.char_time if baudrate <= 19200 else 0.00175
+        # Atraso de entrega do SO/adaptador USB (latency timer de ~16 ms)
+        self.margin = margin
+        self.last_time = None
+
+    def feed(self, data, timestamp=None):
+        if timestamp is not None:
+            # O instante é o fim da leitura: o silêncio começa a contar antes
+            # do primeiro byte deste bloco entrar na linha
+            silence = timestamp - len(data) * self.char_time - self.last_time if self.last_time is not None else 0
+            if silence > self.gap + self.margin and self.buffer:
+                self.framing_errors += 1
+                self.buffer.clear()
+            self.last_time = timestamp
+        return super().feed(data, timestamp)
+
+    def candidate_lengths(self, view, start):
+        # Tamanhos possíveis do quadro pelo código de função, na ordem de
+        # preferência: primeiro o indicado pelo contador de bytes, depois o
+        # tamanho fixo. Contadores impossíveis (zero, ímpar em registradores)
+        # não viram candidatos
+        available = len(view) - start
+        function = view[start + 1]
+        if function & 0x80:
+            return (5,)
+        if function in (1, 2, 3, 4):
+            lengths = []
+            if available >= 3:
+                count = view[start + 2]
+                if count and (function in (1, 2) or count % 2 == 0):
+                    lengths.append(5 + count)
+            lengths.append(8)
+            return lengths
+        if function in (5, 6, 8):
+            return (8,)
+        if function in (15, 16):
+            lengths = []
+            if available >= 7 and view[start + 6]:
+                lengths.append(9 + view[start + 6])
+            lengths.append(8)
+            return lengths
+        if function == 23:
+            lengths = []
+            if available >= 11 and view[start + 10]:
+                lengths.append(13 + view[start + 10])
+            if available >= 3 and view[start + 2] and view[start + 2] % 2 == 0:
+                lengths.append(5 + view[start + 2])
+            return lengths
+        return ()
+
+    def extract(self, view, frames, timestamp):
+        size = len(view)
+        start = 0
+        while size - start >= 4:
+            lengths = self.candidate_lengths(view, start)
+            if not lengths:
+                self.framing_errors += 1
+                start += 1
+                continue
+            waiting = False
+            matched = 0
+            # O primeiro tamanho que fecha o CRC vale; o mais curto só quando o
+            # indicado pelo quadro não fecha
+            for length in lengths:
+                if size - start < length:
+                    waiting = True
+                    continue
+                end = start + length
+                if crc16(view[start:end - 2]) == view[end - 2] | (view[end - 1] << 8):
+                    matched = length
+                    break
+            if matched:
+                frames.append(bytes(view[start:start + matched]))
+                start += matched
+            elif waiting:
+                return start
+            else:
+                # Nenhum tamanho fecha o CRC: descarta um byte e ressincroniza
+                self.crc_errors += 1
+                start += 1
+        return start
+
+
+DECODERS = {
+    'delimiter': DelimiterDecoder,
+    'fixed': FixedLengthDecoder,
+    'length': LengthPrefixedDecoder,
+    'slip': SlipDecoder,
+    'cobs': CobsDecoder,
+    'modbus': ModbusRtuDecoder
+}
+
+
+def create_decoder(settings):
+    # None quando o enquadramento está desligado (só texto/blocos)
+    framing = settings.get('framing', 'None')
+    if framing not in DECODERS:
+        return None
+    if framing == 'delimiter':
+        delimiter = escaped_bytes(settings.get('frame_delimiter', '\\n'))
+        return DelimiterDecoder(delimiter or b'\n')
+    if framing == 'fixed':
+        return FixedLengthDecoder(int(settings.get('frame_length', 8)))
+    if framing == 'length':
+        return LengthPrefixedDecoder(settings.get('frame_length_format', '>H'))
+    if framing == 'modbus':
+        return ModbusRtuDecoder(int(settings.get('baudrate', 9600)))
+    return DECODERS[framing]()
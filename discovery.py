@@ -0,0 +1,412 @@
+import sys
+import json
+import time
+import struct
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+import serial
+import serial.tools.list_ports
+
+from decoders import crc16, with_crc
+
+
+# Descoberta de dispositivos Modbus RTU: uma thread por porta, todas ao mesmo
+# tempo. Em cada porta, os endereços mais comuns são testados primeiro em todas
+# as combinações de baud rate/paridade; a que responder é usada para varrer o
+# resto dos endereços. O tempo de espera começa curto (tempo de fio mais uma
+# folga) e se ajusta ao tempo de resposta medido, porque quase todos os
+# endereços de um barramento não respondem e é a espera por eles que domina.
+
+BAUDRATES = (9600, 19200, 38400, 115200)
+PARITIES = ('N', 'E')
+PARITY_NAMES = {'N': 'None', 'E': 'Even', 'O': 'Odd', 'M': 'Mark', 'S': 'Space'}
+QUICK_UNITS = (1, 2, 3, 4, 5, 10, 247)
+
+STATUS_WAITING = 'waiting'
+STATUS_SCANNING = 'scanning'
+STATUS_FOUND = 'found'
+STATUS_NOT_FOUND = 'not_found'
+STATUS_ERROR = 'error'
+STATUS_CANCELLED = 'cancelled'
+
+
+def probe_frame(unit, address=0):
+    # Lê um registrador holding; uma resposta de exceção também prova que a unidade existe
+    return with_crc(struct.pack('>BBHH', unit, 3, address, 1))
+
+
+def wire_time(size, baudrate):
+    # 11 bits por caractere no RTU (start, 8 bits, paridade ou 2º stop, stop)
+    return size * 11 / baudrate
+
+
+def parse_units(text):
+    # "1-247", "1,2,5-10"
+    units = []
+    for part in text.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        first, _, last = part.partition('-')
+        units.extend(range(int(first), int(last or first) + 1))
+    units = [unit for unit in dict.fromkeys(units) if 1 <= unit <= 247]
+    if not units:
+        raise ValueError(f"No unit ids in '{text}'")
+    return units
+
+
+class Response:
+    def __init__(self, unit, rtt, exception=None):
+        self.unit = unit
+        self.rtt = rtt
+        self.exception = exception  # código de exceção Modbus, ou None
+
+    def __repr__(self):
+        rtt = f"{self.rtt * 1000:.1f} ms" if self.rtt is not None else '-'
+        exception = f", exception={self.exception}" if self.exception is not None else ''
+        return f"Response(unit={self.unit}, rtt={rtt}{exception})"
+
+
+class PortScan:
+    def __init__(self, port, baudrates=BAUDRATES, parities=PARITIES, units=range(1, 248), timeout=0.05, max_timeout=0.5, first_only=False):
+        self.port = port
+        self.combos = [(baudrate, parity) for baudrate in baudrates for parity in parities]
+        self.units = list(units)
+        self.guard = timeout  # folga além do tempo de fio antes da primeira resposta
+        self.max_timeout = max_timeout
+        self.first_only = first_only
+        self.cancelled = threading.Event()
+
+        self.status = STATUS_WAITING
+        self.setting = None  # (baud rate, paridade) que respondeu
+        self.found = {}  # unidade -> Response
+        self.max_rtt = None
+        self.noise = 0  # respostas inválidas: outro baud rate/paridade ou colisão
+        self.probes = 0
+        self.total = 0
+        self.error = None
+        self.elapsed = 0.0
+
+    def progress(self):
+        return min(self.probes / self.total, 1.0) if self.total else 0.0
+
+    def timeout(self, baudrate):
+        # Antes da primeira resposta: fio (pergunta + resposta) mais a folga.
+        # Depois: 3x o maior tempo de resposta medido, entre o tempo de fio e max_timeout
+        wire = wire_time(8 + 7, baudrate)
+        if self.max_rtt is None:
+            return wire + self.guard
+        return min(max(3 * self.max_rtt, wire + 0.005), self.max_timeout)
+
+    def run(self):
+        start = time.monotonic()
+        self.status = STATUS_SCANNING
+        try:
+            with serial.Serial(self.port, timeout=0, write_timeout=1) as ser:
+                self.scan(ser)
+        except (serial.SerialException, OSError) as e:
+            logging.error(f"Discovery failed on {self.port}: {e}")
+            self.error = e
+            self.status = STATUS_ERROR
+            return self
+        finally:
+            self.elapsed = time.monotonic() - start
+        if self.cancelled.is_set():
+            self.status = STATUS_CANCELLED
+        else:
+            self.status = STATUS_FOUND if self.found else STATUS_NOT_FOUND
+        return self
+
+    def scan(self, ser):
+        quick = [unit for unit in QUICK_UNITS if unit in self.units]
+        rest = [unit for unit in self.units if unit not in quick]
+        self.total = len(quick) * len(self.combos) + len(rest) * len(self.combos)
+        # 1) endereços comuns em todas as combinações; para na primeira que responder
+        for combo in self.combos:
+            if self.probe_all(ser, combo, quick):
+                self.setting = combo
+                break
+        if self.setting is not None:
+            if self.first_only:
+                return
+            # 2) o resto dos endereços só na combinação encontrada
+            self.total = self.probes + len(rest)
+            self.probe_all(ser, self.setting, rest)
+            return
+        # 2) nada respondeu: todos os endereços em cada combinação, até alguma responder
+        for combo in self.combos:
+            if self.probe_all(ser, combo, rest):
+                self.setting = combo
+                return
+
+    def probe_all(self, ser, combo, units):
+        baudrate, parity = combo
+        try:
+            ser.baudrate = baudrate
+            ser.parity = parity
+        except Exception as e:
+            # Combinação que a porta não aceita (ex.: paridade em um pty): pula só ela
+            logging.error(f"Discovery: {self.port} does not support {baudrate} {parity}: {e}")
+            self.probes += len(units)
+            return False
+        silence = wire_time(4, baudrate)  # 3,5 caracteres entre quadros
+        found = False
+        for unit in units:
+            if self.cancelled.is_set():
+                break
+            response = self.probe(ser, unit, baudrate)
+            self.probes += 1
+            if response is not None:
+                found = True
+                if self.first_only:
+                    break
+            time.sleep(silence)
+        return found
+
+    def probe(self, ser, unit, baudrate):
+        ser.reset_input_buffer()
+        frame = probe_frame(unit)
+        ser.write(frame)
+        sent = time.monotonic()
+        deadline = sent + wire_time(len(frame), baudrate) + self.timeout(baudrate)
+        data = self.read_frame(ser, deadline)
+        if not data:
+            return None
+        rtt = time.monotonic() - sent
+        if len(data) < 5 or crc16(data[:-2]) != int.from_bytes(data[-2:], 'little') or data[1] & 0x7F != 3:
+            self.noise += 1
+            return None
+        responder = data[0]
+        if responder != unit:
+            # Resposta atrasada de uma pergunta anterior: conta a unidade e espera mais
+            self.max_rtt = min(max(self.max_rtt or 0, rtt) * 2, self.max_timeout)
+            rtt = None
+        else:
+            self.max_rtt = rtt if self.max_rtt is None else max(self.max_rtt, rtt)
+        response = Response(responder, rtt, data[2] if data[1] & 0x80 else None)
+        self.found.setdefault(responder, response)
+        return response
+
+    def read_frame(self, ser, deadline):
+        # Cabeçalho de 3 bytes, depois o resto pelo tamanho (exceção: 5 bytes no total)
+        data = bytearray()
+        size = 3
+        while len(data) < size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            ser.timeout = remaining
+            chunk = ser.read(size - len(data))
+            if not chunk:
+                break
+            data += chunk
+            if len(data) >= 3 and size == 3:
+                size = 5 if data[1] & 0x80 else 5 + data[2]
+        return bytes(data)
+
+    def summary(self):
+        setting = None
+        if self.setting is not None:
+            setting = {'baudrate': self.setting[0], 'parity': PARITY_NAMES[self.setting[1]]}
+        return {
+            'port': self.port,
+            'status': self.status,
+            'setting': setting,
+            'units': sorted(self.found),
+            'rtt_ms': round(self.max_rtt * 1000, 1) if self.max_rtt else None,
+            'probes': self.probes,
+            'noise': self.noise,
+            'seconds': round(self.elapsed, 2),
+            'error': str(self.error) if self.error else None
+        }
+
+
+class Discovery:
+    # Todas as portas em paralelo; a interface só lê o estado de cada PortScan
+    def __init__(self, ports, **options):
+        self.scans = [PortScan(port, **options) for port in ports]
+        self.executor = None
+        self.futures = []
+
+    def start(self):
+        self.executor = ThreadPoolExecutor(max_workers=max(len(self.scans), 1), thread_name_prefix="Discovery")
+        self.futures = [self.executor.submit(scan.run) for scan in self.scans]
+        self.executor.shutdown(wait=False)
+
+    @property
+    def done(self):
+        return all(future.done() for future in self.futures)
+
+    def cancel(self):
+        for scan in self.scans:
+            scan.cancelled.set()
+
+    def wait(self, timeout=None):
+        for future in self.futures:
+            future.result(timeout)
+        return self.scans
+
+
+def available_ports():
+    return [port.device for port in serial.tools.list_ports.comports()]
+
+
+class DiscoveryPanel:
+    # Tabela com uma linha por porta; "Usar" preenche a configuração da conexão
+    def __init__(self, master, ports, translate, apply, interval=200):
+        self.master = master
+        self.ports = ports
+        self.translate = translate
+        self.apply = apply  # apply(porta, baud rate, nome da paridade, unidade)
+        self.interval = interval
+        self.discovery = None
+        self.job = None
+        self.rows = {}
+
+        self.baudrates = tk.StringVar(value=','.join(str(baudrate) for baudrate in BAUDRATES))
+        self.parities = tk.StringVar(value=','.join(PARITIES))
+        self.units = tk.StringVar(value='1-247')
+
+        options = ttk.Frame(master)
+        options.pack(padx=5, pady=5, fill=tk.X)
+        ttk.Label(options, text=translate('baudrate')).pack(side=tk.LEFT, padx=5)
+        ttk.Entry(options, textvariable=self.baudrates, width=26).pack(side=tk.LEFT, padx=5)
+        ttk.Label(options, text=translate('parity')).pack(side=tk.LEFT, padx=5)
+        ttk.Entry(options, textvariable=self.parities, width=6).pack(side=tk.LEFT, padx=5)
+        ttk.Label(options, text=translate('unit_ids')).pack(side=tk.LEFT, padx=5)
+        ttk.Entry(options, textvariable=self.units, width=10).pack(side=tk.LEFT, padx=5)
+
+        columns = ('status', 'setting', 'units', 'progress')
+        self.tree = ttk.Treeview(master, columns=columns, height=12)
+        self.tree.heading('#0', text=translate('port'))
+        self.tree.column('#0', width=140)
+        for column, width in zip(columns, (110, 120, 200, 80)):
+            self.tree.heading(column, text=translate(f'scan_{column}'))
+            self.tree.column(column, width=width)
+        self.tree.pack(padx=5, pady=5, fill=tk.BOTH, expand=True)
+        self.tree.bind('<Double-1>', lambda event: self.use_selected())
+
+        buttons = ttk.Frame(master)
+        buttons.pack(padx=5, pady=5, fill=tk.X)
+        self.start_button = ttk.Button(buttons, text=translate('scan_start'), command=self.start)
+        self.start_button.pack(side=tk.LEFT, padx=5)
+        ttk.Button(buttons, text=translate('cancel'), command=self.cancel).pack(side=tk.LEFT, padx=5)
+        ttk.Button(buttons, text=translate('scan_use'), command=self.use_selected).pack(side=tk.LEFT, padx=5)
+        self.summary_label = ttk.Label(buttons, text='')
+        self.summary_label.pack(side=tk.RIGHT, padx=5)
+
+        for port in ports:
+            self.rows[port] = self.tree.insert('', tk.END, text=port, values=(translate(f'scan_{STATUS_WAITING}'), '', '', ''))
+
+    def start(self):
+        if self.discovery is not None and not self.discovery.done:
+            return
+        try:
+            baudrates = [int(baudrate) for baudrate in self.baudrates.get().split(',') if baudrate.strip()]
+            parities = [parity.strip().upper()[:1] for parity in self.parities.get().split(',') if parity.strip()]
+            units = parse_units(self.units.get())
+            if not baudrates or not parities or any(parity not in PARITY_NAMES for parity in parities):
+                raise ValueError(f"{self.baudrates.get()} / {self.parities.get()}")
+        except ValueError as e:
+            messagebox.showerror(self.translate('error'), str(e), parent=self.master)
+            return
+        self.discovery = Discovery(self.ports, baudrates=baudrates, parities=parities, units=units)
+        self.discovery.start()
+        self.start_button.state(['disabled'])
+        self.refresh()
+
+    def cancel(self):
+        if self.discovery is not None:
+            self.discovery.cancel()
+
+    def close(self):
+        self.cancel()
+        if self.job is not None:
+            self.master.after_cancel(self.job)
+            self.job = None
+
+    def refresh(self):
+        self.job = None
+        for scan in self.discovery.scans:
+            setting = f"{scan.setting[0]} {scan.setting[1]}" if scan.setting else ''
+            units = ', '.join(str(unit) for unit in sorted(scan.found))
+            self.tree.item(self.rows[scan.port], values=(
+                self.translate(f'scan_{scan.status}'),
+                setting,
+                units,
+                f"{scan.progress() * 100:.0f}%"
+            ))
+        if self.discovery.done:
+            self.start_button.state(['!disabled'])
+            found = sum(len(scan.found) for scan in self.discovery.scans)
+            seconds = max((scan.elapsed for scan in self.discovery.scans), default=0)
+            self.summary_label.config(text=f"{found} {self.translate('scan_units').lower()} · {seconds:.1f} s")
+            return
+        self.job = self.master.after(self.interval, self.refresh)
+
+    def use_selected(self):
+        selection = self.tree.selection()
+        if not selection or self.discovery is None:
+            return
+        port = self.tree.item(selection[0], 'text')
+        for scan in self.discovery.scans:
+            if scan.port == port and scan.setting is not None:
+                baudrate, parity = scan.setting
+                self.apply(port, baudrate, PARITY_NAMES[parity], min(scan.found) if scan.found else None)
+                return
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="serialuz-discovery", description="Find Modbus RTU devices on all serial ports at once")
+    parser.add_argument("ports", nargs="*", help="ports to scan (default: all ports found)")
+    parser.add_argument("--baudrates", default=','.join(str(baudrate) for baudrate in BAUDRATES))
+    parser.add_argument("--parities", default=','.join(PARITIES), help="N, E, O (comma-separated)")
+    parser.add_argument("--units", default="1-247", help="unit ids, e.g. 1-247 or 1,2,10-20")
+    parser.add_argument("--timeout", type=float, default=0.05, help="seconds to wait beyond the wire time before the first response")
+    parser.add_argument("--first", action="store_true", help="stop each port at the first unit that answers")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    ports = args.ports or available_ports()
+    if not ports:
+        print("No serial ports found", file=sys.stderr)
+        return 1
+    try:
+        options = {
+            'baudrates': [int(baudrate) for baudrate in args.baudrates.split(',')],
+            'parities': [parity.strip().upper() for parity in args.parities.split(',')],
+            'units': parse_units(args.units),
+            'timeout': args.timeout,
+            'first_only': args.first
+        }
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    discovery = Discovery(ports, **options)
+    discovery.start()
+    try:
+        scans = discovery.wait()
+    except KeyboardInterrupt:
+        discovery.cancel()
+        scans = discovery.wait()
+    results = [scan.summary() for scan in scans]
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            setting = f"{result['setting']['baudrate']} {result['setting']['parity']}" if result['setting'] else '-'
+            units = ','.join(str(unit) for unit in result['units']) or '-'
+            print(f"{result['port']}\t{result['status']}\t{setting}\tunits={units}\t{result['seconds']} s")
+    return 0 if any(result['units'] for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,338 @@
+import time
+import base64
+import atexit
+import struct
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import deque
+
+
+# Compartilhamento de uma porta aberta com outros programas: os bytes lidos são
+# repassados por TCP (e opcionalmente WebSocket) a quantos clientes locais
+# houver. publish() só agenda o repasse no loop asyncio, então a recepção nunca
+# espera pela rede. Cada cliente tem a própria fila, limitada em bytes; o que
+# não acompanha é desconectado sem atrasar os outros. Com escrita liberada, um
+# cliente de cada vez pode escrever na porta.
+
+WEBSOCKET_GUID = b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+MAX_MESSAGE = 1024 * 1024  # maior mensagem WebSocket aceita de um cliente
+
+
+def websocket_accept(key):
+    return base64.b64encode(hashlib.sha1(key.encode('ascii') + WEBSOCKET_GUID).digest()).decode('ascii')
+
+
+def websocket_frame(data, opcode=0x2):
+    # Quadro do servidor: final, sem máscara
+    size = len(data)
+    if size < 126:
+        header = struct.pack('!BB', 0x80 | opcode, size)
+    elif size < 65536:
+        header = struct.pack('!BBH', 0x80 | opcode, 126, size)
+    else:
+        header = struct.pack('!BBQ', 0x80 | opcode, 127, size)
+    return header + data
+
+
+class Client:
+    def __init__(self, writer, kind):
+        self.writer = writer
+        self.kind = kind  # 'tcp' ou 'ws'
+        peer = writer.get_extra_info('peername')
+        self.address = f"{peer[0]}:{peer[1]}" if peer else '?'
+        self.chunks = deque()
+        self.queued = 0
+        self.wake = asyncio.Event()
+        self.closed = False
+        self.bytes_sent = 0
+
+
+class FanoutServer:
+    # Um por porta compartilhada; todos rodam no loop do FanoutEngine
+    def __init__(self, name, host='127.0.0.1', port=7700, websocket_port=None, write=None, max_queue=1024 * 1024, write_hold=1.0):
+        self.name = name
+        self.host = host
+        self.port = port
+        self.websocket_port = websocket_port or None
+        self.write = write  # write(bytes) não bloqueante; None = só leitura
+        self.max_queue = max_queue  # bytes à espera por cliente antes de desconectá-lo
+        self.write_hold = write_hold  # segundos sem escrever até outro cliente poder escrever
+        self.engine = None
+        self.servers = []
+        self.clients = set()
+        self.writer_owner = None
+        self.last_write = 0.0
+        self.closed = False
+
+        self.bytes_in = 0  # recebidos da porta
+        self.bytes_sent = 0  # somados sobre todos os clientes
+        self.bytes_written = 0  # de clientes para a porta
+        self.rejected_writes = 0  # bytes recusados porque outro cliente tinha a escrita
+        self.dropped_clients = 0
+        self.connections = 0
+
+    @property
+    def urls(self):
+        urls = [f"tcp://{self.host}:{self.port}"]
+        if self.websocket_port:
+            urls.append(f"ws://{self.host}:{self.websocket_port}")
+        return urls
+
+    def publish(self, data):
+        # Chamado na thread que recebe os dados; nunca bloqueia
+        if self.closed or not self.clients:
+            return
+        self.engine.loop.call_soon_threadsafe(self.broadcast, bytes(data))
+
+    def broadcast(self, data):
+        self.bytes_in += len(data)
+        for client in list(self.clients):
+            if client.queued + len(data) > self.max_queue:
+                # O mais lento sai; os outros continuam no ritmo da porta
+                self.dropped_clients += 1
+                logging.warning(f"Fan-out {self.name}: dropping slow client {client.address} ({client.queued} bytes queued)")
+                self.drop(client)
+                continue
+            client.chunks.append(data)
+            client.queued += len(data)
+            client.wake.set()
+
+    def drop(self, client):
+        if client.closed:
+            return
+        client.closed = True
+        self.clients.discard(client)
+        client.wake.set()
+        client.writer.transport.abort()
+        if self.writer_owner is client:
+            self.writer_owner = None
+
+    async def open(self):
+        # Porta 0: a que o sistema escolher
+        server = await asyncio.start_server(self.handle_tcp, self.host, self.port)
+        self.servers.append(server)
+        self.port = self.port or server.sockets[0].getsockname()[1]
+        if self.websocket_port:
+            self.servers.append(await asyncio.start_server(self.handle_websocket, self.host, self.websocket_port))
+
+    async def shutdown(self):
+        for server in self.servers:
+            server.close()
+        for client in list(self.clients):
+            self.drop(client)
+        for server in self.servers:
+            await server.wait_closed()
+        self.servers = []
+
+    def close(self):
+        if self.engine is not None:
+            self.engine.remove(self)
+
+    async def handle_tcp(self, reader, writer):
+        await self.serve(Client(writer, 'tcp'), self.read_tcp(reader))
+
+    async def handle_websocket(self, reader, writer):
+        try:
+            request = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), 5)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ConnectionError):
+            writer.close()
+            return
+        headers = {}
+        for line in request.decode('latin-1').split('\r\n')[1:]:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        key = headers.get('sec-websocket-key')
+        if not key or 'websocket' not in headers.get('upgrade', '').lower():
+            writer.write(b'HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n\r\n')
+            writer.close()
+            return
+        writer.write((
+            'HTTP/1.1 101 Switching Protocols\r\n'
+            'Upgrade: websocket\r\n'
+            'Connection: Upgrade\r\n'
+            f'Sec-WebSocket-Accept: {websocket_accept(key)}\r\n\r\n'
+        ).encode('ascii'))
+        await self.serve(Client(writer, 'ws'), self.read_websocket(reader, writer))
+
+    async def serve(self, client, messages):
+        if self.closed:
+            client.writer.close()
+            return
+        self.clients.add(client)
+        self.connections += 1
+        logging.info(f"Fan-out {self.name}: {client.kind} client {client.address} connected")
+        sender = asyncio.ensure_future(self.send(client))
+        try:
+            async for data in messages:
+                self.receive(client, data)
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError) as e:
+            logging.info(f"Fan-out {self.name}: {client.address}: {e}")
+        finally:
+            self.drop(client)
+            sender.cancel()
+            logging.info(f"Fan-out {self.name}: {client.address} disconnected ({client.bytes_sent} bytes sent)")
+
+    async def send(self, client):
+        # Tudo o que se acumulou desde a última escrita vai de uma vez
+        writer = client.writer
+        try:
+            while not client.closed:
+                await client.wake.wait()
+                client.wake.clear()
+                if client.closed or not client.chunks:
+                    continue
+                data = client.chunks[0] if len(client.chunks) == 1 else b''.join(client.chunks)
+                client.chunks.clear()
+                client.queued = 0
+                writer.write(websocket_frame(data) if client.kind == 'ws' else data)
+                client.bytes_sent += len(data)
+                self.bytes_sent += len(data)
+                await writer.drain()
+        except ConnectionError:
+            self.drop(client)
+
+    def receive(self, client, data):
+        # Arbitragem: quem escreveu por último mantém a porta até ficar
+        # write_hold segundos sem escrever
+        if not data:
+            return
+        now = time.monotonic()
+        if self.write is None:
+            self.rejected_writes += len(data)
+            return
+        owner = self.writer_owner
+        if owner is not None and owner is not client and now - self.last_write < self.write_hold:
+            self.rejected_writes += len(data)
+            return
+        if owner is not client:
+            logging.info(f"Fan-out {self.name}: {client.address} is now writing to the port")
+        self.writer_owner = client
+        self.last_write = now
+        self.bytes_written += len(data)
+        try:
+            self.write(data)
+        except Exception as e:
+            logging.error(f"Fan-out {self.name}: error writing to the port: {e}")
+
+    async def read_tcp(self, reader):
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                return
+            yield data
+
+    async def read_websocket(self, reader, writer):
+        # Mensagens de texto ou binárias viram bytes para a porta
+        while True:
+            head = await reader.readexactly(2)
+            opcode = head[0] & 0x0F
+            masked = head[1] & 0x80
+            size = head[1] & 0x7F
+            if size == 126:
+                size, = struct.unpack('!H', await reader.readexactly(2))
+            elif size == 127:
+                size, = struct.unpack('!Q', await reader.readexactly(8))
+            if size > MAX_MESSAGE:
+                raise ValueError(f"WebSocket message too large ({size} bytes)")
+            mask = await reader.readexactly(4) if masked else b''
+            payload = await reader.readexactly(size)
+            if mask and payload:
+                # XOR da mensagem inteira como um inteiro só
+                key = (mask * (size // 4 + 1))[:size]
+                payload = (int.from_bytes(payload, 'big') ^ int.from_bytes(key, 'big')).to_bytes(size, 'big')
+            if opcode == 0x8:
+                writer.write(websocket_frame(payload[:2], 0x8))
+                return
+            if opcode == 0x9:
+                writer.write(websocket_frame(payload, 0xA))
+            elif opcode in (0x0, 0x1, 0x2):
+                yield payload
+
+    def stats(self):
+        return {
+            'clients': len(self.clients),
+            'connections': self.connections,
+            'bytes_in': self.bytes_in,
+            'bytes_sent': self.bytes_sent,
+            'bytes_written': self.bytes_written,
+            'rejected_writes': self.rejected_writes,
+            'dropped_clients': self.dropped_clients
+        }
+
+
+class FanoutEngine:
+    # Um loop asyncio em segundo plano para todos os servidores
+    def __init__(self):
+        self.loop = None
+        self.thread = None
+        self.servers = set()
+        self.ready = threading.Event()
+
+    def start(self):
+        if self.thread is not None:
+            return
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.run, name="Fanout", daemon=True)
+        self.thread.start()
+        self.ready.wait()
+        atexit.register(self.stop)
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(self.ready.set)
+        self.loop.run_forever()
+
+    def add(self, server, timeout=5):
+        # OSError se a porta TCP já estiver em uso
+        self.start()
+        server.engine = self
+        asyncio.run_coroutine_threadsafe(server.open(), self.loop).result(timeout)
+        self.servers.add(server)
+        return server
+
+    def remove(self, server, timeout=2):
+        if server not in self.servers:
+            return
+        self.servers.discard(server)
+        server.closed = True
+        try:
+            asyncio.run_coroutine_threadsafe(server.shutdown(), self.loop).result(timeout)
+        except Exception as e:
+            logging.error(f"Error stopping fan-out server {server.name}: {e}")
+
+    def stop(self, timeout=2):
+        atexit.unregister(self.stop)
+        if self.thread is None:
+            return
+        for server in list(self.servers):
+            self.remove(server, timeout)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout)
+        self.thread = None
+        self.ready.clear()
+
+
+engine = None
+
+
+def get_fanout():
+    global engine
+    if engine is None:
+        engine = FanoutEngine()
+    return engine
+
+
+def serve(name, host='127.0.0.1', port=7700, websocket_port=None, write=None, search=1, **options):
+    # Abre o servidor na primeira porta livre entre port e port + search - 1
+    error = None
+    for offset in range(max(search, 1)):
+        websocket = websocket_port + offset if websocket_port else None
+        server = FanoutServer(name, host, port + offset, websocket, write, **options)
+        try:
+            return get_fanout().add(server)
+        except OSError as e:
+            error = e
+            asyncio.run_coroutine_threadsafe(server.shutdown(), get_fanout().loop).result(2)
+    raise error
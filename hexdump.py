@@ -0,0 +1,193 @@
+import os
+import mmap
+import bisect
+import tkinter as tk
+import tkinter.font as tkfont
+from tkinter import ttk
+
+from recorder import CaptureReader, MAGIC, RECORD, RECORD_DATA
+
+
+# Bytes imprimíveis ficam como estão na coluna ASCII; o resto vira '.'
+ASCII_TABLE = bytes(byte if 0x20 <= byte < 0x7F else 0x2E for byte in range(256))
+
+
+def hexdump_lines(data, offset=0, width=16):
+    # Formata por linha, não por byte: o hex e o ASCII do bloco inteiro são
+    # gerados de uma vez em C (bytes.hex / bytes.translate) e só fatiados aqui
+    data = bytes(data)
+    if not data:
+        return []
+    hexed = data.hex(' ') + ' '
+    text = data.translate(ASCII_TABLE).decode('ascii')
+    step = width * 3
+    column = step - 1
+    lines = []
+    for start in range(0, len(data), width):
+        row = start // width
+        lines.append(f"{offset + start:08x}  {hexed[row * step:(row + 1) * step - 1]:<{column}}  |{text[start:start + width]}|")
+    return lines
+
+
+def hexdump(data, offset=0, width=16):
+    return '\n'.join(hexdump_lines(data, offset, width))
+
+
+class HexDumper:
+    # Formata um fluxo contínuo: o offset segue de um bloco para o outro, e os
+    # bytes que não fecham uma linha esperam o próximo bloco, então toda linha
+    # tem 'width' bytes como num hexdump do arquivo inteiro
+    def __init__(self, width=16, chunk_size=64 * 1024):
+        self.width = max(int(width), 1)
+        # Múltiplo da largura, para as linhas não quebrarem entre pedaços
+        self.chunk_size = max(chunk_size // self.width, 1) * self.width
+        self.offset = 0
+        self.pending = b''
+
+    def format(self, data):
+        data = self.pending + bytes(data)
+        complete = len(data) - len(data) % self.width
+        self.pending = data[complete:]
+        lines = []
+        for start in range(0, complete, self.chunk_size):
+            block = data[start:min(start + self.chunk_size, complete)]
+            lines.extend(hexdump_lines(block, self.offset, self.width))
+            self.offset += len(block)
+        return '\n'.join(lines) + '\n' if lines else ''
+
+    def flush(self):
+        # Última linha incompleta (ao desconectar)
+        lines = hexdump_lines(self.pending, self.offset, self.width)
+        self.offset += len(self.pending)
+        self.pending = b''
+        return '\n'.join(lines) + '\n' if lines else ''
+
+    def reset(self):
+        self.offset = 0
+        self.pending = b''
+
+
+class FileSource:
+    # Arquivo binário qualquer, mapeado em memória
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        size = os.fstat(self.file.fileno()).st_size
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+
+    def __len__(self):
+        return len(self.data)
+
+    def read(self, offset, size):
+        return self.data[offset:offset + size]
+
+    def close(self):
+        if self.data:
+            self.data.close()
+        self.file.close()
+
+
+class CaptureSource:
+    # Bytes recebidos de uma captura .slzcap, concatenados na ordem de chegada;
+    # só os offsets dos registros ficam em memória
+    def __init__(self, path, port=None):
+        self.capture = CaptureReader(path)
+        self.starts = []
+        self.positions = []
+        self.lengths = []
+        size = 0
+        for offset, kind, timestamp, port_id, length in self.capture.scan(self.capture.first_offset):
+            if kind != RECORD_DATA or not length:
+                continue
+            if port is not None and self.capture.ports.get(port_id) != port:
+                continue
+            self.starts.append(size)
+            self.positions.append(offset + RECORD.size)
+            self.lengths.append(length)
+            size += length
+        self.size = size
+
+    def __len__(self):
+        return self.size
+
+    def read(self, offset, size):
+        out = bytearray()
+        index = bisect.bisect_right(self.starts, offset) - 1
+        while 0 <= index < len(self.starts) and len(out) < size:
+            begin = self.positions[index] + offset + len(out) - self.starts[index]
+            end = self.positions[index] + self.lengths[index]
+            out += self.capture.data[begin:min(end, begin + size - len(out))]
+            index += 1
+        return bytes(out)
+
+    def close(self):
+        self.capture.close()
+
+
+def open_hex_source(path):
+    with open(path, 'rb') as f:
+        head = f.read(len(MAGIC))
+    if head == MAGIC:
+        return CaptureSource(path)
+    return FileSource(path)
+
+
+class HexView:
+    # Visualização preguiçosa: só as linhas visíveis são lidas e formatadas,
+    # então o tamanho do arquivo não pesa na rolagem
+    def __init__(self, master, source, width=16):
+        self.master = master
+        self.source = source
+        self.width = max(int(width), 1)
+        self.first_row = 0
+        self.visible_rows = 1
+
+        frame = ttk.Frame(master)
+        frame.pack(fill=tk.BOTH, expand=True)
+        self.font = tkfont.Font(family="Courier", size=10)
+        self.text = tk.Text(frame, font=self.font, wrap=tk.NONE, state=tk.DISABLED)
+        self.scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=self.on_scroll)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.text.bind("<Configure>", lambda event: self.render())
+        self.text.bind("<MouseWheel>", self.on_wheel)
+        self.text.bind("<Button-4>", lambda event: self.scroll_to(self.first_row - 3))
+        self.text.bind("<Button-5>", lambda event: self.scroll_to(self.first_row + 3))
+        self.text.bind("<Prior>", lambda event: self.scroll_to(self.first_row - self.visible_rows))
+        self.text.bind("<Next>", lambda event: self.scroll_to(self.first_row + self.visible_rows))
+
+    @property
+    def rows(self):
+        return (len(self.source) + self.width - 1) // self.width
+
+    def on_scroll(self, action, amount, unit=None):
+        if action == tk.MOVETO:
+            self.scroll_to(int(float(amount) * self.rows))
+        elif action == tk.SCROLL:
+            step = self.visible_rows if unit == tk.PAGES else 1
+            self.scroll_to(self.first_row + int(amount) * step)
+
+    def on_wheel(self, event):
+        self.scroll_to(self.first_row - int(event.delta / 120) * 3)
+
+    def scroll_to(self, row):
+        self.first_row = max(0, min(row, self.rows - self.visible_rows))
+        self.render()
+        return "break"
+
+    def set_width(self, width):
+        offset = self.first_row * self.width
+        self.width = max(int(width), 1)
+        self.scroll_to(offset // self.width)
+
+    def render(self):
+        line_height = max(self.font.metrics('linespace'), 1)
+        self.visible_rows = max(self.text.winfo_height() // line_height, 1)
+        offset = self.first_row * self.width
+        data = self.source.read(offset, self.visible_rows * self.width)
+        self.text.config(state=tk.NORMAL)
+        self.text.delete('1.0', tk.END)
+        self.text.insert('1.0', hexdump(data, offset, self.width))
+        self.text.config(state=tk.DISABLED)
+        rows = max(self.rows, 1)
+        self.scrollbar.set(self.first_row / rows, (self.first_row + self.visible_rows) / rows)
@@ -1,17 +1,34 @@
+import time
+START_TIME = time.perf_counter()
+
 import tkinter as tk
-from tkinter import ttk, scrolledtext, messagebox
+from tkinter import ttk, scrolledtext, messagebox, filedialog
 from tkinter import PhotoImage, Toplevel, Label
 import serial
 import serial.tools.list_ports
 import json
 import os
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.animation import FuncAnimation
+import math
+import struct
 import sys
-from pymodbus.client import ModbusSerialClient as ModbusClient
 import logging
-from contator import Contator
+import queue
+import numpy as np
+from ring_buffer import minmax_decimate
+from render_scheduler import RenderScheduler
+from console import ReceiveConsole
+from recorder import CaptureRecorder, CAPTURE_EXTENSION
+from replay import is_replay_url, replay_url, ReplaySerial
+from sessions import SessionManager
+from decoders import DECODERS, DelimiterDecoder, create_decoder
+from settings import load_settings_file, save_settings_file, serial_options, escaped_bytes, DEFAULT_SETTINGS
+from transmit import Transmitter, data_job, file_job, script_job
+from pyramid import MinMaxPyramid
+from translations import load_translations
+from metrics import get_metrics, StreamMetrics, Histogram, Counter
+
+# Matplotlib, Modbus (asyncio/pymodbus), hexdump e o Contator são importados
+# só no primeiro uso: a janela abre sem esperar por eles
 
 
 # Configuração básica de logging
@@ -22,10 +39,11 @@ class SeriaLuz:
     def __init__(self, root, lang="pt-br"):
         self.root = root
         self.translations = {}
+        self.images = {}  # caminho -> PhotoImage, lido do disco uma vez
         self.load_language(lang)
         self.root.title(self.translate('title'))
         self.root.iconbitmap("img/icons/logo.ico")
-        self.root.iconphoto(False, tk.PhotoImage(file='img/logo.png'))
+        self.root.iconphoto(False, self.load_image('img/logo.png'))
 
         self.lang = lang
         
@@ -47,21 +65,73 @@ class SeriaLuz:
         self.parity = tk.StringVar(value="None")
         self.stop_bits = tk.StringVar(value="1")
         self.flow_control = tk.StringVar(value="None")
+        self.graph_window = tk.StringVar(value="1000")
+        self.console_lines = tk.StringVar(value="5000")
+        self.console_pause = tk.BooleanVar(value=True)
+        self.framing = tk.StringVar(value="None")
+        self.hex_width = tk.StringVar(value="16")
+        self.active_session = tk.StringVar()
+        self.tile_graphs = tk.BooleanVar(value=False)
+        self.tx_chunk_size = tk.StringVar(value="1024")
+        self.tx_chunk_delay = tk.StringVar(value="0")
+        self.tx_line_delay = tk.StringVar(value="0")
+        self.tx_line_ending = tk.StringVar(value="\\r\\n")
+        self.transmit_job = None
+        self.analysis_window = None
+        self.history_window = None
+        self.tags_window = None
+        self.tag_table = None
+        self.discovery_window = None
+        self.trigger_window = None
+        self.trigger_panel = None
+        self.trigger_job = None
+        self.store_samples = tk.BooleanVar(value=False)
+        self.store = None  # storage.SampleStore enquanto a gravação no banco está ligada
+        self.share_ports = tk.BooleanVar(value=False)
+        self.keep_history = tk.BooleanVar(value=False)
+        self.fanout_job = None
+
+        # Portas abertas; cada uma com leitor, buffer e decodificadores próprios
+        self.poll_interval = 50  # ms entre leituras do buffer das threads de recepção
+        self.sessions = SessionManager(self.root, self.poll_interval)
+        self.graph_sessions = []
+
+        # Contadores e histogramas dos caminhos quentes; o painel de status só
+        # os lê enquanto está visível
+        self.metrics = get_metrics()
+        self.status_interval = 1000  # ms
+        self.status_job = None
+        self.status_items = {}  # chave da métrica -> item da árvore
+        self.status_previous = {}  # chave da métrica -> (instante, valor), para a taxa
+        self.metrics_job = None
+        self.modbus_updates = self.metrics.counter('modbus_updates_total', 'Modbus value updates shown', window='main')
+        self.modbus_read_errors = self.metrics.counter('modbus_read_errors_total', 'Modbus read errors shown', window='main')
 
         # Configurar elementos da interface
         self.create_widgets()
 
         # Variáveis de estado
-        self.ser = None
-        self.modbus_client = None
-        self.modbus_connected = False
+        self.modbus_events = queue.Queue()
+        self.modbus_job = None
+
+        self.recorder = None
+        self.settings = dict(DEFAULT_SETTINGS)
 
-        # Dados para o gráfico
-        self.data_x = []
-        self.data_y = []
+        # Consumidores dos dados recebidos, chamados na thread do Tk com a sessão de origem
+        self.data_listeners = [self.fanout_data, self.record_data, self.receive_data, self.handle_graph_data, self.trigger_data]
+        self.sessions.listeners = self.data_listeners
+        self.sessions.on_error = self.session_error
 
         # Carregar configurações salvas
         self.load_settings()
+        self.resize_graph_window()
+        self.apply_console_settings()
+        self.apply_store_settings()
+        self.export_metrics()
+        self.port.trace_add('write', lambda *args: self.update_connection_status())
+
+        # Tempo desde a importação do main.py até a janela pronta para eventos
+        self.root.after_idle(lambda: logging.info(f"Startup took {time.perf_counter() - START_TIME:.2f} s"))
 
     def create_widgets(self):
         notebook = ttk.Notebook(self.root)
@@ -69,12 +139,25 @@ class SeriaLuz:
 
         tab1 = ttk.Frame(notebook)
         tab2 = ttk.Frame(notebook)
+        tab3 = ttk.Frame(notebook)
 
         notebook.add(tab1, text=self.translate('settings'))
         notebook.add(tab2, text=self.translate('send_receive'))
+        notebook.add(tab3, text=self.translate('status'))
 
         self.create_config_tab(tab1)
         self.create_send_receive_tab(tab2)
+        self.create_status_tab(tab3)
+
+        self.notebook = notebook
+        self.status_tab = tab3
+        self.graph_tab = tab2
+        notebook.bind("<<NotebookTabChanged>>", lambda event: self.on_tab_changed())
+
+    def on_tab_changed(self):
+        if self.notebook.select() == str(self.graph_tab):
+            self.build_graph()
+        self.refresh_status()
 
     def teste(self, tab):
         self.create_advanced_settings_tab(tab)
@@ -96,6 +179,14 @@ class SeriaLuz:
         update_ports_button = ttk.Button(config_frame, text=self.translate("update_ports"), command=self.update_ports)
         update_ports_button.grid(column=2, row=0, padx=5, pady=5)
 
+        # Reproduzir uma captura no lugar da porta serial
+        replay_button = ttk.Button(config_frame, text=self.translate("replay"), command=self.select_replay)
+        replay_button.grid(column=3, row=0, padx=5, pady=5)
+
+        # Procura dispositivos Modbus em todas as portas
+        scan_button = ttk.Button(config_frame, text=self.translate("scan_ports"), command=self.show_discovery)
+        scan_button.grid(column=4, row=0, padx=5, pady=5)
+
         # Baudrate
         ttk.Label(config_frame, text=self.translate("baudrate")).grid(column=0, row=1, sticky=tk.W, padx=5, pady=5)
         baudrate_entry = ttk.Entry(config_frame, textvariable=self.baudrate)
@@ -135,16 +226,39 @@ class SeriaLuz:
         flow_control_menu.grid(column=1, row=7, padx=5, pady=5, sticky=tk.W)
         self.create_info_icon(config_frame, self.translate("flow_control_info")).grid(column=2, row=7, padx=5, pady=5)
 
+        # Janela do gráfico (amostras)
+        ttk.Label(config_frame, text=self.translate("graph_window")).grid(column=0, row=8, sticky=tk.W, padx=5, pady=5)
+        graph_window_entry = ttk.Entry(config_frame, textvariable=self.graph_window)
+        graph_window_entry.grid(column=1, row=8, padx=5, pady=5, sticky=tk.W)
+        self.create_info_icon(config_frame, self.translate("graph_window_info")).grid(column=2, row=8, padx=5, pady=5)
+
+        # Limite de linhas do console de recebimento
+        ttk.Label(config_frame, text=self.translate("console_lines")).grid(column=0, row=9, sticky=tk.W, padx=5, pady=5)
+        console_lines_entry = ttk.Entry(config_frame, textvariable=self.console_lines)
+        console_lines_entry.grid(column=1, row=9, padx=5, pady=5, sticky=tk.W)
+        self.create_info_icon(config_frame, self.translate("console_lines_info")).grid(column=2, row=9, padx=5, pady=5)
+
+        # Enquadramento dos dados binários recebidos
+        ttk.Label(config_frame, text=self.translate("framing")).grid(column=0, row=10, sticky=tk.W, padx=5, pady=5)
+        framing_menu = ttk.Combobox(config_frame, textvariable=self.framing, values=["None"] + list(DECODERS))
+        framing_menu.grid(column=1, row=10, padx=5, pady=5, sticky=tk.W)
+        self.create_info_icon(config_frame, self.translate("framing_info")).grid(column=2, row=10, padx=5, pady=5)
+
+        # Bytes por linha no modo hexadecimal
+        ttk.Label(config_frame, text=self.translate("hex_width")).grid(column=0, row=11, sticky=tk.W, padx=5, pady=5)
+        hex_width_menu = ttk.Combobox(config_frame, textvariable=self.hex_width, values=["8", "16", "32"])
+        hex_width_menu.grid(column=1, row=11, padx=5, pady=5, sticky=tk.W)
+
         # Botões de conectar e salvar configurações
         self.connect_button = ttk.Button(config_frame, text=self.translate("connect"), command=self.toggle_connection)
-        self.connect_button.grid(column=0, row=8, pady=10, padx=5, sticky=tk.W)
+        self.connect_button.grid(column=0, row=12, pady=10, padx=5, sticky=tk.W)
 
         save_button = ttk.Button(config_frame, text=self.translate("save_settings"), command=self.save_settings)
-        save_button.grid(column=1, row=8, pady=10, padx=5, sticky=tk.W)
+        save_button.grid(column=1, row=12, pady=10, padx=5, sticky=tk.W)
 
         # Indicador de status de conexão
         self.status_label = ttk.Label(config_frame, text=self.translate("disconnected"), foreground="red")
-        self.status_label.grid(column=2, row=8, padx=5)
+        self.status_label.grid(column=2, row=12, padx=5)
 
 
     def create_advanced_settings_tab(self, tab):
@@ -224,6 +338,28 @@ class SeriaLuz:
         send_button = ttk.Button(send_frame, text=self.translate("send"), command=self.send_data)
         send_button.grid(column=1, row=0, padx=5, pady=5)
 
+        # Envio de arquivos e roteiros em blocos, com pausas entre blocos/linhas
+        options_frame = ttk.Frame(send_frame)
+        options_frame.grid(column=0, row=1, columnspan=2, sticky=tk.W)
+        for column, (key, variable) in enumerate((
+            ("chunk_size", self.tx_chunk_size),
+            ("chunk_delay", self.tx_chunk_delay),
+            ("line_delay", self.tx_line_delay),
+            ("line_ending", self.tx_line_ending)
+        )):
+            ttk.Label(options_frame, text=self.translate(key)).grid(column=column * 2, row=0, padx=(5, 2), pady=2, sticky=tk.W)
+            ttk.Entry(options_frame, textvariable=variable, width=7).grid(column=column * 2 + 1, row=0, padx=(0, 5), pady=2)
+
+        transfer_frame = ttk.Frame(send_frame)
+        transfer_frame.grid(column=0, row=2, columnspan=2, sticky=tk.EW)
+        ttk.Button(transfer_frame, text=self.translate("send_file"), command=self.send_file).pack(side=tk.LEFT, padx=5, pady=5)
+        ttk.Button(transfer_frame, text=self.translate("send_script"), command=self.send_script).pack(side=tk.LEFT, padx=5, pady=5)
+        ttk.Button(transfer_frame, text=self.translate("cancel"), command=self.cancel_transmit).pack(side=tk.LEFT, padx=5, pady=5)
+        self.transmit_progress = ttk.Progressbar(transfer_frame, length=120, maximum=100)
+        self.transmit_progress.pack(side=tk.LEFT, padx=5, pady=5)
+        self.transmit_label = ttk.Label(transfer_frame, text="")
+        self.transmit_label.pack(side=tk.LEFT, padx=5, pady=5)
+
         # Frame de recebimento com cor de fundo
         receive_frame = ttk.LabelFrame(tab, text=self.translate("receive_data"))
         receive_frame.pack(padx=10, pady=10, fill="both", expand=True)
@@ -231,6 +367,8 @@ class SeriaLuz:
 
         self.receive_text = scrolledtext.ScrolledText(receive_frame, width=60, height=10, state='disabled')
         self.receive_text.pack(padx=5, pady=5, fill="both", expand=True)
+        # Atualizações agrupadas, uma por ciclo da interface
+        self.console = ReceiveConsole(self.receive_text, self.root)
 
         # Alinhar botões na parte inferior do frame de recebimento
         button_frame = ttk.Frame(receive_frame)
@@ -242,148 +380,821 @@ class SeriaLuz:
         modbus_button = ttk.Button(button_frame, text="Contator", command=self.show_contator)
         modbus_button.pack(side=tk.LEFT, padx=5, pady=5)
 
+        tags_button = ttk.Button(button_frame, text=self.translate("modbus_tags"), command=self.show_tags)
+        tags_button.pack(side=tk.LEFT, padx=5, pady=5)
+
+        self.record_button = ttk.Button(button_frame, text=self.translate("record"), command=self.toggle_recording)
+        self.record_button.pack(side=tk.LEFT, padx=5, pady=5)
+
+        hex_view_button = ttk.Button(button_frame, text=self.translate("hex_view"), command=self.show_hex_view)
+        hex_view_button.pack(side=tk.LEFT, padx=5, pady=5)
+
+        analysis_button = ttk.Button(button_frame, text=self.translate("analysis"), command=self.show_analysis)
+        analysis_button.pack(side=tk.LEFT, padx=5, pady=5)
+
+        history_button = ttk.Button(button_frame, text=self.translate("history"), command=self.show_history)
+        history_button.pack(side=tk.LEFT, padx=5, pady=5)
+
+        triggers_button = ttk.Button(button_frame, text=self.translate("triggers"), command=self.show_triggers)
+        triggers_button.pack(side=tk.LEFT, padx=5, pady=5)
+
+        pause_check = ttk.Checkbutton(button_frame, text=self.translate("pause_on_scroll"), variable=self.console_pause, command=self.apply_console_settings)
+        pause_check.pack(side=tk.LEFT, padx=5, pady=5)
+
+        # Sessão mostrada no console e no gráfico
+        session_frame = ttk.Frame(receive_frame)
+        session_frame.pack(padx=5, pady=(0, 5), fill="x")
+        ttk.Label(session_frame, text=self.translate("session")).pack(side=tk.LEFT, padx=5)
+        self.session_menu = ttk.Combobox(session_frame, textvariable=self.active_session, state="readonly", width=30)
+        self.session_menu.pack(side=tk.LEFT, padx=5)
+        self.session_menu.bind("<<ComboboxSelected>>", lambda event: self.select_session(self.active_session.get()))
+        tile_check = ttk.Checkbutton(session_frame, text=self.translate("tile_graphs"), variable=self.tile_graphs, command=self.layout_graphs)
+        tile_check.pack(side=tk.LEFT, padx=5)
+        store_check = ttk.Checkbutton(session_frame, text=self.translate("store_samples"), variable=self.store_samples, command=self.apply_store_settings)
+        store_check.pack(side=tk.LEFT, padx=5)
+        share_check = ttk.Checkbutton(session_frame, text=self.translate("share_ports"), variable=self.share_ports, command=self.apply_fanout_settings)
+        share_check.pack(side=tk.LEFT, padx=5)
+        history_check = ttk.Checkbutton(session_frame, text=self.translate("keep_history"), variable=self.keep_history, command=self.apply_history_settings)
+        history_check.pack(side=tk.LEFT, padx=5)
+
         # Frame do gráfico com cor de fundo
         graph_frame = ttk.LabelFrame(tab, text=self.translate("real_time_graph"))
         graph_frame.pack(padx=10, pady=10, fill="both", expand=True)
         graph_frame.configure(style="Custom.TLabelframe")
 
-        self.fig, self.ax = plt.subplots()
-        self.line, = self.ax.plot([], [], 'r-')
-        self.canvas = FigureCanvasTkAgg(self.fig, master=graph_frame)
-        self.canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=1)
+        # A figura só é criada quando a aba é aberta (build_graph); até lá as
+        # amostras continuam indo para o buffer de cada sessão
+        self.graph_frame = graph_frame
+        self.fig = None
+        self.canvas = None
+        self.render_scheduler = None
 
-        self.ani = FuncAnimation(self.fig, self.update_graph, init_func=self.init_graph, blit=True, cache_frame_data=False)
+    def build_graph(self):
+        if self.fig is not None:
+            return
+        start = time.perf_counter()
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
+        # Uma figura para todas as sessões: um eixo por sessão exibida
+        self.fig = Figure()
+        self.canvas = FigureCanvasTkAgg(self.fig, master=self.graph_frame)
+        self.canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=1)
+
+        # Só redesenha quando chegam amostras novas; o blit cobre a figura inteira
+        self.render_scheduler = RenderScheduler(self.root, self.canvas, self.fig, self.update_graph)
+        self.render_scheduler.draw_time = self.metrics.histogram('draw_seconds', 'Time to draw one graph frame')
+        self.metrics.gauge('frame_rate', 'Graph frame rate limit (frames/s)', lambda: self.render_scheduler.fps)
+        self.layout_graphs()
+        logging.info(f"Graph built in {time.perf_counter() - start:.2f} s")
+
+    def create_status_tab(self, tab):
+        status_frame = ttk.LabelFrame(tab, text=self.translate("status"))
+        status_frame.pack(padx=10, pady=10, fill="both", expand=True)
+        status_frame.configure(style="Custom.TLabelframe")
+
+        tree_frame = ttk.Frame(status_frame)
+        tree_frame.pack(padx=5, pady=5, fill="both", expand=True)
+        self.status_tree = ttk.Treeview(tree_frame, columns=("value", "rate"))
+        self.status_tree.heading("#0", text=self.translate("metric"))
+        self.status_tree.heading("value", text=self.translate("value"))
+        self.status_tree.heading("rate", text=self.translate("rate"))
+        self.status_tree.column("#0", width=280)
+        self.status_tree.column("value", width=200)
+        self.status_tree.column("rate", width=100, anchor=tk.E)
+        scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.status_tree.yview)
+        self.status_tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.status_tree.pack(side=tk.LEFT, fill="both", expand=True)
+
+        export_button = ttk.Button(status_frame, text=self.translate("export_metrics"), command=self.export_metrics_as)
+        export_button.pack(padx=5, pady=5, anchor=tk.W)
+
+
+    @property
+    def ser(self):
+        # Porta da sessão ativa (envio, Modbus)
+        session = self.sessions.get(self.active_session.get())
+        return session.ser if session else None
 
     def toggle_connection(self):
-        if self.ser and self.ser.is_open:
-            self.disconnect()
+        # O botão abre ou fecha a porta escolhida; as outras sessões continuam abertas
+        if self.port.get() in self.sessions:
+            self.disconnect(self.port.get())
         else:
             self.connect()
 
     def connect(self):
+        settings = self.collect_settings()
         try:
-            self.ser = serial.Serial(
-                port=self.port.get(),
-                baudrate=self.baudrate.get(),
-                bytesize=int(self.data_bits.get()),
-                parity=self.parity.get()[0],
-                stopbits=float(self.stop_bits.get()),
-                xonxoff=(self.flow_control.get() == "XON/XOFF"),
-                rtscts=(self.flow_control.get() == "RTS/CTS"),
-                timeout=1
-            )
-            self.status_label.config(text=self.translate("connected"), foreground="green")
-            self.connect_button.config(text=self.translate("disconnect"))
-
-            if self.protocol.get() == "Modbus":
-                self.modbus_client = ModbusClient(method='rtu', port=self.ser.port, baudrate=self.ser.baudrate)
-                self.modbus_connected = self.modbus_client.connect()
-
-        except serial.SerialException as e:
+            decoder = create_decoder(settings)
+            session = self.sessions.open(settings['port'], serial_options(settings), self.graph_window_size(), decoder)
+        except (serial.SerialException, OSError, ValueError, struct.error) as e:
             messagebox.showerror(self.translate("error"), str(e))
-
-    def disconnect(self):
-        if self.ser:
-            self.ser.close()
-            self.ser = None
-        if self.modbus_client:
-            self.modbus_client.close()
-            self.modbus_connected = False
-
-        self.status_label.config(text=self.translate("disconnected"), foreground="red")
-        self.connect_button.config(text=self.translate("connect"))
+            return
+        from hexdump import HexDumper
+        session.hex_dumper = HexDumper(self.hex_width_size())
+        session.metrics = StreamMetrics(self.metrics, session.reader, decoder, session=session.name)
+        session.transmitter = Transmitter(session.ser)
+        session.transmitter.bytes_out = session.metrics.bytes_out
+        if self.keep_history.get():
+            session.history = self.create_history(settings)
+        session.triggers = self.create_triggers(session, settings)
+        if self.share_ports.get():
+            self.start_fanout(session, settings)
+        self.apply_console_settings()
+        self.select_session(session.name)
+        if self.protocol.get() == "Modbus" and not is_replay_url(session.port):
+            self.start_modbus_polling(session)
+
+    def disconnect(self, name=None):
+        name = name or self.active_session.get()
+        session = self.sessions.get(name)
+        if session is None:
+            return
+        self.stop_modbus_polling(session)
+        self.sessions.close(name)
+        self.close_triggers(session)
+        if self.data_format.get() == "Hexadecimal" and not session.decoder and name == self.active_session.get():
+            self.console.write(session.hex_dumper.flush())
+        if isinstance(session.ser, ReplaySerial):
+            self.log(f"{self.translate('replay_throughput')} {session.ser.bytes_read} bytes, {session.ser.throughput():.0f} B/s")
+        if session.decoder:
+            self.log_frame_stats(session)
+        if self.active_session.get() == name:
+            names = self.sessions.names()
+            self.active_session.set(names[-1] if names else '')
+        self.update_sessions()
+
+    def session_error(self, session, error):
+        self.stop_modbus_polling(session)
+        self.close_triggers(session)
+        if self.active_session.get() == session.name:
+            names = self.sessions.names()
+            self.active_session.set(names[-1] if names else '')
+        self.update_sessions()
+        messagebox.showerror(self.translate("error"), f"{session.name}: {error}")
+
+    def select_session(self, name):
+        self.active_session.set(name)
+        self.update_sessions()
+
+    def update_sessions(self):
+        self.session_menu['values'] = self.sessions.names()
+        self.update_connection_status()
+        self.layout_graphs()
+        self.update_tag_table()
+
+    def update_connection_status(self):
+        count = len(self.sessions)
+        if self.port.get() in self.sessions:
+            self.connect_button.config(text=self.translate("disconnect"))
+        else:
+            self.connect_button.config(text=self.translate("connect"))
+        if count:
+            text = self.translate("connected") if count == 1 else f"{self.translate('connected')} ({count})"
+            self.status_label.config(text=text, foreground="green")
+        else:
+            self.status_label.config(text=self.translate("disconnected"), foreground="red")
 
     def connect_modbus(self):
+        # A conexão é aberta pelo loop asyncio; o resultado chega em read_modbus_data
+        session = self.sessions.get(self.active_session.get())
+        if session is None:
+            self.log("Cliente Modbus não está conectado.")
+            return False
         try:
-            self.modbus_client = ModbusClient(
-                method='rtu',
-                port=self.port.get(),
-                baudrate=int(self.baudrate.get()),
-                stopbits=serial.STOPBITS_ONE,
-                bytesize=serial.EIGHTBITS,
-                parity=serial.PARITY_NONE,
-                timeout=1
-            )
-            connection = self.modbus_client.connect()
-            if connection:
-                self.modbus_connected = True
-                self.log("Conexão Modbus estabelecida.")
-            else:
-                self.log("Erro ao conectar ao Modbus.")
-            return connection
+            return self.start_modbus_polling(session)
         except Exception as e:
             self.log(f"Erro ao conectar à porta serial: {e}")
             return False
 
     def disconnect_modbus(self):
-        if self.modbus_client:
-            self.modbus_client.close()
-            self.modbus_connected = False
+        session = self.sessions.get(self.active_session.get())
+        if session and session.modbus_poller:
+            self.stop_modbus_polling(session)
             self.log("Conexão Modbus encerrada.")
 
     def send_data(self):
-        if self.ser and self.ser.is_open:
+        session = self.sessions.get(self.active_session.get())
+        if session and session.is_open:
             data = self.send_entry.get()
             if self.data_format.get() == "Hexadecimal":
                 data = bytes.fromhex(data)
             else:
                 data = data.encode('utf-8')
-            self.ser.write(data)
+            # Pela mesma fila dos arquivos: não se mistura com uma transferência em andamento
+            self.transmit(session, data_job(data))
         else:
             messagebox.showerror(self.translate("error"), self.translate("not_connected"))
 
-    def receive_data(self):
-        if self.ser and self.ser.is_open:
-            data = self.ser.read_all()
-            if data:
-                if self.data_format.get() == "Hexadecimal":
-                    data = data.hex()
-                self.receive_text.config(state='normal')
-                self.receive_text.insert(tk.END, data + '\n')
-                self.receive_text.config(state='disabled')
-                self.receive_text.yview(tk.END)
+    def transmit_session(self):
+        session = self.sessions.get(self.active_session.get())
+        if session is None or not session.is_open:
+            messagebox.showerror(self.translate("error"), self.translate("not_connected"))
+            return None
+        return session
+
+    def transmit_options(self):
+        # (tamanho do bloco, pausa entre blocos em s, pausa entre linhas em s, fim de linha)
+        return (
+            max(int(self.tx_chunk_size.get()), 1),
+            max(float(self.tx_chunk_delay.get()), 0) / 1000,
+            max(float(self.tx_line_delay.get()), 0) / 1000,
+            escaped_bytes(self.tx_line_ending.get())
+        )
+
+    def send_file(self):
+        session = self.transmit_session()
+        if session is None:
+            return
+        path = filedialog.askopenfilename(title=self.translate("send_file"))
+        if not path:
+            return
+        try:
+            chunk_size, chunk_delay, _, _ = self.transmit_options()
+            job = file_job(path, chunk_size, chunk_delay)
+        except (OSError, ValueError) as e:
+            logging.error(f"Error preparing file transfer: {e}")
+            messagebox.showerror(self.translate("error"), str(e))
+            return
+        self.transmit(session, job)
+
+    def send_script(self):
+        session = self.transmit_session()
+        if session is None:
+            return
+        path = filedialog.askopenfilename(
+            title=self.translate("send_script"),
+            filetypes=[(self.translate("script_files"), "*.txt"), (self.translate("all_files"), "*")]
+        )
+        if not path:
+            return
+        try:
+            _, _, line_delay, line_ending = self.transmit_options()
+            job = script_job(path, line_ending, line_delay)
+        except (OSError, ValueError, UnicodeError) as e:
+            logging.error(f"Error reading transmit script: {e}")
+            messagebox.showerror(self.translate("error"), str(e))
+            return
+        self.transmit(session, job)
+
+    def transmit(self, session, job):
+        session.transmitter.submit(job)
+        if self.transmit_job is None:
+            self.transmit_job = self.root.after(100, self.update_transmit_progress)
+
+    def cancel_transmit(self):
+        session = self.sessions.get(self.active_session.get())
+        if session and session.transmitter:
+            session.transmitter.cancel()
+
+    def update_transmit_progress(self):
+        # A thread de envio só atualiza contadores; aqui eles viram barra e texto
+        self.transmit_job = None
+        busy = False
+        for session in self.sessions:
+            transmitter = session.transmitter
+            if transmitter is None:
+                continue
+            while not transmitter.finished.empty():
+                self.report_transmit(session, transmitter.finished.get_nowait())
+            busy = busy or transmitter.busy
+        session = self.sessions.get(self.active_session.get())
+        job = session.transmitter.current if session and session.transmitter else None
+        if job is not None and not job.quiet:
+            pending = session.transmitter.pending()
+            text = f"{job.name}: {job.sent}/{job.total} bytes, {job.throughput() / 1024:.1f} KB/s"
+            if pending:
+                text += f" (+{pending} {self.translate('queued')})"
+            self.transmit_progress['value'] = job.progress() * 100
+            self.transmit_label.config(text=text)
+        elif not busy:
+            self.transmit_progress['value'] = 0
+            self.transmit_label.config(text="")
+        if busy:
+            self.transmit_job = self.root.after(100, self.update_transmit_progress)
+
+    def report_transmit(self, session, job):
+        prefix = f"[{session.name}] " if len(self.sessions) > 1 else ""
+        if job.error is not None:
+            self.log(f"{prefix}{self.translate('transmit_error')} {job.name}: {job.error}")
+            messagebox.showerror(self.translate("error"), f"{job.name}: {job.error}")
+        elif job.cancelled.is_set():
+            self.log(f"{prefix}{self.translate('transmit_cancelled')} {job.name} ({job.sent}/{job.total} bytes)")
+        elif not job.quiet:
+            self.log(f"{prefix}{self.translate('transmit_done')} {job.name}: {job.sent} bytes, {job.elapsed():.1f} s, {job.throughput():.0f} B/s")
+
+    def receive_data(self, session, timestamp, data):
+        start = time.perf_counter()
+        if session.decoder:
+            # Um quadro completo por linha, mesmo que tenha chegado em pedaços
+            frames = session.decoder.feed(data, timestamp)
+            if self.data_format.get() == "Hexadecimal" or not isinstance(session.decoder, DelimiterDecoder):
+                text = ''.join(frame.hex(' ') + '\n' for frame in frames)
+            else:
+                text = ''.join(frame.decode('utf-8', errors='replace') + '\n' for frame in frames)
+        elif self.data_format.get() == "Hexadecimal":
+            # Offset, hex e ASCII; o offset continua entre leituras
+            text = session.hex_dumper.format(data)
+        else:
+            # Decodifica todas as sessões para não cortar caracteres ao trocar de sessão
+            text = session.text_decoder.decode(data)
+        session.metrics.decode_time.observe(time.perf_counter() - start)
+        if text and session.name == self.active_session.get():
+            self.console.write(text)
+
+    def log_frame_stats(self, session):
+        stats = session.decoder.stats()
+        self.log(f"{self.translate('frame_stats')} {stats['frames']} / CRC {stats['crc_errors']} / {stats['framing_errors'] + stats['overflows']} ({session.name})")
+
+    def toggle_recording(self):
+        if self.recorder:
+            self.stop_recording()
+        else:
+            self.start_recording()
+
+    def start_recording(self):
+        path = filedialog.asksaveasfilename(
+            title=self.translate("record"),
+            defaultextension=CAPTURE_EXTENSION,
+            filetypes=[(self.translate("capture_files"), f"*{CAPTURE_EXTENSION}")]
+        )
+        if not path:
+            return
+        try:
+            self.recorder = CaptureRecorder(path)
+        except OSError as e:
+            logging.error(f"Error creating capture file: {e}")
+            messagebox.showerror(self.translate("error"), str(e))
+            return
+        self.record_button.config(text=self.translate("stop_recording"))
+        self.log(f"{self.translate('recording_to')} {path}")
+
+    def stop_recording(self):
+        if self.recorder:
+            self.recorder.close()
+            self.log(f"{self.translate('recording_saved')} {self.recorder.path} ({self.recorder.bytes_written} bytes)")
+            self.recorder = None
+        self.record_button.config(text=self.translate("record"))
+
+    def record_data(self, session, timestamp, data):
+        # Um único arquivo de captura para todas as sessões, separadas pela porta
+        if self.recorder:
+            self.recorder.write(timestamp, data, session.port)
+
+    def select_replay(self):
+        path = filedialog.askopenfilename(
+            title=self.translate("replay"),
+            filetypes=[
+                (self.translate("capture_files"), f"*{CAPTURE_EXTENSION}"),
+                (self.translate("hex_dump_files"), "*.hex *.txt"),
+                (self.translate("all_files"), "*")
+            ]
+        )
+        if path:
+            # A velocidade pode ser ajustada no próprio campo (ex.: speed=10 ou speed=max)
+            self.port.set(replay_url(path, 1))
 
     def update_ports(self):
         ports = [port.device for port in serial.tools.list_ports.comports()]
         self.port_menu['values'] = ports
 
     def clear_received_data(self):
-        self.receive_text.config(state='normal')
-        self.receive_text.delete('1.0', tk.END)
-        self.receive_text.config(state='disabled')
-
-    def init_graph(self):
-        self.ax.set_xlim(0, 100)
-        self.ax.set_ylim(-10, 10)
-        self.line.set_data([], [])
-        return self.line,
-
-    def update_graph(self, frame):
-        if self.ser and self.ser.is_open:
+        self.console.clear()
+
+    def apply_console_settings(self):
+        try:
+            self.console.max_lines = max(int(self.console_lines.get()), 1)
+        except ValueError:
+            logging.error(f"Invalid console line limit: {self.console_lines.get()}")
+        self.console.pause_on_scroll = self.console_pause.get()
+
+    def layout_graphs(self):
+        # Todas as sessões lado a lado ou só a ativa, na mesma figura
+        if self.fig is None:
+            return
+        if self.tile_graphs.get():
+            shown = list(self.sessions)
+        else:
+            active = self.sessions.get(self.active_session.get())
+            shown = [active] if active else []
+        for session in self.sessions:
+            session.ax = None
+            session.lines = []
+        self.fig.clear()
+        self.graph_sessions = shown
+        if not shown:
+            ax = self.fig.add_subplot()
+            ax.set_xlim(0, self.graph_window_size())
+            ax.set_ylim(-10, 10)
+        columns = 1 if len(shown) <= 3 else 2
+        rows = math.ceil(len(shown) / columns)
+        for index, session in enumerate(shown):
+            session.ax = self.fig.add_subplot(rows, columns, index + 1)
+            if len(shown) > 1:
+                session.ax.set_title(session.name, fontsize='small')
+            session.ax.set_xlim(0, session.samples.capacity)
+            session.ax.set_ylim(*(session.y_scaler.limits or (-10, 10)))
+            self.ensure_channels(session, session.samples.channels)
+        self.render_scheduler.invalidate()
+
+    def hex_width_size(self):
+        try:
+            return max(int(self.hex_width.get()), 1)
+        except ValueError:
+            logging.error(f"Invalid hex width: {self.hex_width.get()}")
+            return 16
+
+    def show_hex_view(self):
+        from hexdump import HexView, open_hex_source
+        path = filedialog.askopenfilename(
+            title=self.translate("hex_view"),
+            filetypes=[
+                (self.translate("capture_files"), f"*{CAPTURE_EXTENSION}"),
+                (self.translate("all_files"), "*")
+            ]
+        )
+        if not path:
+            return
+        try:
+            source = open_hex_source(path)
+        except (OSError, ValueError) as e:
+            logging.error(f"Error opening file for hex view: {e}")
+            messagebox.showerror(self.translate("error"), str(e))
+            return
+        window = Toplevel(self.root)
+        window.title(f"{self.translate('hex_view')} - {os.path.basename(path)} ({len(source)} bytes)")
+        window.geometry("760x500")
+        HexView(window, source, self.hex_width_size())
+
+        def close():
+            source.close()
+            window.destroy()
+
+        window.protocol("WM_DELETE_WINDOW", close)
+
+    def apply_store_settings(self):
+        # Liga/desliga a gravação das amostras e tags Modbus no banco (storage.py)
+        if self.store_samples.get() and self.store is None:
+            from storage import SampleStore
+            path = self.settings.get('store_file') or 'serialuz.db'
+            store = SampleStore(path)
             try:
-                line = self.ser.readline().decode('utf-8').strip()
-                if line:
-                    try:
-                        value = float(line)
-                        self.data_x.append(len(self.data_x))
-                        self.data_y.append(value)
-                        if len(self.data_x) > 100:
-                            self.data_x.pop(0)
-                            self.data_y.pop(0)
-                        self.line.set_data(self.data_x, self.data_y)
-                        self.ax.relim()
-                        self.ax.autoscale_view()
-                    except ValueError:
-                        pass
+                store.start()
             except Exception as e:
-                logging.error(f"Error reading from serial port: {e}")
-        return self.line,
+                logging.error(f"Error opening sample store {path}: {e}")
+                messagebox.showerror(self.translate("error"), str(e))
+                self.store_samples.set(False)
+                return
+            self.metrics.counter('store_rows_total', 'Samples written to the store', lambda: store.rows_written, store=path)
+            self.metrics.counter('store_dropped_rows_total', 'Samples discarded because the store fell behind', lambda: store.dropped_rows, store=path)
+            self.metrics.gauge('store_pending_rows', 'Samples waiting to be written to the store', lambda: store.pending, store=path)
+            self.store = store
+            self.log(f"{self.translate('store_samples')}: {path}")
+        elif not self.store_samples.get() and self.store is not None:
+            store, self.store = self.store, None
+            store.stop()
+            self.metrics.remove(store=store.path)
+            self.log(f"{self.translate('store_samples')}: {store.rows_written} ({store.path})")
+
+    def start_fanout(self, session, settings):
+        # Repassa a porta por TCP/WebSocket; com mais de uma sessão, cada uma
+        # fica na próxima porta TCP livre
+        from fanout import serve
+        write = None
+        if settings.get('fanout_writes'):
+            transmitter = session.transmitter
+            write = lambda data: transmitter.submit(data_job(data))
+        try:
+            server = serve(session.name, settings.get('fanout_host') or '127.0.0.1', int(settings.get('fanout_port', 7700)),
+                           int(settings.get('fanout_websocket_port') or 0), write, search=16)
+        except (OSError, ValueError) as e:
+            logging.error(f"Error sharing {session.name}: {e}")
+            self.log(f"{self.translate('share_error')} {session.name}: {e}")
+            return False
+        session.fanout = server
+        labels = {'session': session.name, 'fanout': server.urls[0]}
+        self.metrics.gauge('fanout_clients', 'Clients connected to the shared port', lambda: len(server.clients), **labels)
+        self.metrics.counter('fanout_bytes_sent_total', 'Bytes sent to shared-port clients (all clients)', lambda: server.bytes_sent, **labels)
+        self.metrics.counter('fanout_dropped_clients_total', 'Shared-port clients dropped for falling behind', lambda: server.dropped_clients, **labels)
+        self.metrics.counter('fanout_rejected_bytes_total', 'Client writes refused while another client held the port', lambda: server.rejected_writes, **labels)
+        self.log(f"{self.translate('share_ports')} {session.name}: {' '.join(server.urls)}")
+        if self.fanout_job is None:
+            self.fanout_job = self.root.after(500, self.check_fanout)
+        return True
+
+    def stop_fanout(self, session):
+        server, session.fanout = session.fanout, None
+        if server is not None:
+            server.close()
+            self.metrics.remove(fanout=server.urls[0])
+
+    def apply_fanout_settings(self):
+        # Liga/desliga o compartilhamento das portas já abertas
+        settings = self.collect_settings()
+        for session in self.sessions:
+            if self.share_ports.get() and session.fanout is None:
+                self.start_fanout(session, settings)
+            elif not self.share_ports.get():
+                self.stop_fanout(session)
+
+    def fanout_data(self, session, timestamp, data):
+        if session.fanout is not None:
+            session.fanout.publish(data)
+
+    def check_fanout(self):
+        # As escritas dos clientes passam pela fila de transmissão; os
+        # trabalhos concluídos são lidos aqui mesmo sem envio pela interface
+        self.fanout_job = None
+        shared = [session for session in self.sessions if session.fanout is not None]
+        if any(not session.transmitter.finished.empty() for session in shared) and self.transmit_job is None:
+            self.update_transmit_progress()
+        if shared:
+            self.fanout_job = self.root.after(500, self.check_fanout)
+
+    def show_analysis(self):
+        # Uma janela só; segue a sessão ativa
+        if self.analysis_window is not None:
+            self.analysis_window.lift()
+            return
+        from analysis import AnalysisPanel
+        window = Toplevel(self.root)
+        window.title(self.translate("analysis"))
+        window.geometry("700x520")
+        panel = AnalysisPanel(window, lambda: self.sessions.get(self.active_session.get()), self.translate)
+
+        def close():
+            panel.close()
+            window.destroy()
+            self.analysis_window = None
+
+        window.protocol("WM_DELETE_WINDOW", close)
+        self.analysis_window = window
+
+    def create_history(self, settings):
+        # Cerca de 9 MB por canal com o tamanho padrão; só com o histórico ligado
+        try:
+            history = int(settings.get('history_samples', 100000000))
+        except ValueError:
+            logging.error(f"Invalid history size: {settings.get('history_samples')}")
+            history = 100000000
+        return MinMaxPyramid(history) if history > 0 else None
+
+    def apply_history_settings(self):
+        # Liga/desliga o histórico das portas já abertas; desligar libera a memória
+        settings = self.collect_settings()
+        for session in self.sessions:
+            if self.keep_history.get() and session.history is None:
+                session.history = self.create_history(settings)
+            elif not self.keep_history.get():
+                session.history = None
+
+    def show_history(self):
+        # Histórico da sessão ativa, lido da pirâmide de resoluções
+        if self.history_window is not None:
+            self.history_window.lift()
+            return
+        from pyramid import HistoryPanel
+        window = Toplevel(self.root)
+        window.title(self.translate("history"))
+        window.geometry("800x480")
+        panel = HistoryPanel(window, lambda: self.sessions.get(self.active_session.get()), self.translate)
+
+        def close():
+            panel.close()
+            window.destroy()
+            self.history_window = None
+
+        window.protocol("WM_DELETE_WINDOW", close)
+        self.history_window = window
+
+    def trigger_options(self, settings):
+        # (regras, pré, pós); ValueError se algo for inválido
+        from triggers import parse_rules
+        rules = parse_rules(settings.get('triggers', []))
+        pre = float(settings.get('trigger_pre', 5))
+        post = float(settings.get('trigger_post', 5))
+        if pre < 0 or post < 0:
+            raise ValueError(f"Invalid trigger window: {pre} / {post}")
+        return rules, pre, post
+
+    def create_triggers(self, session, settings):
+        if not settings.get('triggers'):
+            return None
+        from triggers import TriggerEngine
+        try:
+            rules, pre, post = self.trigger_options(settings)
+        except ValueError as e:
+            logging.error(f"Invalid triggers: {e}")
+            return None
+        engine = TriggerEngine(rules, session.name, pre, post, settings.get('trigger_dir') or 'captures')
+        if self.trigger_job is None:
+            self.trigger_job = self.root.after(500, self.check_triggers)
+        return engine
+
+    def close_triggers(self, session):
+        # Depois do sessions.close, que ainda entrega os últimos blocos
+        if session.triggers is not None:
+            session.triggers.close()
+            self.report_triggers(session.triggers)
+            session.triggers = None
+
+    def trigger_data(self, session, timestamp, data):
+        if session.triggers is not None:
+            session.triggers.feed(timestamp, data)
+
+    def check_triggers(self):
+        # Fecha as capturas cujo pós-disparo terminou com a porta em silêncio
+        self.trigger_job = None
+        engines = [session.triggers for session in self.sessions if session.triggers is not None]
+        for engine in engines:
+            engine.tick()
+            self.report_triggers(engine)
+        if engines:
+            self.trigger_job = self.root.after(500, self.check_triggers)
+
+    def report_triggers(self, engine):
+        for event in engine.take_events():
+            self.log(f"{self.translate('trigger_fired')} {event.rule.text} ({event.port}): {event.path or '-'}")
+            if self.trigger_panel is not None:
+                self.trigger_panel.add_event(event)
+
+    def show_triggers(self):
+        if self.trigger_window is not None:
+            self.trigger_window.lift()
+            return
+        from triggers import TriggerPanel
+        window = Toplevel(self.root)
+        window.title(self.translate("triggers"))
+        window.geometry("720x420")
+        self.trigger_panel = TriggerPanel(window, self.translate, self.settings.get('triggers', []), self.settings.get('trigger_pre', '5'), self.settings.get('trigger_post', '5'), self.apply_triggers)
+
+        def close():
+            self.trigger_panel = None
+            window.destroy()
+            self.trigger_window = None
+
+        window.protocol("WM_DELETE_WINDOW", close)
+        self.trigger_window = window
+
+    def apply_triggers(self, lines, pre, post):
+        # Vale para as portas abertas e para as próximas conexões
+        settings = dict(self.settings, triggers=lines, trigger_pre=pre, trigger_post=post)
+        try:
+            self.trigger_options(settings)
+        except ValueError as e:
+            messagebox.showerror(self.translate("error"), str(e))
+            return False
+        self.settings = settings
+        for session in self.sessions:
+            self.close_triggers(session)
+            session.triggers = self.create_triggers(session, settings)
+        self.log(f"{self.translate('triggers')}: {len(lines)}")
+        return True
+
+    def show_discovery(self):
+        # Portas já abertas ficam fora da varredura
+        if self.discovery_window is not None:
+            self.discovery_window.lift()
+            return
+        from discovery import DiscoveryPanel, available_ports
+        ports = [port for port in available_ports() if port not in self.sessions]
+        if not ports:
+            messagebox.showinfo(self.translate("scan_ports"), self.translate("scan_no_ports"))
+            return
+        window = Toplevel(self.root)
+        window.title(self.translate("scan_ports"))
+        window.geometry("720x420")
+        panel = DiscoveryPanel(window, ports, self.translate, self.apply_discovery)
+
+        def close():
+            panel.close()
+            window.destroy()
+            self.discovery_window = None
+
+        window.protocol("WM_DELETE_WINDOW", close)
+        self.discovery_window = window
+
+    def apply_discovery(self, port, baudrate, parity, unit):
+        # Preenche a conexão com o que a varredura encontrou
+        self.port.set(port)
+        self.baudrate.set(str(baudrate))
+        self.parity.set(parity)
+        self.protocol.set("Modbus")
+        if unit is not None and not self.settings.get('modbus_tags'):
+            # Sem tabela de tags, a leitura padrão passa a usar a unidade encontrada
+            from modbus_scheduler import default_tags
+            self.settings['modbus_tags'] = [tag.to_dict() for tag in default_tags(unit=unit)]
+        self.log(f"{port}: {baudrate} {parity}, Modbus {unit}")
+
+    def show_tags(self):
+        # Uma janela só; mostra as tags Modbus da sessão ativa
+        if self.tags_window is not None:
+            self.tags_window.lift()
+            return
+        from modbus_cache import TagTable
+        window = Toplevel(self.root)
+        window.title(self.translate("modbus_tags"))
+        window.geometry("520x400")
+        self.tag_table = TagTable(window, self.translate)
+
+        def close():
+            self.tag_table.detach()
+            self.tag_table = None
+            window.destroy()
+            self.tags_window = None
+
+        window.protocol("WM_DELETE_WINDOW", close)
+        self.tags_window = window
+        self.update_tag_table()
+
+    def update_tag_table(self):
+        if self.tag_table is None:
+            return
+        session = self.sessions.get(self.active_session.get())
+        poller = session.modbus_poller if session else None
+        if poller is None:
+            self.tag_table.attach(None, [])
+        else:
+            self.tag_table.attach(poller.cache, poller.tags)
+
+    def graph_window_size(self):
+        try:
+            window = int(self.graph_window.get())
+        except ValueError:
+            logging.error(f"Invalid graph window: {self.graph_window.get()}")
+            return 1000
+        return window if window > 0 else 1000
+
+    def resize_graph_window(self):
+        window = self.graph_window_size()
+        resized = False
+        for session in self.sessions:
+            if window != session.samples.capacity:
+                session.samples.resize(window)
+                resized = True
+        if resized:
+            self.layout_graphs()
+
+    def handle_graph_data(self, session, timestamp, data):
+        start = time.perf_counter()
+        values = session.channel_parser.feed(data)
+        session.metrics.parse_time.observe(time.perf_counter() - start)
+        if len(values):
+            session.stats.update(values)
+            session.sample_rate.update(len(values), timestamp)
+            if self.store is not None:
+                names = [session.channel_parser.channel_name(index) for index in range(values.shape[1])]
+                self.store.add_block(session.name, timestamp, values, names)
+            self.ensure_channels(session, values.shape[1])
+            session.samples.extend(values)
+            if session.history is not None:
+                session.history.extend(values)
+            if session.triggers is not None:
+                session.triggers.feed_values(timestamp, values, session.channel_parser.channel_name)
+            if session.ax is not None:
+                self.render_scheduler.mark_dirty()
+
+    def ensure_channels(self, session, channels):
+        if channels > session.samples.channels:
+            session.samples.resize(session.samples.capacity, channels)
+        if session.ax is None or channels <= len(session.lines):
+            return
+        # Uma linha por canal, todas lidas do buffer da sessão
+        while len(session.lines) < channels:
+            style = '-' if session.lines else 'r-'
+            line, = session.ax.plot([], [], style, animated=True)
+            session.lines.append(line)
+        if len(session.lines) > 1:
+            for index, line in enumerate(session.lines):
+                line.set_label(session.channel_parser.channel_name(index))
+            session.ax.legend(handles=session.lines, loc='upper left', fontsize='small')
+        self.render_scheduler.invalidate()
+
+    def update_graph(self):
+        rescale = False
+        artists = []
+        for session in self.graph_sessions:
+            artists.extend(session.lines)
+            if not len(session.samples):
+                continue
+            # Um par mínimo/máximo por coluna de pixels do eixo
+            x, y = minmax_decimate(session.samples.view(), session.ax.bbox.width)
+            for index, line in enumerate(session.lines):
+                line.set_data(x[:, index], y[:, index])
+            finite = y[np.isfinite(y)]
+            if finite.size:
+                # Reescala só quando os dados saem dos limites (com histerese)
+                limits = session.y_scaler.update(finite.min(), finite.max())
+                if limits:
+                    session.ax.set_ylim(*limits)
+                    rescale = True
+        return artists, rescale
 
     def create_info_icon(self, parent, text):
-        info_icon = PhotoImage(file="img/icons/info_icon.png")
+        info_icon = self.load_image("img/icons/info_icon.png")
         info_label = Label(parent, image=info_icon)
-        info_label.image = info_icon
         info_label.bind("<Enter>", lambda e: self.show_tooltip(info_label, text))
         info_label.bind("<Leave>", lambda e: self.hide_info_tooltip())
         return info_label
@@ -402,20 +1213,28 @@ class SeriaLuz:
             self.tooltip.destroy()
         self.tooltip = None
 
+    def load_image(self, path):
+        # Uma PhotoImage por arquivo, compartilhada por todos os widgets que a usam
+        image = self.images.get(path)
+        if image is None:
+            image = self.images[path] = PhotoImage(file=path)
+        return image
+
     def translate(self, text):
         return self.translations.get(text, text)
 
     def load_language(self, lang):
         try:
-            with open(f'lang/{lang}.json', 'r', encoding='utf-8') as f:
-                self.translations = json.load(f)
+            self.translations = load_translations(lang)
         except FileNotFoundError:
             logging.error(f"Language file for '{lang}' not found. Falling back to default.")
             self.translations = {}
 
 
-    def save_settings(self):
-        settings = {
+    def collect_settings(self):
+        # Mantém chaves do settings.json que não têm campo na interface
+        settings = dict(self.settings)
+        settings.update({
             'port': self.port.get(),
             'baudrate': self.baudrate.get(),
             'data_format': self.data_format.get(),
@@ -423,11 +1242,27 @@ class SeriaLuz:
             'parity': self.parity.get(),
             'stop_bits': self.stop_bits.get(),
             'flow_control': self.flow_control.get(),
-            "protocol": self.protocol.get()
-        }
+            "protocol": self.protocol.get(),
+            'graph_window': self.graph_window.get(),
+            'console_lines': self.console_lines.get(),
+            'console_pause': self.console_pause.get(),
+            'framing': self.framing.get(),
+            'hex_width': self.hex_width.get(),
+            'tx_chunk_size': self.tx_chunk_size.get(),
+            'tx_chunk_delay': self.tx_chunk_delay.get(),
+            'tx_line_delay': self.tx_line_delay.get(),
+            'tx_line_ending': self.tx_line_ending.get(),
+            'store_samples': self.store_samples.get(),
+            'fanout_enabled': self.share_ports.get(),
+            'history_enabled': self.keep_history.get()
+        })
+        return settings
+
+    def save_settings(self):
+        settings = self.collect_settings()
         try:
-            with open('settings.json', 'w', encoding='utf-8') as f:
-                json.dump(settings, f, ensure_ascii=False, indent=4)
+            save_settings_file(settings)
+            self.settings = settings
             messagebox.showinfo(self.translate('settings_saved'), self.translate('settings_saved_message'))
         except IOError as e:
             logging.error(f"Error saving settings: {e}")
@@ -435,53 +1270,185 @@ class SeriaLuz:
 
 
     def load_settings(self):
-        if os.path.exists('settings.json'):
-            try:
-                with open('settings.json', 'r', encoding='utf-8') as f:
-                    settings = json.load(f)
-                self.port.set(settings.get('port', ''))
-                self.baudrate.set(settings.get('baudrate', '9600'))
-                self.data_format.set(settings.get('data_format', 'ASCII'))
-                self.data_bits.set(settings.get('data_bits', '8'))
-                self.parity.set(settings.get('parity', 'None'))
-                self.stop_bits.set(settings.get('stop_bits', '1'))
-                self.flow_control.set(settings.get('flow_control', 'None'))
-                self.protocol.set(settings.get("protocol", ""))
-            except IOError as e:
-                logging.error(f"Error loading settings: {e}")
+        try:
+            self.settings = load_settings_file()
+        except (IOError, ValueError) as e:
+            logging.error(f"Error loading settings: {e}")
+            return
+        self.port.set(self.settings['port'])
+        self.baudrate.set(self.settings['baudrate'])
+        self.data_format.set(self.settings['data_format'])
+        self.data_bits.set(self.settings['data_bits'])
+        self.parity.set(self.settings['parity'])
+        self.stop_bits.set(self.settings['stop_bits'])
+        self.flow_control.set(self.settings['flow_control'])
+        self.protocol.set(self.settings["protocol"])
+        self.graph_window.set(self.settings['graph_window'])
+        self.console_lines.set(self.settings['console_lines'])
+        self.console_pause.set(self.settings['console_pause'])
+        self.framing.set(self.settings['framing'])
+        self.hex_width.set(self.settings['hex_width'])
+        self.tx_chunk_size.set(self.settings['tx_chunk_size'])
+        self.tx_chunk_delay.set(self.settings['tx_chunk_delay'])
+        self.tx_line_delay.set(self.settings['tx_line_delay'])
+        self.tx_line_ending.set(self.settings['tx_line_ending'])
+        self.store_samples.set(self.settings['store_samples'])
+        self.share_ports.set(self.settings['fanout_enabled'])
+        self.keep_history.set(self.settings['history_enabled'])
+
+    def start_modbus_polling(self, session):
+        from modbus_scheduler import tags_from_settings
+        from modbus_engine import get_engine
+        settings = self.collect_settings()
+        try:
+            tags = tags_from_settings(settings)
+        except (KeyError, ValueError) as e:
+            self.log(f"Erro na tabela de tags Modbus: {e}")
+            return False
+        session.modbus_poller = get_engine().add_poller(
+            session.port,
+            serial_options(settings, timeout=1),
+            tags,
+            self.modbus_events,
+            max_gap=int(settings.get('modbus_max_gap', 10)),
+            name=session.name
+        )
+        cache = session.modbus_poller.cache
+        self.metrics.counter('modbus_tag_changes_total', 'Modbus tag values that changed', lambda: cache.changes, session=session.name)
+        self.update_tag_table()
+        requests = len(session.modbus_poller.requests)
+        self.log(f"Modbus ({session.name}): {len(tags)} tags em {requests} requisições")
+        if self.modbus_job is None:
+            self.modbus_job = self.root.after(self.poll_interval, self.read_modbus_data)
+        return True
+
+    def stop_modbus_polling(self, session):
+        if session.modbus_poller:
+            session.modbus_poller.stop()
+            session.modbus_poller = None
+        session.modbus_connected = False
+        self.update_tag_table()
 
     def read_modbus_data(self):
-        if not self.modbus_connected:
-            self.log("Cliente Modbus não está conectado.")
+        # As leituras de todas as sessões rodam no loop asyncio; aqui só os resultados são mostrados
+        from modbus_engine import drain_events, EVENT_CONNECTED, EVENT_VALUES, EVENT_ERROR
+        self.modbus_job = None
+        for kind, poller, payload in drain_events(self.modbus_events):
+            session = self.sessions.get(poller.name)
+            if session is None or poller is not session.modbus_poller:
+                continue  # evento de uma sessão já encerrada
+            prefix = f"[{session.name}] " if len(self.sessions) > 1 else ""
+            if kind == EVENT_CONNECTED:
+                session.modbus_connected = payload
+                self.log(prefix + ("Conexão Modbus estabelecida." if payload else "Cliente Modbus não está conectado."))
+            elif kind == EVENT_VALUES:
+                self.modbus_updates.inc()
+                if self.store is not None:
+                    now = time.monotonic()
+                    for tag, value in payload.items():
+                        self.store.add_value(f"{session.name}/{tag.name}", now, float(value))
+                text = ', '.join(f"{tag.name}={value}" for tag, value in payload.items())
+                self.display_received_data(f"{prefix}Dados Modbus: {text}")
+            elif kind == EVENT_ERROR:
+                self.modbus_read_errors.inc()
+                self.log(f"{prefix}Erro ao ler dados Modbus: {payload}")
+        # Tags que mudaram desde o último ciclo, uma vez cada, para as janelas inscritas
+        for session in self.sessions:
+            if session.modbus_poller:
+                session.modbus_poller.cache.dispatch()
+        if any(session.modbus_poller for session in self.sessions):
+            self.modbus_job = self.root.after(self.poll_interval, self.read_modbus_data)
+
+
+    def refresh_status(self):
+        # Nada é coletado com a aba escondida
+        if self.status_job is not None:
+            self.root.after_cancel(self.status_job)
+            self.status_job = None
+        if self.notebook.select() != str(self.status_tab):
             return
-
-        try:
-            rr = self.modbus_client.read_holding_registers(address=0, count=10, unit=1)
-            if not rr.isError():
-                self.log(f"Dados lidos: {rr.registers}")
-                self.display_received_data(f"Dados Modbus: {rr.registers}")
+        now = time.monotonic()
+        seen = set()
+        for metric in self.metrics.collect():
+            try:
+                value = metric.value
+            except Exception:
+                continue
+            key = metric.key
+            seen.add(key)
+            text, rate = self.format_metric(metric, value, now)
+            item = self.status_items.get(key)
+            if item is None:
+                labels = ', '.join(f"{name}={label}" for name, label in metric.labels.items())
+                name = f"{metric.name} ({labels})" if labels else metric.name
+                self.status_items[key] = self.status_tree.insert('', tk.END, text=name, values=(text, rate))
             else:
-                self.log(f"Erro ao ler dados Modbus: {rr}")
-        except Exception as e:
-            self.log(f"Erro ao ler dados Modbus: {e}")
-
+                self.status_tree.item(item, values=(text, rate))
+        for key in list(self.status_items):
+            if key not in seen:
+                self.status_tree.delete(self.status_items.pop(key))
+                self.status_previous.pop(key, None)
+        self.status_job = self.root.after(self.status_interval, self.refresh_status)
+
+    def format_metric(self, metric, value, now):
+        # Retorna (valor, taxa por segundo) como texto
+        if isinstance(metric, Histogram):
+            if not value['count']:
+                return "-", ""
+            p50 = value['p50'] * 1000
+            p99 = value['p99'] * 1000
+            return f"n={value['count']} p50≤{p50:.3g} ms p99≤{p99:.3g} ms", ""
+        rate = ""
+        if isinstance(metric, Counter):
+            previous = self.status_previous.get(metric.key)
+            self.status_previous[metric.key] = (now, value)
+            if previous and now > previous[0]:
+                rate = f"{(value - previous[1]) / (now - previous[0]):.1f}/s"
+            return str(value), rate
+        return f"{value:.3g}", rate
+
+    def export_metrics(self):
+        # Escreve o arquivo de métricas configurado (metrics_file) periodicamente
+        self.metrics_job = None
+        path = self.settings.get('metrics_file')
+        if not path:
+            return
+        try:
+            self.metrics.write(path)
+        except OSError as e:
+            logging.error(f"Error writing metrics file: {e}")
+        try:
+            interval = max(float(self.settings.get('metrics_interval', 10)), 1)
+        except ValueError:
+            logging.error(f"Invalid metrics interval: {self.settings.get('metrics_interval')}")
+            interval = 10
+        self.metrics_job = self.root.after(int(interval * 1000), self.export_metrics)
+
+    def export_metrics_as(self):
+        path = filedialog.asksaveasfilename(
+            title=self.translate("export_metrics"),
+            defaultextension=".prom",
+            filetypes=[("Prometheus", "*.prom"), ("JSON", "*.json"), (self.translate("all_files"), "*")]
+        )
+        if not path:
+            return
+        try:
+            self.metrics.write(path)
+        except OSError as e:
+            logging.error(f"Error writing metrics file: {e}")
+            messagebox.showerror(self.translate("error"), str(e))
 
     def show_contator(self):
+            from contator import Contator
             root = tk.Tk()
             app = Contator(root, self.lang)
             root.mainloop()
 
     def log(self, message):
-        self.receive_text.config(state='normal')
-        self.receive_text.insert(tk.END, message + '\n')
-        self.receive_text.config(state='disabled')
-        self.receive_text.yview(tk.END)
+        self.console.write(message + '\n')
 
     def display_received_data(self, data):
-        self.receive_text.config(state='normal')
-        self.receive_text.insert(tk.END, data + '\n')
-        self.receive_text.config(state='disabled')
-        self.receive_text.yview(tk.END)
+        self.console.write(data + '\n')
 
 
 def show_language_selection():
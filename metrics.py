@@ -0,0 +1,226 @@
+import os
+import json
+import time
+import bisect
+import threading
+
+
+# Métricas de desempenho baratas o bastante para os caminhos quentes: um
+# incremento ou um bisect, sem lock (cada métrica tem uma única thread que
+# escreve). Valores que outros objetos já contam (bytes lidos, erros do
+# decodificador, requisições do barramento) são lidos por função só na coleta,
+# então não custam nada enquanto ninguém olha o painel ou o arquivo.
+
+# Limites dos baldes em segundos, de 100 µs a 2,5 s
+TIME_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, help_text='', labels=None, function=None):
+        self.name = name
+        self.help = help_text
+        self.labels = dict(labels or {})
+        self.function = function
+
+    @property
+    def key(self):
+        return (self.name, tuple(sorted(self.labels.items())))
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def __init__(self, name, help_text='', labels=None, function=None):
+        super().__init__(name, help_text, labels, function)
+        self.count = 0
+
+    def inc(self, amount=1):
+        self.count += amount
+
+    @property
+    def value(self):
+        return self.function() if self.function else self.count
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def __init__(self, name, help_text='', labels=None, function=None):
+        super().__init__(name, help_text, labels, function)
+        self.current = 0.0
+
+    def set(self, value):
+        self.current = value
+
+    @property
+    def value(self):
+        return self.function() if self.function else self.current
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text='', labels=None, buckets=TIME_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # o último é +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        # Estimativa pelo limite superior do balde onde cai o quantil
+        if not self.count:
+            return None
+        target = q * self.count
+        total = 0
+        for index, count in enumerate(self.counts):
+            total += count
+            if total >= target:
+                return self.buckets[index] if index < len(self.buckets) else float('inf')
+        return float('inf')
+
+    @property
+    def value(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'p50': self.quantile(0.5),
+            'p90': self.quantile(0.9),
+            'p99': self.quantile(0.99)
+        }
+
+
+class Registry:
+    def __init__(self, prefix='serialuz_'):
+        self.prefix = prefix
+        self.metrics = {}
+        self.lock = threading.Lock()  # só para criar/remover; as atualizações não usam lock
+
+    def add(self, metric, replace=False):
+        with self.lock:
+            existing = self.metrics.get(metric.key)
+            if existing is not None and not replace:
+                return existing
+            self.metrics[metric.key] = metric
+            return metric
+
+    def counter(self, name, help_text='', function=None, **labels):
+        # Com função, substitui a anterior (ex.: porta reaberta com outro leitor)
+        return self.add(Counter(name, help_text, labels, function), replace=function is not None)
+
+    def gauge(self, name, help_text='', function=None, **labels):
+        return self.add(Gauge(name, help_text, labels, function), replace=function is not None)
+
+    def histogram(self, name, help_text='', buckets=TIME_BUCKETS, **labels):
+        return self.add(Histogram(name, help_text, labels, buckets))
+
+    def remove(self, **labels):
+        # Remove as métricas que têm todos os rótulos dados (ex.: session="COM3")
+        with self.lock:
+            for key, metric in list(self.metrics.items()):
+                if all(metric.labels.get(name) == value for name, value in labels.items()):
+                    del self.metrics[key]
+
+    def collect(self):
+        with self.lock:
+            metrics = list(self.metrics.values())
+        return sorted(metrics, key=lambda metric: metric.key)
+
+    def snapshot(self):
+        items = []
+        for metric in self.collect():
+            try:
+                value = metric.value
+            except Exception:
+                continue  # função de um objeto já fechado
+            items.append({'name': self.prefix + metric.name, 'type': metric.kind, 'labels': metric.labels, 'value': value})
+        return {'time': time.time(), 'metrics': items}
+
+    def prometheus(self):
+        # Formato de exposição em texto do Prometheus (0.0.4)
+        lines = []
+        described = set()
+        for metric in self.collect():
+            name = self.prefix + metric.name
+            try:
+                value = metric.value
+            except Exception:
+                continue
+            if name not in described:
+                described.add(name)
+                if metric.help:
+                    lines.append(f"# HELP {name} {metric.help}")
+                lines.append(f"# TYPE {name} {metric.kind}")
+            if isinstance(metric, Histogram):
+                total = 0
+                for bound, count in zip(metric.buckets + (float('inf'),), metric.counts):
+                    total += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f"{name}_bucket{format_labels(metric.labels, le=le)} {total}")
+                lines.append(f"{name}_sum{format_labels(metric.labels)} {metric.sum}")
+                lines.append(f"{name}_count{format_labels(metric.labels)} {metric.count}")
+            else:
+                lines.append(f"{name}{format_labels(metric.labels)} {value}")
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        # .json gera o instantâneo em JSON; qualquer outra extensão, texto do Prometheus.
+        # Escreve em um temporário e troca, para quem lê nunca ver um arquivo pela metade
+        if path.lower().endswith('.json'):
+            text = json.dumps(self.snapshot(), indent=2)
+        else:
+            text = self.prometheus()
+        temp = f"{path}.tmp"
+        with open(temp, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(temp, path)
+
+
+def format_labels(labels, **extra):
+    items = dict(labels, **extra)
+    if not items:
+        return ''
+    text = ','.join(f'{name}="{escape_label(value)}"' for name, value in items.items())
+    return '{' + text + '}'
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class StreamMetrics:
+    # Métricas de uma porta aberta. As do caminho quente ficam em atributos para
+    # não procurar no registro a cada bloco; o resto é lido do leitor e do
+    # decodificador na coleta
+    def __init__(self, registry, reader, decoder=None, **labels):
+        self.registry = registry
+        self.labels = labels
+        registry.counter('bytes_in_total', 'Bytes read from the port', lambda: reader.bytes_read, **labels)
+        registry.counter('dropped_bytes_total', 'Bytes discarded because the consumer fell behind', lambda: reader.dropped_bytes, **labels)
+        registry.gauge('buffer_fill_ratio', 'Fill level of the receive buffer (0-1)', reader.fill_level, **labels)
+        if decoder is not None:
+            registry.counter('frames_total', 'Frames decoded', lambda: decoder.frames, **labels)
+            registry.counter('frame_errors_total', 'Frames dropped (CRC, framing, overflow)', lambda: decoder.crc_errors + decoder.framing_errors + decoder.overflows, **labels)
+        self.bytes_out = registry.counter('bytes_out_total', 'Bytes written to the port', **labels)
+        self.decode_time = registry.histogram('decode_seconds', 'Time to decode and format one received chunk', **labels)
+        self.parse_time = registry.histogram('parse_seconds', 'Time to parse one received chunk into graph samples', **labels)
+
+    def close(self):
+        self.registry.remove(**self.labels)
+
+
+registry = None
+
+
+def get_metrics():
+    global registry
+    if registry is None:
+        registry = Registry()
+    return registry
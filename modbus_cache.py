@@ -0,0 +1,166 @@
+import time
+import logging
+import threading
+from collections import namedtuple
+import tkinter as tk
+from tkinter import ttk
+
+
+# Último valor de cada tag de um poller. O loop Modbus escreve (update,
+# set_quality) e a janela lê na thread do Tk: dispatch() entrega aos inscritos
+# só as tags que mudaram desde a chamada anterior, uma vez cada, mesmo que
+# tenham sido lidas várias vezes nesse meio tempo. O custo de redesenho segue o
+# número de valores que mudam, não o número de tags lidas.
+
+QUALITY_GOOD = 'good'
+QUALITY_BAD = 'bad'  # última leitura falhou ou a porta caiu; o valor é o último bom
+
+# timestamp: última leitura (segundos desde 1970); changed: última mudança de valor
+TagValue = namedtuple('TagValue', 'tag value timestamp quality changed')
+
+
+def tag_key(tag):
+    # Uma bobina e um registrador podem ter o mesmo endereço
+    return (tag.unit, tag.function, tag.address)
+
+
+class TagCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.changed = {}  # chave -> TagValue, mudanças ainda não entregues
+        self.subscribers = {}  # chave -> [callback(TagValue)]
+        self.listeners = []  # callback([TagValue]) com todas as mudanças de um despacho
+        self.updates = 0
+        self.changes = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, tag):
+        return self.entries.get(tag_key(tag))
+
+    def values(self):
+        return list(self.entries.values())
+
+    def update(self, values, timestamp=None):
+        # {tag: valor}; chamado de qualquer thread
+        timestamp = time.time() if timestamp is None else timestamp
+        with self.lock:
+            for tag, value in values.items():
+                key = tag_key(tag)
+                entry = self.entries.get(key)
+                self.updates += 1
+                if entry is not None and entry.value == value and entry.quality == QUALITY_GOOD:
+                    # Mesmo valor: só o instante da leitura, sem avisar ninguém
+                    self.entries[key] = entry._replace(timestamp=timestamp)
+                    continue
+                entry = TagValue(tag, value, timestamp, QUALITY_GOOD, timestamp)
+                self.entries[key] = entry
+                self.changed[key] = entry
+                self.changes += 1
+
+    def set_quality(self, tags, quality):
+        with self.lock:
+            for tag in tags:
+                key = tag_key(tag)
+                entry = self.entries.get(key)
+                if entry is None:
+                    entry = TagValue(tag, None, None, quality, None)
+                elif entry.quality == quality:
+                    continue
+                else:
+                    entry = entry._replace(quality=quality)
+                self.entries[key] = entry
+                self.changed[key] = entry
+
+    def subscribe(self, tags, callback):
+        # callback(TagValue) na thread do Tk a cada mudança da tag; recebe o
+        # valor atual na hora, se já houver
+        for tag in tags:
+            key = tag_key(tag)
+            self.subscribers.setdefault(key, []).append(callback)
+            entry = self.entries.get(key)
+            if entry is not None:
+                callback(entry)
+
+    def unsubscribe(self, callback):
+        for key, callbacks in list(self.subscribers.items()):
+            self.subscribers[key] = [item for item in callbacks if item != callback]
+            if not self.subscribers[key]:
+                del self.subscribers[key]
+
+    def take_changes(self):
+        with self.lock:
+            changes, self.changed = self.changed, {}
+        return list(changes.values())
+
+    def dispatch(self):
+        # Uma vez por quadro, na thread do Tk
+        changes = self.take_changes()
+        if not changes:
+            return changes
+        for entry in changes:
+            for callback in self.subscribers.get(tag_key(entry.tag), ()):
+                try:
+                    callback(entry)
+                except Exception as e:
+                    logging.error(f"Error updating Modbus tag {entry.tag.name}: {e}")
+        for listener in self.listeners:
+            listener(changes)
+        return changes
+
+
+def format_value(entry):
+    if entry.value is None:
+        return ''
+    if isinstance(entry.value, float):
+        return f"{entry.value:.6g}"
+    return str(entry.value)
+
+
+class TagTable:
+    # Tabela com uma linha por tag; só as linhas que mudaram são reescritas
+    def __init__(self, master, translate):
+        self.translate = translate
+        self.cache = None
+        self.rows = {}
+        columns = ('value', 'quality', 'time')
+        self.tree = ttk.Treeview(master, columns=columns)
+        self.tree.heading('#0', text=translate('tag'))
+        self.tree.column('#0', width=160)
+        for column, width in zip(columns, (120, 70, 110)):
+            self.tree.heading(column, text=translate(f'tag_{column}'))
+            self.tree.column(column, width=width, anchor=tk.E)
+        self.tree.tag_configure(QUALITY_BAD, foreground='#b00020')
+        scrollbar = ttk.Scrollbar(master, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+    def attach(self, cache, tags):
+        # Troca de poller (outra sessão, reconexão)
+        if cache is self.cache:
+            return
+        self.detach()
+        self.cache = cache
+        if cache is None:
+            return
+        for tag in tags:
+            self.rows[tag_key(tag)] = self.tree.insert('', tk.END, text=tag.name, values=('', '', ''))
+        cache.subscribe(tags, self.update_row)
+
+    def detach(self):
+        if self.cache is not None:
+            self.cache.unsubscribe(self.update_row)
+            self.cache = None
+        self.tree.delete(*self.tree.get_children())
+        self.rows = {}
+
+    def update_row(self, entry):
+        row = self.rows.get(tag_key(entry.tag))
+        if row is None:
+            return
+        stamp = time.strftime('%H:%M:%S', time.localtime(entry.timestamp)) if entry.timestamp else ''
+        quality = self.translate(f'quality_{entry.quality}')
+        self.tree.item(row, values=(format_value(entry), quality, stamp), tags=(entry.quality,))
@@ -0,0 +1,268 @@
+import time
+import queue
+import atexit
+import asyncio
+import logging
+import threading
+
+from modbus_scheduler import BusStats, build_groups, create_client, modbus_read, read_result
+from metrics import get_metrics
+from modbus_cache import TagCache, QUALITY_BAD
+
+
+# Eventos entregues às janelas pela fila de cada poller:
+#   (EVENT_CONNECTED, poller, True/False)
+#   (EVENT_VALUES, poller, {tag: valor})
+#   (EVENT_ERROR, poller, mensagem)
+EVENT_CONNECTED = 'connected'
+EVENT_VALUES = 'values'
+EVENT_ERROR = 'error'
+
+
+class Bus:
+    # Um cliente assíncrono por porta; o lock serializa as requisições (RTU é half-duplex)
+    def __init__(self, port, options):
+        self.port = port
+        self.options = options
+        self.client = None
+        self.lock = None
+        self.users = 0
+        self.stats = BusStats(options['baudrate'])
+        metrics = get_metrics()
+        stats = self.stats
+        self.latency = metrics.histogram('modbus_request_seconds', 'Modbus request round-trip time', port=port)
+        metrics.counter('modbus_requests_total', 'Modbus requests sent', lambda: stats.requests, port=port)
+        metrics.counter('modbus_errors_total', 'Modbus requests that failed', lambda: stats.errors, port=port)
+        metrics.counter('modbus_timeouts_total', 'Modbus requests without a response', lambda: stats.timeouts, port=port)
+        metrics.gauge('modbus_bus_utilization', 'Fraction of time the bus is busy', stats.utilization, port=port)
+
+    async def ensure_connected(self):
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+        if self.client is None:
+            from pymodbus.client import AsyncModbusSerialClient
+            self.client = create_client(self.port, self.options, AsyncModbusSerialClient)
+        if self.client.connected:
+            return True
+        async with self.lock:
+            if not self.client.connected:
+                await self.client.connect()
+        return self.client.connected
+
+    async def read(self, request):
+        start = time.monotonic()
+        response = None
+        error = None
+        try:
+            async with self.lock:
+                response = await modbus_read(self.client, request.function, request.address, request.count, request.unit)
+        except Exception as e:
+            error = e
+        elapsed = time.monotonic() - start
+        self.latency.observe(elapsed)
+        return read_result(self.stats, request, elapsed, response, error)
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+        get_metrics().remove(port=self.port)
+
+
+class Poller:
+    def __init__(self, engine, bus, tags, events, max_gap=10, name=None):
+        self.engine = engine
+        self.bus = bus
+        self.tags = list(tags)
+        self.events = events
+        self.name = name or bus.port
+        self.groups = build_groups(self.tags, max_gap)
+        self.cache = TagCache()  # últimos valores, lidos pela janela com cache.dispatch()
+        self.connected = None
+        self.task = None
+        self.busy = False
+        self.stopped = False
+
+    @property
+    def requests(self):
+        return [request for group in self.groups for request in group.requests]
+
+    @property
+    def stats(self):
+        return self.bus.stats
+
+    def emit(self, kind, payload):
+        self.events.put((kind, self, payload))
+
+    async def run(self, retry_interval=1.0, max_retry_interval=10.0):
+        retry = retry_interval
+        while not self.stopped:
+            try:
+                connected = await self.bus.ensure_connected()
+            except Exception as e:
+                logging.error(f"Modbus connect failed on {self.bus.port}: {e}")
+                connected = False
+            if connected != self.connected:
+                self.connected = connected
+                if not connected:
+                    self.cache.set_quality(self.tags, QUALITY_BAD)
+                self.emit(EVENT_CONNECTED, connected)
+            if not connected:
+                # Tenta de novo com espera crescente, sem bloquear os outros pollers
+                await asyncio.sleep(retry)
+                retry = min(retry * 2, max_retry_interval)
+                continue
+            retry = retry_interval
+
+            now = time.monotonic()
+            for group in self.groups:
+                if group.next_due > now:
+                    continue
+                values = {}
+                for request in group.requests:
+                    self.busy = True
+                    try:
+                        result, error = await self.bus.read(request)
+                    finally:
+                        self.busy = False
+                    if self.stopped:
+                        return
+                    if error is None:
+                        values.update(result)
+                        failed = [tag for tag in request.tags if tag not in result]
+                        if failed:
+                            self.cache.set_quality(failed, QUALITY_BAD)
+                    else:
+                        self.cache.set_quality(request.tags, QUALITY_BAD)
+                        self.emit(EVENT_ERROR, f"{request}: {error}")
+                if values:
+                    self.cache.update(values)
+                    self.emit(EVENT_VALUES, values)
+                group.schedule_next(time.monotonic())
+
+            if not self.groups:
+                return
+            # Dorme até o prazo do próximo grupo em vez de um intervalo fixo
+            deadline = min(group.next_due for group in self.groups)
+            await asyncio.sleep(max(deadline - time.monotonic(), 0))
+
+    def cancel(self):
+        # Chamado no loop. Uma requisição em andamento não é interrompida (o
+        # cancelamento no meio do wait_for do pymodbus pode travar a tarefa);
+        # o poller sai assim que ela termina
+        self.stopped = True
+        if self.task is not None and not self.busy:
+            self.task.cancel()
+
+    def stop(self):
+        self.engine.remove_poller(self)
+
+
+class ModbusEngine:
+    # Um único loop asyncio em segundo plano para todas as portas e dispositivos;
+    # as janelas Tk só falam com ele pelos métodos abaixo e pela fila de eventos
+    def __init__(self):
+        self.loop = None
+        self.thread = None
+        self.buses = {}
+        self.pollers = set()
+        self.ready = threading.Event()
+
+    def start(self):
+        if self.thread is not None:
+            return
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.run, name="ModbusEngine", daemon=True)
+        self.thread.start()
+        self.ready.wait()
+        atexit.register(self.stop)
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(self.ready.set)
+        self.loop.run_forever()
+
+    def add_poller(self, port, options, tags, events=None, max_gap=10, name=None):
+        # options: saída de settings.serial_options; events: queue.Queue lida pela janela
+        self.start()
+        events = queue.Queue() if events is None else events
+        bus = self.buses.get(port)
+        if bus is None:
+            bus = self.buses[port] = Bus(port, options)
+        bus.users += 1
+        poller = Poller(self, bus, tags, events, max_gap, name)
+        self.pollers.add(poller)
+
+        def schedule():
+            now = time.monotonic()
+            for group in poller.groups:
+                group.next_due = now
+            poller.task = self.loop.create_task(poller.run())
+
+        self.loop.call_soon_threadsafe(schedule)
+        return poller
+
+    def remove_poller(self, poller):
+        if poller not in self.pollers:
+            return
+        self.pollers.discard(poller)
+        bus = poller.bus
+        bus.users -= 1
+
+        def cancel():
+            poller.cancel()
+            if bus.users <= 0:
+                if poller.task is None or poller.task.done():
+                    bus.close()
+                else:
+                    poller.task.add_done_callback(lambda task: bus.close())
+
+        if bus.users <= 0:
+            self.buses.pop(bus.port, None)
+        self.loop.call_soon_threadsafe(cancel)
+
+    async def shutdown(self, pollers):
+        # Cancela os pollers e espera terminarem antes de fechar as portas
+        for poller in pollers:
+            poller.cancel()
+        tasks = [poller.task for poller in pollers if poller.task is not None]
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for bus in list(self.buses.values()):
+            bus.close()
+        self.buses.clear()
+
+    def stop(self, timeout=2):
+        atexit.unregister(self.stop)
+        if self.thread is None:
+            return
+        pollers = list(self.pollers)
+        self.pollers.clear()
+        try:
+            asyncio.run_coroutine_threadsafe(self.shutdown(pollers), self.loop).result(timeout)
+        except Exception as e:
+            logging.error(f"Error stopping Modbus engine: {e}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout)
+        self.thread = None
+        self.ready.clear()
+
+
+def drain_events(events, limit=1000):
+    # Chamado na thread do Tk; nunca bloqueia
+    items = []
+    while len(items) < limit:
+        try:
+            items.append(events.get_nowait())
+        except queue.Empty:
+            break
+    return items
+
+
+engine = None
+
+
+def get_engine():
+    global engine
+    if engine is None:
+        engine = ModbusEngine()
+    return engine
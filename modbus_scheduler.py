@@ -0,0 +1,333 @@
+import csv
+import json
+import time
+import struct
+import inspect
+import logging
+
+
+READ_METHODS = {
+    1: 'read_coils',
+    2: 'read_discrete_inputs',
+    3: 'read_holding_registers',
+    4: 'read_input_registers'
+}
+BIT_FUNCTIONS = (1, 2)
+
+# Limites por requisição da especificação Modbus
+MAX_REGISTERS = 125
+MAX_BITS = 2000
+
+TYPE_FORMATS = {
+    'bool': ('?', 1),
+    'uint16': ('H', 1),
+    'int16': ('h', 1),
+    'uint32': ('I', 2),
+    'int32': ('i', 2),
+    'float32': ('f', 2)
+}
+
+# O nome do parâmetro do escravo mudou entre versões do pymodbus
+UNIT_KEYWORDS = ('device_id', 'slave', 'unit')
+
+
+class Tag:
+    def __init__(self, name, unit=1, function=3, address=0, data_type='uint16', period=1.0, word_order='big'):
+        if function not in READ_METHODS:
+            raise ValueError(f"Unsupported Modbus function {function} for tag '{name}'")
+        if data_type not in TYPE_FORMATS:
+            raise ValueError(f"Unsupported data type '{data_type}' for tag '{name}'")
+        self.name = name
+        self.unit = int(unit)
+        self.function = int(function)
+        self.address = int(address)
+        self.data_type = 'bool' if self.function in BIT_FUNCTIONS else data_type
+        self.period = float(period)
+        self.word_order = word_order
+
+    @property
+    def size(self):
+        return TYPE_FORMATS[self.data_type][1]
+
+    @property
+    def key(self):
+        return (self.unit, self.address)
+
+    @classmethod
+    def from_dict(cls, item):
+        return cls(
+            item['name'],
+            unit=item.get('unit', 1),
+            function=int(item.get('function', 3)),
+            address=item.get('address', 0),
+            data_type=item.get('type', 'uint16'),
+            period=item.get('period', 1.0),
+            word_order=item.get('word_order', 'big')
+        )
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'unit': self.unit,
+            'function': self.function,
+            'address': self.address,
+            'type': self.data_type,
+            'period': self.period,
+            'word_order': self.word_order
+        }
+
+    def decode(self, words):
+        if self.data_type == 'bool':
+            # Registrador lido como booleano: qualquer valor diferente de zero
+            return words[0] != 0
+        fmt, size = TYPE_FORMATS[self.data_type]
+        if self.word_order == 'little':
+            words = list(reversed(words))
+        raw = struct.pack(f'>{size}H', *words)
+        return struct.unpack(f'>{fmt}', raw)[0]
+
+    def __repr__(self):
+        return f"Tag({self.name!r}, unit={self.unit}, function={self.function}, address={self.address})"
+
+
+class ReadRequest:
+    def __init__(self, unit, function, address, count, tags):
+        self.unit = unit
+        self.function = function
+        self.address = address
+        self.count = count
+        self.tags = tags
+
+    def decode(self, values):
+        # values: registradores (funções 3/4) ou bits (funções 1/2)
+        # Uma tag que não decodifica fica de fora sem derrubar as outras
+        result = {}
+        for tag in self.tags:
+            offset = tag.address - self.address
+            try:
+                if self.function in BIT_FUNCTIONS:
+                    result[tag] = bool(values[offset])
+                else:
+                    result[tag] = tag.decode(values[offset:offset + tag.size])
+            except (struct.error, IndexError, TypeError) as e:
+                logging.error(f"Error decoding Modbus tag {tag.name}: {e}")
+        return result
+
+    def wire_bytes(self):
+        # Bytes no fio (RTU): requisição de 8 bytes + resposta
+        if self.function in BIT_FUNCTIONS:
+            data = (self.count + 7) // 8
+        else:
+            data = 2 * self.count
+        return 8 + 5 + data
+
+    def __repr__(self):
+        return f"ReadRequest(unit={self.unit}, function={self.function}, address={self.address}, count={self.count})"
+
+
+def plan_requests(tags, max_gap=10):
+    # Junta endereços próximos do mesmo escravo e função em uma requisição,
+    # lendo até max_gap registradores não usados entre eles
+    groups = {}
+    for tag in tags:
+        groups.setdefault((tag.unit, tag.function), []).append(tag)
+
+    requests = []
+    for (unit, function), group in sorted(groups.items()):
+        limit = MAX_BITS if function in BIT_FUNCTIONS else MAX_REGISTERS
+        group.sort(key=lambda tag: tag.address)
+        start = end = None
+        members = []
+        for tag in group:
+            tag_end = tag.address + tag.size
+            if members and tag.address - end <= max_gap and max(end, tag_end) - start <= limit:
+                end = max(end, tag_end)
+                members.append(tag)
+                continue
+            if members:
+                requests.append(ReadRequest(unit, function, start, end - start, members))
+            start, end, members = tag.address, tag_end, [tag]
+        if members:
+            requests.append(ReadRequest(unit, function, start, end - start, members))
+    return requests
+
+
+class PollGroup:
+    def __init__(self, period, requests):
+        self.period = period
+        self.requests = requests
+        self.next_due = 0.0
+
+    def schedule_next(self, now):
+        self.next_due += self.period
+        if self.next_due < now:
+            # Ficou para trás: não tenta recuperar ciclos perdidos
+            self.next_due = now + self.period
+
+
+def build_groups(tags, max_gap=10):
+    by_period = {}
+    for tag in tags:
+        by_period.setdefault(tag.period, []).append(tag)
+    return [PollGroup(period, plan_requests(group, max_gap)) for period, group in sorted(by_period.items())]
+
+
+class BusStats:
+    def __init__(self, baudrate=None):
+        self.baudrate = baudrate
+        self.reset()
+
+    def reset(self):
+        self.started = time.monotonic()
+        self.busy_time = 0.0
+        self.wire_time = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.timeouts = 0
+
+    def record(self, request, elapsed, error=None):
+        self.requests += 1
+        self.busy_time += elapsed
+        if self.baudrate:
+            # 11 bits por caractere RTU (start, 8 dados, paridade/stop, stop)
+            self.wire_time += request.wire_bytes() * 11 / self.baudrate
+        if error is not None:
+            self.errors += 1
+            if 'timeout' in str(error).lower() or 'no response' in str(error).lower():
+                self.timeouts += 1
+
+    def utilization(self):
+        elapsed = time.monotonic() - self.started
+        return self.busy_time / elapsed if elapsed > 0 else 0.0
+
+    def wire_utilization(self):
+        elapsed = time.monotonic() - self.started
+        return self.wire_time / elapsed if elapsed > 0 else 0.0
+
+    def summary(self):
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'timeouts': self.timeouts,
+            'utilization': round(self.utilization(), 4),
+            'wire_utilization': round(self.wire_utilization(), 4)
+        }
+
+
+class PollScheduler:
+    def __init__(self, client, tags, max_gap=10, baudrate=None):
+        self.client = client
+        self.tags = list(tags)
+        self.groups = build_groups(self.tags, max_gap)
+        self.stats = BusStats(baudrate)
+        now = time.monotonic()
+        for group in self.groups:
+            group.next_due = now
+
+    @property
+    def requests(self):
+        return [request for group in self.groups for request in group.requests]
+
+    def next_deadline(self):
+        if not self.groups:
+            return None
+        return min(group.next_due for group in self.groups)
+
+    def poll_due(self, now=None):
+        # Executa os grupos vencidos; retorna ({tag: valor}, [(requisição, erro)])
+        now = time.monotonic() if now is None else now
+        values = {}
+        errors = []
+        for group in self.groups:
+            if group.next_due > now:
+                continue
+            for request in group.requests:
+                result, error = self.execute(request)
+                if error is None:
+                    values.update(result)
+                else:
+                    errors.append((request, error))
+            group.schedule_next(time.monotonic())
+        return values, errors
+
+    def execute(self, request):
+        start = time.monotonic()
+        try:
+            response = modbus_read(self.client, request.function, request.address, request.count, request.unit)
+        except Exception as e:
+            return read_result(self.stats, request, time.monotonic() - start, error=e)
+        return read_result(self.stats, request, time.monotonic() - start, response)
+
+
+def unit_keyword(method):
+    try:
+        parameters = inspect.signature(method).parameters
+    except (TypeError, ValueError):
+        return 'slave'
+    for keyword in UNIT_KEYWORDS:
+        if keyword in parameters:
+            return keyword
+    return 'slave'
+
+
+def modbus_read(client, function, address, count, unit):
+    # Funciona com o cliente síncrono e o assíncrono (retorna a corrotina)
+    method = getattr(client, READ_METHODS[function])
+    return method(address, count=count, **{unit_keyword(method): unit})
+
+
+def read_result(stats, request, elapsed, response=None, error=None):
+    # Tratamento comum das leituras síncronas e assíncronas: decodifica a
+    # resposta, conta nas estatísticas do barramento e registra a falha.
+    # Retorna (valores, erro)
+    result = {}
+    if error is None:
+        if response.isError():
+            error = response
+        else:
+            bits = request.function in BIT_FUNCTIONS
+            result = request.decode(response.bits if bits else response.registers)
+    stats.record(request, elapsed, error)
+    if error is not None:
+        logging.error(f"Modbus read failed for {request}: {error}")
+    return result, error
+
+
+def create_client(port, options, client_class=None):
+    # options: saída de settings.serial_options
+    if client_class is None:
+        from pymodbus.client import ModbusSerialClient as client_class
+    return client_class(
+        port=port,
+        baudrate=options['baudrate'],
+        bytesize=options['bytesize'],
+        parity=options['parity'],
+        stopbits=options['stopbits'],
+        timeout=options['timeout']
+    )
+
+
+def default_tags(unit=1, address=0, count=10, period=1.0):
+    # Equivalente à leitura fixa de 10 holding registers usada antes
+    return [Tag(f"HR{address + i}", unit=unit, function=3, address=address + i, period=period) for i in range(count)]
+
+
+def tags_from_settings(settings):
+    items = settings.get('modbus_tags') or []
+    if not items:
+        return default_tags()
+    return [Tag.from_dict(item) for item in items]
+
+
+def load_tags(path):
+    # Tabela de tags em JSON (lista de objetos) ou CSV com cabeçalho
+    # name,unit,function,address,type,period
+    if path.lower().endswith('.csv'):
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            items = [row for row in csv.DictReader(f) if row.get('name')]
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            items = json.load(f)
+        if isinstance(items, dict):
+            items = items.get('modbus_tags', [])
+    return [Tag.from_dict(item) for item in items]
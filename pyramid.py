@@ -0,0 +1,297 @@
+import time
+import logging
+import tkinter as tk
+from tkinter import ttk
+
+import numpy as np
+
+from ring_buffer import RingBuffer
+
+
+# Pirâmide de resoluções do histórico de uma sessão: as amostras cruas mais
+# recentes e níveis com mínimo, máximo e média a cada 10, 100, 1000... amostras.
+# Cada bloco que chega atualiza os níveis de forma incremental (um reshape e uma
+# redução por nível), e uma consulta lê só o nível que cabe na tela: o custo de
+# mostrar um dia inteiro é o mesmo de mostrar um minuto.
+
+# Blocos no nível mais grosso com o histórico inteiro (uma tela larga)
+TOP_BLOCKS = 2000
+
+
+class Level:
+    # Os últimos 'depth' blocos de 'scale' amostras cada
+    def __init__(self, scale, depth, channels):
+        self.scale = scale
+        self.minimum = RingBuffer(depth, channels)
+        self.maximum = RingBuffer(depth, channels)
+        self.mean = RingBuffer(depth, channels)
+        # Blocos do nível de baixo que ainda não fecham um bloco deste:
+        # (mínimo, máximo, soma, contagem)
+        self.carry = None
+
+    @property
+    def first(self):
+        # Índice do bloco mais antigo ainda guardado
+        return self.minimum.total - len(self.minimum)
+
+    @property
+    def total(self):
+        return self.minimum.total
+
+    def extend(self, blocks, factor):
+        if self.carry is not None:
+            blocks = tuple(np.concatenate([carry, block]) for carry, block in zip(self.carry, blocks))
+        n = len(blocks[0])
+        complete = n - n % factor
+        self.carry = tuple(block[complete:] for block in blocks) if complete < n else None
+        if not complete:
+            return None
+        shape = (complete // factor, factor, blocks[0].shape[1])
+        # fmin/fmax ignoram NaN (campo vazio); um bloco só de NaN continua NaN
+        minimum = np.fmin.reduce(blocks[0][:complete].reshape(shape), axis=1)
+        maximum = np.fmax.reduce(blocks[1][:complete].reshape(shape), axis=1)
+        total = blocks[2][:complete].reshape(shape).sum(axis=1)
+        count = blocks[3][:complete].reshape(shape).sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = total / count
+        self.minimum.extend(minimum)
+        self.maximum.extend(maximum)
+        self.mean.extend(mean)
+        return minimum, maximum, total, count
+
+    def read(self, start, end):
+        # Blocos [start, end) em índices deste nível, já limitados ao que está guardado
+        first = self.first
+        start = max(start, first) - first
+        end = min(end, self.total) - first
+        return self.minimum.view()[start:end], self.maximum.view()[start:end], self.mean.view()[start:end]
+
+    def resize(self, channels):
+        for buffer in (self.minimum, self.maximum, self.mean):
+            buffer.resize(buffer.capacity, channels)
+        if self.carry is not None:
+            extra = channels - self.carry[0].shape[1]
+            fill = (np.nan, np.nan, 0.0, 0)
+            self.carry = tuple(np.hstack([block, np.full((len(block), extra), value, dtype=block.dtype)]) for block, value in zip(self.carry, fill))
+
+
+class MinMaxPyramid:
+    def __init__(self, history=100000000, channels=1, factor=10, depth=50000):
+        # history: amostras que a pirâmide deve cobrir; depth: blocos por nível.
+        # Os níveis vão até o histórico inteiro caber em TOP_BLOCKS blocos; os
+        # mais grossos só guardam os blocos que cobrem o histórico
+        # (100 milhões de amostras: cru + 5 níveis, ~9 MB por canal)
+        self.history = max(int(history), 1)
+        self.factor = max(int(factor), 2)
+        self.depth = max(int(depth), 1)
+        self.channels = max(int(channels), 1)
+        self.raw = RingBuffer(self.depth, self.channels)
+        self.levels = []
+        scale = 1
+        while self.depth * scale < self.history or self.history > TOP_BLOCKS * scale:
+            scale *= self.factor
+            self.levels.append(Level(scale, min(self.depth, -(-self.history // scale)), self.channels))
+
+    @property
+    def total(self):
+        return self.raw.total
+
+    @property
+    def first(self):
+        # Amostra mais antiga que ainda aparece em algum nível
+        if self.levels:
+            level = self.levels[-1]
+            return level.first * level.scale
+        return self.raw.total - len(self.raw)
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if values.ndim == 1:
+            values = values.reshape(-1, 1)
+        if not len(values):
+            return
+        if values.shape[1] > self.channels:
+            self.resize(values.shape[1])
+        elif values.shape[1] < self.channels:
+            values = self.raw.fit_channels(values)
+        self.raw.extend(values)
+        valid = np.isfinite(values)
+        blocks = (values, values, np.where(valid, values, 0.0), valid.astype(np.int64))
+        for level in self.levels:
+            blocks = level.extend(blocks, self.factor)
+            if blocks is None:
+                break
+
+    def resize(self, channels):
+        self.channels = channels
+        self.raw.resize(self.raw.capacity, channels)
+        for level in self.levels:
+            level.resize(channels)
+
+    def clear(self):
+        self.__init__(self.history, self.channels, self.factor, self.depth)
+
+    def select(self, start, end, points):
+        # Nível mais fino com no máximo 'points' blocos no intervalo e que ainda
+        # tem o início dele; o cru vale quando cabem 2 * points amostras (o
+        # mesmo número de vértices do envelope mínimo/máximo)
+        width = max(end - start, 1)
+        if width <= 2 * points and self.raw.total - len(self.raw) <= start:
+            return None
+        for level in self.levels:
+            if width / level.scale <= points and level.first * level.scale <= start:
+                return level
+        return self.levels[-1] if self.levels else None
+
+    def query(self, start, end, points=1000):
+        # Intervalo [start, end) em índices de amostra. Retorna (x, mínimo,
+        # máximo, média, escala): x no centro de cada bloco, uma coluna por
+        # canal. Os blocos mais recentes, que ainda não fecharam no nível
+        # escolhido, vêm dos níveis mais finos
+        start = max(int(start), 0)
+        end = min(int(np.ceil(end)), self.total)
+        points = max(int(points), 1)
+        level = self.select(start, end, points)
+        if level is None:
+            x, minimum, maximum, mean = self.read_raw(start, end)
+            return x, minimum, maximum, mean, 1
+        segments = []
+        finer = [None] + self.levels[:self.levels.index(level)]
+        position = start
+        for current in [level] + finer[::-1]:
+            if position >= end:
+                break
+            if current is None:
+                segments.append(self.read_raw(position, end))
+                break
+            scale = current.scale
+            first = max(position // scale, current.first)
+            last = min(-(-end // scale), current.total)
+            if last <= first:
+                continue
+            minimum, maximum, mean = current.read(first, last)
+            x = (np.arange(first, first + len(minimum)) + 0.5) * scale
+            segments.append((x, minimum, maximum, mean))
+            position = max(position, (first + len(minimum)) * scale)
+        if not segments:
+            empty = np.empty((0, self.channels))
+            return np.empty(0), empty, empty, empty, level.scale
+        x, minimum, maximum, mean = (np.concatenate(parts) for parts in zip(*segments))
+        return x, minimum, maximum, mean, level.scale
+
+    def read_raw(self, start, end):
+        first = self.raw.total - len(self.raw)
+        start = max(start, first)
+        values = self.raw.view()[start - first:max(end - first, 0)]
+        return np.arange(start, start + len(values)), values, values, values
+
+
+def envelope(x, minimum, maximum):
+    # Um par mínimo/máximo por bloco, no formato das linhas do gráfico ao vivo
+    y = np.empty((2 * len(minimum), minimum.shape[1]))
+    y[0::2] = minimum
+    y[1::2] = maximum
+    return np.repeat(x, 2), y
+
+
+class HistoryPanel:
+    # Histórico da sessão ativa com zoom e panorâmica (barra do Matplotlib). A
+    # cada mudança dos limites só o nível que cabe na largura do eixo é lido.
+    # Em "Seguir" mostra todo o histórico e acompanha os dados novos
+    def __init__(self, master, get_session, translate, interval=1000):
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+
+        self.master = master
+        self.get_session = get_session
+        self.translate = translate
+        self.interval = interval
+        self.follow = tk.BooleanVar(value=True)
+        self.show_mean = tk.BooleanVar(value=False)
+        self.job = None
+        self.session = None
+        self.updating = False  # limites alterados pelo próprio painel, não pelo usuário
+
+        controls = ttk.Frame(master)
+        controls.pack(padx=5, pady=5, fill=tk.X)
+        ttk.Checkbutton(controls, text=translate('follow'), variable=self.follow, command=self.schedule).pack(side=tk.LEFT, padx=5)
+        ttk.Checkbutton(controls, text=translate('show_mean'), variable=self.show_mean, command=self.schedule).pack(side=tk.LEFT, padx=5)
+        self.level_label = ttk.Label(controls, text='')
+        self.level_label.pack(side=tk.RIGHT, padx=5)
+
+        self.fig = Figure(figsize=(7, 3.5))
+        self.ax = self.fig.add_subplot()
+        self.ax.set_xlabel(translate('samples'))
+        self.ax.grid(True, alpha=0.3)
+        self.lines = []
+        self.canvas = FigureCanvasTkAgg(self.fig, master=master)
+        toolbar = NavigationToolbar2Tk(self.canvas, master, pack_toolbar=False)
+        toolbar.pack(side=tk.BOTTOM, fill=tk.X)
+        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.ax.callbacks.connect('xlim_changed', self.on_xlim_changed)
+
+        self.job = master.after(0, self.refresh)
+
+    def on_xlim_changed(self, ax):
+        if self.updating:
+            return
+        # Zoom ou panorâmica do usuário: para de seguir e relê o nível certo
+        self.follow.set(False)
+        self.schedule()
+
+    def schedule(self):
+        if self.job is not None:
+            self.master.after_cancel(self.job)
+        self.job = self.master.after_idle(self.refresh)
+
+    def close(self):
+        if self.job is not None:
+            self.master.after_cancel(self.job)
+            self.job = None
+
+    def refresh(self):
+        self.job = None
+        try:
+            session = self.get_session()
+            if session is not None and session.history is not None:
+                self.draw(session)
+        except Exception as e:
+            logging.error(f"Error updating history: {e}")
+        self.job = self.master.after(self.interval, self.refresh)
+
+    def draw(self, session):
+        history = session.history
+        if not history.total:
+            return
+        start = time.perf_counter()
+        if self.follow.get() or session is not self.session:
+            low, high = history.first, history.total
+        else:
+            low, high = self.ax.get_xlim()
+        x, minimum, maximum, mean, scale = history.query(low, high, self.ax.bbox.width)
+        if self.show_mean.get() and scale > 1:
+            y = mean
+        else:
+            x, y = envelope(x, minimum, maximum) if scale > 1 else (x, minimum)
+        if len(self.lines) != y.shape[1] or session is not self.session:
+            for line in self.lines:
+                line.remove()
+            self.lines = [self.ax.plot([], [], linewidth=0.8, label=session.channel_parser.channel_name(index))[0] for index in range(y.shape[1])]
+            if len(self.lines) > 1:
+                self.ax.legend(loc='upper left', fontsize='small')
+            self.session = session
+        for index, line in enumerate(self.lines):
+            line.set_data(x, y[:, index])
+        self.updating = True
+        try:
+            if self.follow.get():
+                self.ax.set_xlim(low, max(high, low + 1))
+            finite = y[np.isfinite(y)]
+            if finite.size:
+                span = finite.max() - finite.min() or max(abs(finite.max()), 1.0)
+                self.ax.set_ylim(finite.min() - span * 0.05, finite.max() + span * 0.05)
+        finally:
+            self.updating = False
+        self.canvas.draw_idle()
+        elapsed = (time.perf_counter() - start) * 1000
+        self.level_label.config(text=f"1:{scale} · {len(x)} {self.translate('points')} · {elapsed:.0f} ms")
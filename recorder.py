@@ -0,0 +1,226 @@
+import os
+import mmap
+import time
+import atexit
+import bisect
+import struct
+import logging
+import threading
+from collections import deque
+
+
+# Formato do arquivo de captura (.slzcap):
+#   cabeçalho: MAGIC + '<dd' (relógio de parede e monotônico no início)
+#   registros: '<BdHI' (tipo, instante monotônico, id da porta, tamanho) + dados
+# Índice esparso (.slzcap.idx): INDEX_MAGIC + entradas '<BdQ' (tipo, instante, offset)
+MAGIC = b'SLZCAP\x00\x01'
+INDEX_MAGIC = b'SLZIDX\x00\x01'
+HEADER = struct.Struct('<dd')
+RECORD = struct.Struct('<BdHI')
+INDEX_ENTRY = struct.Struct('<BdQ')
+
+RECORD_DATA = 1
+RECORD_PORT = 2
+
+INDEX_TIME = 0
+INDEX_PORT = 1
+
+CAPTURE_EXTENSION = '.slzcap'
+
+
+def index_path(path):
+    return path + '.idx'
+
+
+class CaptureRecorder:
+    def __init__(self, path, flush_interval=0.5, index_interval=1.0, index_bytes=1024 * 1024):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.index_interval = index_interval
+        self.index_bytes = index_bytes
+
+        self.file = open(path, 'wb', buffering=1024 * 1024)
+        self.index_file = open(index_path(path), 'wb')
+        self.file.write(MAGIC + HEADER.pack(time.time(), time.monotonic()))
+        self.index_file.write(INDEX_MAGIC)
+        self.offset = len(MAGIC) + HEADER.size
+
+        self.ports = {}
+        self.last_index_time = None
+        self.last_index_offset = 0
+
+        self.pending = deque()
+        self.bytes_written = 0
+        self.records = 0
+        self.error = None
+
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="CaptureRecorder", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def write(self, timestamp, data, port=''):
+        # Chamado de qualquer thread; só enfileira, a escrita é feita em lote
+        self.pending.append((timestamp, port, bytes(data)))
+
+    def run(self):
+        while not self.stop_event.wait(self.flush_interval):
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        parts = []
+        index = []
+        while self.pending:
+            timestamp, port, data = self.pending.popleft()
+            port_id = self.ports.get(port)
+            if port_id is None:
+                port_id = self.ports[port] = len(self.ports)
+                name = port.encode('utf-8')
+                index.append(INDEX_ENTRY.pack(INDEX_PORT, timestamp, self.offset))
+                parts.append(RECORD.pack(RECORD_PORT, timestamp, port_id, len(name)))
+                parts.append(name)
+                self.offset += RECORD.size + len(name)
+
+            if (self.last_index_time is None
+                    or timestamp - self.last_index_time >= self.index_interval
+                    or self.offset - self.last_index_offset >= self.index_bytes):
+                index.append(INDEX_ENTRY.pack(INDEX_TIME, timestamp, self.offset))
+                self.last_index_time = timestamp
+                self.last_index_offset = self.offset
+
+            parts.append(RECORD.pack(RECORD_DATA, timestamp, port_id, len(data)))
+            parts.append(data)
+            self.offset += RECORD.size + len(data)
+            self.bytes_written += len(data)
+            self.records += 1
+        try:
+            self.file.write(b''.join(parts))
+            self.file.flush()
+            if index:
+                self.index_file.write(b''.join(index))
+                self.index_file.flush()
+        except OSError as e:
+            logging.error(f"Error writing capture file: {e}")
+            self.error = e
+
+    def close(self):
+        atexit.unregister(self.close)
+        if self.thread is None:
+            return
+        self.stop_event.set()
+        self.thread.join()
+        self.thread = None
+        self.file.close()
+        self.index_file.close()
+
+
+class CaptureReader:
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.size = os.fstat(self.file.fileno()).st_size
+        header_size = len(MAGIC) + HEADER.size
+        if self.size < header_size:
+            self.file.close()
+            raise ValueError(f"'{path}' is not a SeriaLuz capture file")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"'{path}' is not a SeriaLuz capture file")
+        self.wall_start, self.monotonic_start = HEADER.unpack_from(self.data, len(MAGIC))
+        self.first_offset = header_size
+
+        self.ports = {}
+        self.index_times = []
+        self.index_offsets = []
+        if not self.load_index():
+            self.rebuild_index()
+
+    def load_index(self):
+        try:
+            with open(index_path(self.path), 'rb') as f:
+                raw = f.read()
+        except OSError:
+            return False
+        if raw[:len(INDEX_MAGIC)] != INDEX_MAGIC:
+            return False
+        end = len(raw) - (len(raw) - len(INDEX_MAGIC)) % INDEX_ENTRY.size
+        for kind, timestamp, offset in INDEX_ENTRY.iter_unpack(raw[len(INDEX_MAGIC):end]):
+            if offset >= self.size:
+                break
+            if kind == INDEX_PORT:
+                self.read_record(offset)
+            else:
+                self.index_times.append(timestamp)
+                self.index_offsets.append(offset)
+        return True
+
+    def rebuild_index(self, interval=1.0):
+        # Sem o arquivo de índice: varre só os cabeçalhos dos registros
+        last = None
+        for offset, kind, timestamp, port_id, length in self.scan(self.first_offset):
+            if kind == RECORD_DATA and (last is None or timestamp - last >= interval):
+                self.index_times.append(timestamp)
+                self.index_offsets.append(offset)
+                last = timestamp
+
+    def scan(self, offset):
+        while offset + RECORD.size <= self.size:
+            kind, timestamp, port_id, length = RECORD.unpack_from(self.data, offset)
+            end = offset + RECORD.size + length
+            if end > self.size:
+                break  # registro incompleto no fim do arquivo
+            if kind == RECORD_PORT:
+                self.ports[port_id] = self.data[offset + RECORD.size:end].decode('utf-8', 'replace')
+            yield offset, kind, timestamp, port_id, length
+            offset = end
+
+    def read_record(self, offset):
+        for _ in self.scan(offset):
+            break
+
+    def seek(self, timestamp):
+        # Offset do último ponto do índice anterior ao instante pedido
+        position = bisect.bisect_right(self.index_times, timestamp) - 1
+        if position < 0:
+            return self.first_offset
+        return self.index_offsets[position]
+
+    def records(self, start=None, end=None):
+        offset = self.first_offset if start is None else self.seek(start)
+        view = memoryview(self.data)
+        for offset, kind, timestamp, port_id, length in self.scan(offset):
+            if kind != RECORD_DATA:
+                continue
+            if start is not None and timestamp < start:
+                continue
+            if end is not None and timestamp > end:
+                break
+            payload = view[offset + RECORD.size:offset + RECORD.size + length]
+            yield timestamp, self.ports.get(port_id, str(port_id)), payload
+
+    def wall_time(self, timestamp):
+        return self.wall_start + (timestamp - self.monotonic_start)
+
+    def monotonic_time(self, wall_time):
+        return self.monotonic_start + (wall_time - self.wall_start)
+
+    @property
+    def start_time(self):
+        return self.index_times[0] if self.index_times else None
+
+    def close(self):
+        try:
+            self.data.close()
+        except BufferError:
+            pass  # ainda há memoryviews de registros em uso; o GC fecha depois
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,113 @@
+import time
+import logging
+import math
+
+
+class AxisScaler:
+    def __init__(self, margin=0.1, shrink=0.25):
+        self.margin = margin  # folga adicionada em cada lado ao reescalar
+        self.shrink = shrink  # só reduz quando os dados ocupam menos que essa fração
+        self.limits = None
+
+    def reset(self):
+        self.limits = None
+
+    def update(self, low, high):
+        # Retorna os novos limites, ou None se os atuais ainda servem
+        if not (math.isfinite(low) and math.isfinite(high)):
+            return None
+        if self.limits is not None:
+            current_low, current_high = self.limits
+            inside = low >= current_low and high <= current_high
+            if inside and (high - low) >= self.shrink * (current_high - current_low):
+                return None
+        span = high - low
+        if span == 0:
+            span = max(abs(high), 1.0)
+        pad = span * self.margin
+        self.limits = (low - pad, high + pad)
+        return self.limits
+
+
+class RenderScheduler:
+    def __init__(self, root, canvas, ax, draw, min_interval=33, max_interval=1000, budget=0.5):
+        self.root = root
+        self.canvas = canvas
+        self.ax = ax  # eixo ou figura inteira: a área copiada e restaurada no blit
+        self.draw = draw  # retorna (artistas, precisa_redesenho_completo)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.budget = budget  # fração do intervalo que um desenho pode ocupar
+
+        self.interval = min_interval
+        self.dirty = False
+        self.job = None
+        self.background = None
+        self.artists = []
+        self.last_draw_time = 0.0
+        self.frames = 0
+        self.draw_time = None  # metrics.Histogram opcional, em segundos
+
+        self.canvas.mpl_connect('draw_event', self.on_draw)
+
+    def mark_dirty(self):
+        self.dirty = True
+        if self.job is None:
+            self.job = self.root.after(int(self.interval), self.tick)
+
+    def invalidate(self):
+        # Força um redesenho completo (eixos, rótulos, fundo) no próximo quadro
+        self.background = None
+        self.mark_dirty()
+
+    def stop(self):
+        if self.job is not None:
+            self.root.after_cancel(self.job)
+            self.job = None
+
+    def tick(self):
+        self.job = None
+        if not self.dirty:
+            return
+        self.dirty = False
+        start = time.perf_counter()
+        try:
+            self.render()
+        except Exception as e:
+            logging.error(f"Error drawing graph: {e}")
+        self.last_draw_time = (time.perf_counter() - start) * 1000
+        self.frames += 1
+        if self.draw_time is not None:
+            self.draw_time.observe(self.last_draw_time / 1000)
+        self.adapt(self.last_draw_time)
+
+    def render(self):
+        self.artists, full_redraw = self.draw()
+        if full_redraw or self.background is None:
+            # on_draw captura o novo fundo e desenha os artistas animados
+            self.canvas.draw()
+        else:
+            self.canvas.restore_region(self.background)
+            self.draw_artists()
+            self.canvas.blit(self.ax.bbox)
+
+    def on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self.draw_artists()
+
+    def draw_artists(self):
+        for artist in self.artists:
+            self.ax.draw_artist(artist)
+
+    def adapt(self, elapsed):
+        # Reduz a taxa de quadros quando o desenho estoura o orçamento e
+        # volta a subir aos poucos quando sobra tempo
+        allowed = self.interval * self.budget
+        if elapsed > allowed:
+            self.interval = min(self.max_interval, max(self.interval * 1.5, elapsed / self.budget))
+        elif elapsed < allowed / 4:
+            self.interval = max(self.min_interval, self.interval * 0.9)
+
+    @property
+    def fps(self):
+        return 1000.0 / self.interval
@@ -0,0 +1,196 @@
+import os
+import time
+import logging
+from urllib.parse import parse_qs
+
+import serial
+
+from recorder import CaptureReader, MAGIC
+
+
+REPLAY_SCHEME = 'replay://'
+
+
+def is_replay_url(port):
+    return isinstance(port, str) and port.startswith(REPLAY_SCHEME)
+
+
+def replay_url(path, speed=1.0):
+    return f"{REPLAY_SCHEME}{path}?speed={speed:g}"
+
+
+def open_port(port, **kwargs):
+    # Porta serial real ou replay://arquivo?speed=N no lugar dela
+    if is_replay_url(port):
+        return ReplaySerial.from_url(port, baudrate=kwargs.get('baudrate', 9600), timeout=kwargs.get('timeout'))
+    return serial.Serial(port=port, **kwargs)
+
+
+def read_capture(path, port=None):
+    with CaptureReader(path) as capture:
+        for timestamp, name, data in capture.records():
+            if port is None or name == port:
+                yield timestamp, bytes(data)
+            data.release()
+
+
+def read_hex_dump(path, baudrate):
+    # Uma linha por bloco; aceita dumps com coluna de offset e coluna ASCII
+    timestamp = 0.0
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            line = line.split('|', 1)[0].strip()
+            tokens = line.split()
+            if len(tokens) > 1 and (tokens[0].endswith(':') or len(tokens[0]) > 2):
+                tokens = tokens[1:]
+            try:
+                data = bytes.fromhex(''.join(tokens))
+            except ValueError:
+                continue
+            if data:
+                yield timestamp, data
+                timestamp += len(data) * 10 / baudrate
+
+
+def read_raw(path, baudrate, chunk_size=1024):
+    timestamp = 0.0
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(chunk_size)
+            if not data:
+                break
+            yield timestamp, data
+            timestamp += len(data) * 10 / baudrate
+
+
+def open_source(path, baudrate, port=None):
+    with open(path, 'rb') as f:
+        head = f.read(len(MAGIC))
+    if head == MAGIC:
+        return read_capture(path, port)
+    if os.path.splitext(path)[1].lower() in ('.hex', '.txt'):
+        return read_hex_dump(path, baudrate)
+    return read_raw(path, baudrate)
+
+
+class ReplaySerial:
+    def __init__(self, path, speed=1.0, baudrate=9600, timeout=None, loop=False, port=None):
+        self.path = path
+        self.port = replay_url(path, speed)
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.speed = speed  # 0 = o mais rápido possível
+        self.loop = loop
+        self.source_port = port
+
+        self.source = open_source(path, baudrate, port)
+        self.pending = b''
+        self.pending_time = None
+        self.first_time = None
+        self.start = time.monotonic()
+        self.finished = False
+        self.is_open = True
+
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    @classmethod
+    def from_url(cls, url, baudrate=9600, timeout=None):
+        path, _, query = url[len(REPLAY_SCHEME):].partition('?')
+        options = {key: values[-1] for key, values in parse_qs(query).items()}
+        speed = options.get('speed', '1')
+        speed = 0.0 if speed in ('max', 'fast', '0') else float(speed)
+        return cls(
+            path,
+            speed=speed,
+            baudrate=int(baudrate),
+            timeout=timeout,
+            loop=options.get('loop', '0') in ('1', 'true', 'yes'),
+            port=options.get('port')
+        )
+
+    def next_chunk(self):
+        while not self.pending and not self.finished:
+            try:
+                timestamp, data = next(self.source)
+            except StopIteration:
+                if self.loop:
+                    self.source = open_source(self.path, self.baudrate, self.source_port)
+                    self.first_time = None
+                    self.start = time.monotonic()
+                    continue
+                self.finished = True
+                elapsed = time.monotonic() - self.start
+                logging.info(f"Replay of {self.path} finished: {self.bytes_read} bytes in {elapsed:.3f} s")
+                break
+            if self.first_time is None:
+                self.first_time = timestamp
+            self.pending = data
+            self.pending_time = timestamp
+
+    def due_in(self):
+        # Segundos até o bloco atual estar "no fio"
+        if self.speed <= 0:
+            return 0.0
+        due = self.start + (self.pending_time - self.first_time) / self.speed
+        return due - time.monotonic()
+
+    @property
+    def in_waiting(self):
+        self.next_chunk()
+        if not self.pending or self.due_in() > 0:
+            return 0
+        if self.speed <= 0:
+            # Sem temporização, vários blocos são entregues por leitura
+            return max(len(self.pending), 65536)
+        return len(self.pending)
+
+    def read(self, size=1):
+        if not self.is_open:
+            raise serial.PortNotOpenError()
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        out = bytearray()
+        while len(out) < size:
+            self.next_chunk()
+            if not self.pending:
+                # Fim da captura: comporta-se como uma porta sem dados
+                if deadline is not None and not out:
+                    time.sleep(max(deadline - time.monotonic(), 0))
+                break
+            wait = self.due_in()
+            if wait > 0:
+                if out:
+                    break
+                if deadline is not None and time.monotonic() + wait > deadline:
+                    time.sleep(max(deadline - time.monotonic(), 0))
+                    break
+                time.sleep(wait)
+            take = size - len(out)
+            out += self.pending[:take]
+            self.pending = self.pending[take:]
+        self.bytes_read += len(out)
+        return bytes(out)
+
+    def read_all(self):
+        return self.read(self.in_waiting)
+
+    def write(self, data):
+        # Não há dispositivo do outro lado; os dados são descartados
+        self.bytes_written += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def reset_input_buffer(self):
+        self.pending = b''
+
+    def reset_output_buffer(self):
+        pass
+
+    def throughput(self):
+        elapsed = time.monotonic() - self.start
+        return self.bytes_read / elapsed if elapsed > 0 else 0.0
+
+    def close(self):
+        self.is_open = False
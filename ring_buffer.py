@@ -0,0 +1,112 @@
+import numpy as np
+
+
+class RingBuffer:
+    def __init__(self, capacity, channels=1):
+        self.capacity = max(int(capacity), 1)
+        self.channels = max(int(channels), 1)
+        # Cada amostra é escrita duas vezes (i e i + capacity), assim a janela
+        # ordenada é sempre uma fatia contígua, sem cópia a cada quadro
+        self.data = np.full((2 * self.capacity, self.channels), np.nan)
+        self.index = 0   # próxima posição de escrita
+        self.count = 0   # amostras válidas na janela
+        self.total = 0   # amostras recebidas desde o último clear
+
+    def __len__(self):
+        return self.count
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if values.ndim == 1:
+            values = values.reshape(-1, 1)
+        n = len(values)
+        if n == 0:
+            return
+        if values.shape[1] != self.channels:
+            values = self.fit_channels(values)
+
+        self.total += n
+        if n >= self.capacity:
+            values = values[-self.capacity:]
+            self.data[:self.capacity] = values
+            self.data[self.capacity:] = values
+            self.index = 0
+            self.count = self.capacity
+            return
+
+        first = min(n, self.capacity - self.index)
+        self.write(self.index, values[:first])
+        if first < n:
+            self.write(0, values[first:])
+        self.index = (self.index + n) % self.capacity
+        self.count = min(self.count + n, self.capacity)
+
+    def append(self, value):
+        self.extend(np.atleast_1d(value).reshape(1, -1))
+
+    def write(self, position, values):
+        end = position + len(values)
+        self.data[position:end] = values
+        self.data[position + self.capacity:end + self.capacity] = values
+
+    def fit_channels(self, values):
+        fitted = np.full((len(values), self.channels), np.nan)
+        width = min(values.shape[1], self.channels)
+        fitted[:, :width] = values[:, :width]
+        return fitted
+
+    def view(self):
+        # Janela em ordem cronológica (somente leitura)
+        if self.count < self.capacity:
+            window = self.data[:self.count]
+        else:
+            window = self.data[self.index:self.index + self.capacity]
+        window = window.view()
+        window.flags.writeable = False
+        return window
+
+    def latest(self, n):
+        window = self.view()
+        return window[max(len(window) - n, 0):]
+
+    def clear(self):
+        self.data.fill(np.nan)
+        self.index = 0
+        self.count = 0
+        self.total = 0
+
+    def resize(self, capacity, channels=None):
+        capacity = max(int(capacity), 1)
+        channels = self.channels if channels is None else max(int(channels), 1)
+        if capacity == self.capacity and channels == self.channels:
+            return
+        recent = np.array(self.latest(capacity))
+        total = self.total
+        self.__init__(capacity, channels)
+        self.extend(recent)
+        self.total = total
+
+
+def minmax_decimate(values, buckets):
+    # Reduz a janela a um par mínimo/máximo por coluna de pixels, preservando
+    # os picos. Retorna as posições (x) e valores, um par de colunas por canal.
+    values = np.asarray(values)
+    if values.ndim == 1:
+        values = values.reshape(-1, 1)
+    n, channels = values.shape
+    buckets = int(buckets)
+    if buckets <= 0 or n <= 2 * buckets:
+        x = np.broadcast_to(np.arange(n).reshape(-1, 1), (n, channels))
+        return x, values
+
+    size = n // buckets
+    offset = n - size * buckets  # amostras mais antigas que não fecham um bloco
+    blocks = values[offset:].reshape(buckets, size, channels)
+    imin = blocks.argmin(axis=1)
+    imax = blocks.argmax(axis=1)
+    base = offset + (np.arange(buckets) * size).reshape(-1, 1)
+
+    index = np.empty((2 * buckets, channels), dtype=np.intp)
+    index[0::2] = np.minimum(imin, imax) + base
+    index[1::2] = np.maximum(imin, imax) + base
+    return index, np.take_along_axis(values, index, axis=0)
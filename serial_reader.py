@@ -0,0 +1,77 @@
+import threading
+import time
+import logging
+from collections import deque
+
+
+class SerialReader:
+    def __init__(self, ser, max_bytes=4 * 1024 * 1024, chunk_size=4096):
+        self.ser = ser
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+
+        # Blocos recebidos: (instante monotônico, bytes)
+        self.chunks = deque()
+        self.size = 0
+        self.lock = threading.Lock()
+
+        self.bytes_read = 0
+        self.dropped_bytes = 0
+        self.error = None
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name=f"SerialReader-{self.ser.port}", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=2):
+        self.running = False
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+        self.thread = None
+
+    def run(self):
+        while self.running:
+            try:
+                # Bloqueia no máximo pelo timeout da porta quando não há dados
+                size = min(max(self.ser.in_waiting, 1), self.chunk_size)
+                data = self.ser.read(size)
+            except Exception as e:
+                if self.running:
+                    logging.error(f"Error reading from serial port: {e}")
+                    self.error = e
+                self.running = False
+                break
+            if data:
+                self.push(time.monotonic(), data)
+
+    def push(self, timestamp, data):
+        with self.lock:
+            self.chunks.append((timestamp, data))
+            self.size += len(data)
+            self.bytes_read += len(data)
+            # Descarta os blocos mais antigos se o consumidor ficar para trás
+            while self.size > self.max_bytes and len(self.chunks) > 1:
+                _, old = self.chunks.popleft()
+                self.size -= len(old)
+                self.dropped_bytes += len(old)
+
+    def read_chunks(self):
+        with self.lock:
+            if not self.chunks:
+                return []
+            chunks = list(self.chunks)
+            self.chunks.clear()
+            self.size = 0
+        return chunks
+
+    def fill_level(self):
+        return self.size / self.max_bytes if self.max_bytes else 0.0
+
+    @property
+    def alive(self):
+        return self.running and self.thread is not None and self.thread.is_alive()
@@ -0,0 +1,147 @@
+import codecs
+import logging
+
+from serial_reader import SerialReader
+from ring_buffer import RingBuffer
+from render_scheduler import AxisScaler
+from channel_parser import ChannelParser
+from replay import open_port
+from analysis import RunningStats, RateEstimator
+
+
+class Session:
+    # Uma porta aberta com leitor, buffer do gráfico e decodificadores próprios
+    def __init__(self, port, options, window=1000, decoder=None):
+        self.port = port
+        self.name = port
+        self.options = options
+        self.ser = None
+        self.reader = None
+
+        self.text_decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self.channel_parser = ChannelParser()
+        self.decoder = decoder  # decoders.FrameDecoder, ou None para texto/blocos
+        self.hex_dumper = None  # hexdump.HexDumper, criado pela interface
+        self.samples = RingBuffer(window)
+        self.y_scaler = AxisScaler()
+        self.stats = RunningStats()  # desde a conexão (ou o último reset), não só a janela
+        self.sample_rate = RateEstimator()
+        self.history = None  # pyramid.MinMaxPyramid, criado pela interface
+        self.triggers = None  # triggers.TriggerEngine, criado pela interface
+
+        # Eixo e linhas no gráfico compartilhado; None quando a sessão não está visível
+        self.ax = None
+        self.lines = []
+
+        self.modbus_poller = None
+        self.modbus_connected = False
+        self.metrics = None  # metrics.StreamMetrics, criado pela interface
+        self.transmitter = None  # transmit.Transmitter, criado pela interface
+        self.fanout = None  # fanout.FanoutServer, quando a porta é compartilhada
+
+    @property
+    def is_open(self):
+        return self.ser is not None and self.ser.is_open
+
+    @property
+    def error(self):
+        return self.reader.error if self.reader else None
+
+    def open(self):
+        self.ser = open_port(self.port, **self.options)
+        self.reader = SerialReader(self.ser)
+        self.reader.start()
+
+    def read_chunks(self):
+        return self.reader.read_chunks() if self.reader else []
+
+    def close(self):
+        # Retorna o que ainda estava no buffer da thread de recepção
+        chunks = []
+        if self.fanout:
+            self.fanout.close()
+        if self.transmitter:
+            self.transmitter.stop()
+        if self.reader:
+            self.reader.stop()
+            chunks = self.reader.read_chunks()
+            self.reader = None
+        if self.ser:
+            self.ser.close()
+        if self.metrics:
+            self.metrics.close()
+        return chunks
+
+
+class SessionManager:
+    # Várias portas abertas ao mesmo tempo; uma única chamada periódica do Tk
+    # drena todas elas e entrega os blocos aos mesmos consumidores
+    def __init__(self, root, poll_interval=50):
+        self.root = root
+        self.poll_interval = poll_interval
+        self.sessions = {}
+        self.listeners = []  # listener(sessão, instante, dados)
+        self.on_error = None  # on_error(sessão, erro), depois que a sessão foi fechada
+        self.job = None
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def __iter__(self):
+        return iter(list(self.sessions.values()))
+
+    def __contains__(self, name):
+        return name in self.sessions
+
+    def get(self, name):
+        return self.sessions.get(name)
+
+    def names(self):
+        return list(self.sessions)
+
+    def open(self, port, options, window=1000, decoder=None):
+        if port in self.sessions:
+            raise ValueError(f"Port '{port}' is already open")
+        session = Session(port, options, window, decoder)
+        session.open()
+        self.sessions[session.name] = session
+        if self.job is None:
+            self.job = self.root.after(self.poll_interval, self.poll)
+        return session
+
+    def close(self, name):
+        session = self.sessions.pop(name, None)
+        if session is None:
+            return None
+        self.dispatch(session, session.close())
+        if not self.sessions and self.job:
+            self.root.after_cancel(self.job)
+            self.job = None
+        return session
+
+    def close_all(self):
+        for name in self.names():
+            self.close(name)
+
+    def poll(self):
+        self.job = None
+        failed = []
+        for session in self:
+            self.dispatch(session, session.read_chunks())
+            if session.error:
+                failed.append(session)
+        for session in failed:
+            error = session.error
+            self.close(session.name)
+            if self.on_error:
+                self.on_error(session, error)
+        if self.sessions and self.job is None:
+            self.job = self.root.after(self.poll_interval, self.poll)
+
+    def dispatch(self, session, chunks):
+        for timestamp, data in chunks:
+            for listener in self.listeners:
+                try:
+                    listener(session, timestamp, data)
+                except Exception as e:
+                    logging.error(f"Error handling data from {session.name}: {e}")
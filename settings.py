@@ -0,0 +1,77 @@
+import json
+import os
+
+
+SETTINGS_FILE = 'settings.json'
+
+DEFAULT_SETTINGS = {
+    'port': '',
+    'baudrate': '9600',
+    'data_format': 'ASCII',
+    'data_bits': '8',
+    'parity': 'None',
+    'stop_bits': '1',
+    'flow_control': 'None',
+    'protocol': '',
+    'graph_window': '1000',
+    'console_lines': '5000',
+    'console_pause': True,
+    'framing': 'None',
+    'frame_delimiter': '\\n',
+    'frame_length': '8',
+    'hex_width': '16',
+    'modbus_tags': [],
+    'modbus_max_gap': 10,
+    'metrics_file': '',
+    'metrics_interval': 10,
+    'write_timeout': '2',
+    'tx_chunk_size': '1024',
+    'tx_chunk_delay': '0',
+    'tx_line_delay': '0',
+    'tx_line_ending': '\\r\\n',
+    'store_samples': False,
+    'store_file': 'serialuz.db',
+    'history_enabled': False,
+    'history_samples': 100000000,
+    'triggers': [],
+    'trigger_pre': '5',
+    'trigger_post': '5',
+    'trigger_dir': 'captures',
+    'fanout_enabled': False,
+    'fanout_host': '127.0.0.1',
+    'fanout_port': '7700',
+    'fanout_websocket_port': '0',
+    'fanout_writes': False
+}
+
+
+def load_settings_file(path=SETTINGS_FILE):
+    settings = dict(DEFAULT_SETTINGS)
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            settings.update(json.load(f))
+    return settings
+
+
+def save_settings_file(settings, path=SETTINGS_FILE):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(settings, f, ensure_ascii=False, indent=4)
+
+
+def serial_options(settings, timeout=0.1):
+    # Mesma conversão usada pela interface ao abrir a porta
+    return {
+        'baudrate': int(settings['baudrate']),
+        'bytesize': int(settings['data_bits']),
+        'parity': settings['parity'][0],
+        'stopbits': float(settings['stop_bits']),
+        'xonxoff': settings['flow_control'] == "XON/XOFF",
+        'rtscts': settings['flow_control'] == "RTS/CTS",
+        'timeout': timeout,
+        'write_timeout': float(settings.get('write_timeout', 2))
+    }
+
+
+def escaped_bytes(text):
+    # Texto com escapes de barra invertida do settings.json ('\\r\\n', '\\x02') em bytes
+    return text.encode('utf-8').decode('unicode_escape').encode('latin-1')
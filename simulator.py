@@ -0,0 +1,315 @@
+import os
+import sys
+import tty
+import json
+import time
+import random
+import select
+import signal
+import struct
+import logging
+import argparse
+import threading
+
+from decoders import ModbusRtuDecoder, with_crc
+
+
+# Escravo Modbus RTU simulado em um pseudo-terminal: o simulador fica com o
+# lado mestre do pty e a aplicação abre o lado escravo como se fosse uma porta
+# serial (ex.: /dev/pts/5), sem nenhum hardware
+
+ILLEGAL_FUNCTION = 1
+ILLEGAL_ADDRESS = 2
+ILLEGAL_VALUE = 3
+
+TABLES = ('coils', 'discrete', 'holding', 'input')
+READ_TABLES = {1: 'coils', 2: 'discrete', 3: 'holding', 4: 'input'}
+
+
+class Counter:
+    # Registrador que muda com o tempo: valor = início + passo a cada período
+    def __init__(self, unit=1, table='holding', address=0, step=1, period=1.0, start=0):
+        if table not in TABLES:
+            raise ValueError(f"Unknown register table '{table}'")
+        self.unit = int(unit)
+        self.table = table
+        self.address = int(address)
+        self.step = int(step)
+        self.period = float(period)
+        self.start = int(start)
+        self.started = time.monotonic()
+
+    def value(self, now):
+        ticks = int((now - self.started) / self.period) if self.period > 0 else 0
+        value = self.start + self.step * ticks
+        return bool(value & 1) if self.table in ('coils', 'discrete') else value & 0xFFFF
+
+    @classmethod
+    def parse(cls, text):
+        # unidade:endereço[:passo[:período]]
+        parts = text.split(':')
+        return cls(
+            unit=int(parts[0]),
+            address=int(parts[1]),
+            step=int(parts[2]) if len(parts) > 2 else 1,
+            period=float(parts[3]) if len(parts) > 3 else 1.0
+        )
+
+
+class Device:
+    def __init__(self, unit, size=1000):
+        self.unit = unit
+        self.tables = {
+            'coils': [False] * size,
+            'discrete': [False] * size,
+            'holding': [0] * size,
+            'input': [0] * size
+        }
+
+    def load(self, item):
+        # {"holding": {"0": 123, "1": 456}, "coils": {"3": true}, ...}
+        for table in TABLES:
+            for address, value in item.get(table, {}).items():
+                self.tables[table][int(address)] = bool(value) if table in ('coils', 'discrete') else int(value) & 0xFFFF
+
+
+class ModbusSimulator:
+    def __init__(self, units=(1,), size=1000, latency=0.0, jitter=0.0, crc_error_rate=0.0, drop_rate=0.0, baudrate=9600, seed=None):
+        self.devices = {int(unit): Device(int(unit), size) for unit in units}
+        self.counters = []
+        self.latency = latency
+        self.jitter = jitter
+        self.crc_error_rate = crc_error_rate
+        self.drop_rate = drop_rate
+        self.random = random.Random(seed)
+        self.decoder = ModbusRtuDecoder(baudrate)
+
+        self.master_fd = None
+        self.slave_fd = None
+        self.port = None
+        self.link = None
+        self.thread = None
+        self.running = False
+
+        self.requests = 0
+        self.responses = 0
+        self.exceptions = 0
+        self.injected_crc_errors = 0
+        self.dropped = 0
+
+    @classmethod
+    def from_config(cls, path, **overrides):
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        units = config.get('units', {'1': {}})
+        options = {key: config[key] for key in ('size', 'latency', 'jitter', 'crc_error_rate', 'drop_rate', 'baudrate', 'seed') if key in config}
+        options.update({key: value for key, value in overrides.items() if value is not None})
+        simulator = cls(units=[int(unit) for unit in units], **options)
+        for unit, item in units.items():
+            simulator.devices[int(unit)].load(item or {})
+        for item in config.get('counters', []):
+            simulator.counters.append(Counter(**item))
+        return simulator
+
+    def open(self, link=None):
+        self.master_fd, self.slave_fd = os.openpty()
+        tty.setraw(self.master_fd)
+        tty.setraw(self.slave_fd)
+        self.port = os.ttyname(self.slave_fd)
+        if link:
+            # Caminho fixo para a configuração da aplicação (ex.: /tmp/ttySIM0)
+            if os.path.lexists(link):
+                os.remove(link)
+            os.symlink(self.port, link)
+            self.link = link
+        return self.link or self.port
+
+    def start(self, link=None):
+        port = self.open(link)
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="ModbusSimulator", daemon=True)
+        self.thread.start()
+        return port
+
+    def stop(self, timeout=2):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout)
+            self.thread = None
+        for fd in (self.master_fd, self.slave_fd):
+            if fd is not None:
+                os.close(fd)
+        self.master_fd = self.slave_fd = None
+        if self.link and os.path.islink(self.link):
+            os.remove(self.link)
+
+    def run(self):
+        while self.running:
+            ready, _, _ = select.select([self.master_fd], [], [], 0.1)
+            if not ready:
+                continue
+            try:
+                data = os.read(self.master_fd, 4096)
+            except OSError:
+                continue  # lado escravo ainda não aberto pela aplicação
+            for frame in self.decoder.feed(data, time.monotonic()):
+                response = self.handle(frame)
+                if response is not None:
+                    self.send(response)
+
+    def send(self, response):
+        if self.random.random() < self.drop_rate:
+            self.dropped += 1
+            return
+        delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay > 0:
+            time.sleep(delay)
+        if self.random.random() < self.crc_error_rate:
+            response = response[:-1] + bytes([response[-1] ^ 0xFF])
+            self.injected_crc_errors += 1
+        os.write(self.master_fd, response)
+        self.responses += 1
+
+    def update_counters(self):
+        now = time.monotonic()
+        for counter in self.counters:
+            device = self.devices.get(counter.unit)
+            if device is not None:
+                device.tables[counter.table][counter.address] = counter.value(now)
+
+    def handle(self, frame):
+        # Retorna o quadro de resposta (com CRC) ou None quando não há resposta
+        self.requests += 1
+        unit, function = frame[0], frame[1]
+        device = self.devices.get(unit)
+        if device is None:
+            return None  # outro escravo do barramento
+        self.update_counters()
+        try:
+            body = self.execute(device, function, frame[2:-2])
+        except IndexError:
+            body = bytes([function | 0x80, ILLEGAL_ADDRESS])
+        except (ValueError, struct.error):
+            body = bytes([function | 0x80, ILLEGAL_VALUE])
+        if body[0] & 0x80:
+            self.exceptions += 1
+        return with_crc(bytes([unit]) + body)
+
+    def execute(self, device, function, data):
+        if function in READ_TABLES:
+            address, count = struct.unpack('>HH', data[:4])
+            table = device.tables[READ_TABLES[function]]
+            if count == 0 or address + count > len(table):
+                raise IndexError(address)
+            values = table[address:address + count]
+            if function in (1, 2):
+                payload = pack_bits(values)
+            else:
+                payload = struct.pack(f'>{count}H', *values)
+            return bytes([function, len(payload)]) + payload
+        if function == 5:
+            address, value = struct.unpack('>HH', data[:4])
+            if value not in (0x0000, 0xFF00):
+                raise ValueError(value)
+            device.tables['coils'][address] = value == 0xFF00
+            return bytes([function]) + data[:4]
+        if function == 6:
+            address, value = struct.unpack('>HH', data[:4])
+            device.tables['holding'][address] = value
+            return bytes([function]) + data[:4]
+        if function == 15:
+            address, count, size = struct.unpack('>HHB', data[:5])
+            coils = device.tables['coils']
+            if address + count > len(coils):
+                raise IndexError(address)
+            bits = data[5:5 + size]
+            for index in range(count):
+                coils[address + index] = bool(bits[index // 8] >> (index % 8) & 1)
+            return bytes([function]) + data[:4]
+        if function == 16:
+            address, count, size = struct.unpack('>HHB', data[:5])
+            holding = device.tables['holding']
+            if address + count > len(holding):
+                raise IndexError(address)
+            holding[address:address + count] = struct.unpack(f'>{count}H', data[5:5 + 2 * count])
+            return bytes([function]) + data[:4]
+        return bytes([function | 0x80, ILLEGAL_FUNCTION])
+
+    def stats(self):
+        return {
+            'requests': self.requests,
+            'responses': self.responses,
+            'exceptions': self.exceptions,
+            'injected_crc_errors': self.injected_crc_errors,
+            'dropped': self.dropped,
+            'decoder_crc_errors': self.decoder.crc_errors
+        }
+
+
+def pack_bits(values):
+    out = bytearray((len(values) + 7) // 8)
+    for index, value in enumerate(values):
+        if value:
+            out[index // 8] |= 1 << (index % 8)
+    return bytes(out)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="serialuz-simulator", description="Modbus RTU slave on a pseudo-terminal")
+    parser.add_argument("--config", help="JSON file with units, register values and counters")
+    parser.add_argument("--units", default="1", help="comma-separated unit ids (default: 1)")
+    parser.add_argument("--size", type=int, help="registers per table (default: 1000)")
+    parser.add_argument("--counter", action="append", default=[], help="unit:address[:step[:period]] holding register counter; repeatable")
+    parser.add_argument("--latency", type=float, help="seconds before each response")
+    parser.add_argument("--jitter", type=float, help="extra random delay up to this many seconds")
+    parser.add_argument("--crc-errors", type=float, help="fraction of responses sent with a bad CRC")
+    parser.add_argument("--drop", type=float, help="fraction of requests left unanswered")
+    parser.add_argument("--baudrate", type=int, help="used only for the inter-frame silence")
+    parser.add_argument("--seed", type=int, help="random seed for repeatable error injection")
+    parser.add_argument("--link", help="create a symlink to the pty at this path")
+    parser.add_argument("--verbose", action="store_true", help="log to stderr")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        stream=sys.stderr,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    overrides = {
+        'size': args.size,
+        'latency': args.latency,
+        'jitter': args.jitter,
+        'crc_error_rate': args.crc_errors,
+        'drop_rate': args.drop,
+        'baudrate': args.baudrate,
+        'seed': args.seed
+    }
+    if args.config:
+        simulator = ModbusSimulator.from_config(args.config, **overrides)
+    else:
+        units = [int(unit) for unit in args.units.split(',') if unit]
+        simulator = ModbusSimulator(units, **{key: value for key, value in overrides.items() if value is not None})
+    simulator.counters.extend(Counter.parse(text) for text in args.counter)
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    port = simulator.start(args.link)
+    # A primeira linha da saída é a porta, para scripts de CI
+    print(port, flush=True)
+    logging.info(f"Simulating units {sorted(simulator.devices)} on {simulator.port}")
+    try:
+        while not stop.wait(0.5) and simulator.thread.is_alive():
+            pass
+    except KeyboardInterrupt:
+        pass
+    finally:
+        simulator.stop()
+        logging.info(f"Simulator: {simulator.stats()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,280 @@
+import sys
+import csv
+import json
+import time
+import queue
+import atexit
+import sqlite3
+import logging
+import argparse
+import threading
+from datetime import datetime
+from itertools import repeat
+
+import numpy as np
+
+
+# Armazenamento das amostras em SQLite (modo WAL): a interface só enfileira
+# blocos; uma thread grava em lotes, uma transação por lote. O índice
+# (series, ts) faz uma consulta por intervalo de tempo ler só as linhas do
+# intervalo, mesmo com semanas de dados no arquivo.
+
+STORE_FILE = 'serialuz.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS samples (
+    series INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    value REAL
+);
+CREATE INDEX IF NOT EXISTS samples_series_ts ON samples (series, ts);
+"""
+
+
+def connect(path):
+    conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")  # no WAL, seguro contra queda do programa
+    conn.executescript(SCHEMA)
+    return conn
+
+
+class SampleStore:
+    def __init__(self, path=STORE_FILE, batch_rows=20000, flush_interval=1.0, max_pending=500000):
+        self.path = path
+        self.batch_rows = batch_rows
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending  # linhas na fila; acima disso os blocos novos são descartados
+
+        self.queue = queue.Queue()
+        self.pending = 0
+        self.lock = threading.Lock()  # protege 'pending', alterado pelas duas pontas da fila
+        self.series_ids = {}
+        self.last_time = {}  # série base -> instante do bloco anterior
+        # Os instantes dos blocos são monotônicos; no arquivo ficam em segundos desde 1970
+        self.clock_offset = time.time() - time.monotonic()
+
+        self.rows_written = 0
+        self.dropped_rows = 0
+        self.batches = 0
+        self.error = None
+        self.running = False
+        self.thread = None
+        self.conn = None
+
+    def start(self):
+        self.conn = connect(self.path)
+        self.series_ids = dict((name, id) for id, name in self.conn.execute("SELECT id, name FROM series"))
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="SampleStore", daemon=True)
+        self.thread.start()
+        atexit.register(self.stop)
+
+    def stop(self, timeout=5):
+        # Grava o que ainda está na fila antes de fechar
+        atexit.unregister(self.stop)
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout)
+            self.thread = None
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    def add(self, name, timestamps, values):
+        # timestamps em segundos desde 1970; chamado de qualquer thread
+        count = len(values)
+        with self.lock:
+            if self.pending + count > self.max_pending:
+                self.dropped_rows += count
+                return
+            self.pending += count
+        self.queue.put((name, timestamps, values))
+
+    def add_value(self, name, timestamp, value):
+        # Um valor avulso (tag Modbus), com instante monotônico
+        self.add(name, (timestamp + self.clock_offset,), (value,))
+
+    def add_block(self, prefix, timestamp, values, names):
+        # Um bloco do ChannelParser: uma série por coluna ('porta/canal'). As
+        # amostras do bloco são espalhadas entre o bloco anterior e este
+        values = np.asarray(values, dtype=np.float64)
+        n = len(values)
+        if not n:
+            return
+        previous = self.last_time.get(prefix)
+        self.last_time[prefix] = timestamp
+        end = timestamp + self.clock_offset
+        if previous is not None and 0 < timestamp - previous < 1.0:
+            timestamps = np.linspace(previous + self.clock_offset, end, n + 1)[1:]
+        else:
+            timestamps = np.full(n, end)
+        for index in range(values.shape[1]):
+            column = values[:, index]
+            valid = np.isfinite(column)
+            if valid.any():
+                self.add(f"{prefix}/{names[index]}", timestamps[valid], column[valid])
+
+    def series_id(self, name):
+        # Só na thread de gravação
+        series = self.series_ids.get(name)
+        if series is None:
+            cursor = self.conn.execute("INSERT OR IGNORE INTO series (name) VALUES (?)", (name,))
+            series = cursor.lastrowid if cursor.rowcount else self.conn.execute("SELECT id FROM series WHERE name = ?", (name,)).fetchone()[0]
+            self.series_ids[name] = series
+        return series
+
+    def run(self):
+        # Um lote é gravado quando junta batch_rows linhas ou a cada flush_interval
+        rows = []
+        last_flush = time.monotonic()
+        while self.running or not self.queue.empty():
+            try:
+                name, timestamps, values = self.queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+            else:
+                with self.lock:
+                    self.pending -= len(values)
+                try:
+                    series = self.series_id(name)
+                except sqlite3.Error as e:
+                    self.fail(e)
+                    continue
+                rows.extend(zip(repeat(series), np.asarray(timestamps).tolist(), np.asarray(values).tolist()))
+            if rows and (len(rows) >= self.batch_rows or time.monotonic() - last_flush >= self.flush_interval):
+                self.write(rows)
+                rows = []
+                last_flush = time.monotonic()
+        if rows:
+            self.write(rows)
+
+    def write(self, rows):
+        try:
+            with self.conn:
+                self.conn.executemany("INSERT INTO samples (series, ts, value) VALUES (?, ?, ?)", rows)
+        except sqlite3.Error as e:
+            self.dropped_rows += len(rows)
+            self.fail(e)
+            return
+        self.rows_written += len(rows)
+        self.batches += 1
+
+    def fail(self, error):
+        if self.error is None:
+            logging.error(f"Error writing samples to {self.path}: {error}")
+        self.error = error
+
+    def stats(self):
+        return {
+            'rows_written': self.rows_written,
+            'batches': self.batches,
+            'pending': self.pending,
+            'dropped_rows': self.dropped_rows
+        }
+
+
+class StoreReader:
+    # Conexão só de leitura; no modo WAL não espera a gravação em andamento
+    def __init__(self, path=STORE_FILE):
+        self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=10)
+
+    def series(self):
+        return [name for name, in self.conn.execute("SELECT name FROM series ORDER BY name")]
+
+    def series_id(self, name):
+        row = self.conn.execute("SELECT id FROM series WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            raise KeyError(f"Unknown series '{name}'")
+        return row[0]
+
+    def query(self, name, start, end, limit=None):
+        # (instantes, valores) com start <= ts < end, em ordem de tempo
+        sql = "SELECT ts, value FROM samples WHERE series = ? AND ts >= ? AND ts < ? ORDER BY ts"
+        params = [self.series_id(name), start, end]
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        rows = self.conn.execute(sql, params).fetchall()
+        if not rows:
+            return np.empty(0), np.empty(0)
+        data = np.array(rows, dtype=np.float64)
+        return data[:, 0], data[:, 1]
+
+    def time_range(self, name):
+        return self.conn.execute("SELECT MIN(ts), MAX(ts) FROM samples WHERE series = ?", (self.series_id(name),)).fetchone()
+
+    def close(self):
+        self.conn.close()
+
+
+def parse_time(text):
+    # Segundos desde 1970, data/hora ISO ("2026-10-13 14:00") ou relativo ("-5m", "-2h", "-1d")
+    text = text.strip()
+    units = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+    if text.startswith('-') and text[-1:] in units:
+        return time.time() - float(text[1:-1]) * units[text[-1]]
+    try:
+        return float(text)
+    except ValueError:
+        return datetime.fromisoformat(text).timestamp()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="serialuz-storage", description="Query the SeriaLuz sample store")
+    parser.add_argument("--db", default=STORE_FILE, help="SQLite store written by the GUI")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("series", help="list the stored series with their time range")
+    query = commands.add_parser("query", help="print the samples of one series in a time range")
+    query.add_argument("series", help="series name, e.g. COM3/CH1 or COM3/HR0")
+    query.add_argument("--start", default="-1h", help="start: ISO date/time, epoch seconds or -5m/-2h/-1d (default: -1h)")
+    query.add_argument("--end", help="end (default: now)")
+    query.add_argument("--limit", type=int)
+    query.add_argument("--format", choices=["csv", "json"], default="csv")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        reader = StoreReader(args.db)
+    except sqlite3.Error as e:
+        print(f"Unable to open {args.db}: {e}", file=sys.stderr)
+        return 1
+    try:
+        if args.command == "series":
+            for name in reader.series():
+                first, last = reader.time_range(name)
+                if first is None:
+                    print(name)
+                else:
+                    print(f"{name}\t{datetime.fromtimestamp(first).isoformat(' ', 'seconds')}\t{datetime.fromtimestamp(last).isoformat(' ', 'seconds')}")
+            return 0
+        start = parse_time(args.start)
+        end = parse_time(args.end) if args.end else time.time()
+        began = time.perf_counter()
+        timestamps, values = reader.query(args.series, start, end, args.limit)
+        elapsed = time.perf_counter() - began
+        if args.format == "json":
+            json.dump({'series': args.series, 'ts': timestamps.tolist(), 'value': values.tolist()}, sys.stdout)
+            sys.stdout.write('\n')
+        else:
+            writer = csv.writer(sys.stdout)
+            writer.writerow(['time', 'value'])
+            for timestamp, value in zip(timestamps, values):
+                writer.writerow([datetime.fromtimestamp(timestamp).isoformat(' ', 'microseconds'), repr(float(value))])
+        print(f"{len(values)} samples in {elapsed * 1000:.1f} ms", file=sys.stderr)
+    except (KeyError, ValueError, sqlite3.Error) as e:
+        print(str(e).strip("'\""), file=sys.stderr)
+        return 1
+    finally:
+        reader.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,20 @@
+import os
+import json
+from functools import lru_cache
+
+
+# Cada arquivo de idioma é lido uma vez por processo e compartilhado entre as
+# janelas (SeriaLuz, Contator); o dicionário devolvido não deve ser alterado
+
+@lru_cache(maxsize=None)
+def load_translations(lang):
+    with open(f'lang/{lang}.json', 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def saved_language(default="pt-br", path="lang.json"):
+    # Idioma escolhido na tela inicial do SeriaLuz
+    if not os.path.isfile(path):
+        return default
+    with open(path, "r") as file:
+        return json.load(file).get("language", "")
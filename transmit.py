@@ -0,0 +1,200 @@
+import os
+import time
+import queue
+import logging
+import threading
+
+import serial
+
+
+# Fila de transmissão: arquivos, roteiros e textos avulsos são enviados em
+# blocos por uma thread por porta, na ordem em que foram pedidos. A interface
+# só lê o progresso, então transferências de vários megabytes não a travam.
+
+class TransmitJob:
+    def __init__(self, name, items, total):
+        # items: iterável de (bytes, pausa em segundos depois do envio)
+        self.name = name
+        self.items = items
+        self.total = total
+        self.sent = 0
+        self.started = None
+        self.finished = None
+        self.error = None
+        self.cancelled = threading.Event()
+        self.quiet = False  # sem barra de progresso nem aviso ao terminar (texto avulso)
+
+    @property
+    def done(self):
+        return self.finished is not None
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def progress(self):
+        return self.sent / self.total if self.total else 1.0
+
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+    def throughput(self):
+        elapsed = self.elapsed()
+        return self.sent / elapsed if elapsed > 0 else 0.0
+
+
+def data_job(data, name=None):
+    data = bytes(data)
+    job = TransmitJob(name or f"{len(data)} bytes", [(data, 0.0)], len(data))
+    job.quiet = name is None
+    return job
+
+
+def file_job(path, chunk_size=1024, chunk_delay=0.0):
+    # O arquivo é lido aos poucos pela thread de envio, não carregado inteiro
+    def items():
+        with open(path, 'rb') as f:
+            while True:
+                data = f.read(chunk_size)
+                if not data:
+                    break
+                yield data, chunk_delay
+    return TransmitJob(os.path.basename(path), items(), os.path.getsize(path))
+
+
+def parse_script(text, line_ending=b'\r\n', line_delay=0.0):
+    # Uma linha por comando, enviada com o fim de linha. Diretivas:
+    #   # comentário
+    #   @delay 250       pausa em milissegundos
+    #   @hex 01 03 00 00 bytes crus, sem fim de linha
+    #   @@texto          envia "@texto"
+    # Linhas em branco são ignoradas
+    items = []
+    for number, line in enumerate(text.splitlines(), 1):
+        stripped = line.strip()
+        if not stripped or stripped.startswith('#'):
+            continue
+        if stripped.startswith('@') and not stripped.startswith('@@'):
+            command, _, argument = stripped[1:].partition(' ')
+            command = command.lower()
+            try:
+                if command == 'delay':
+                    items.append((b'', float(argument) / 1000))
+                elif command == 'hex':
+                    items.append((bytes.fromhex(argument), line_delay))
+                else:
+                    raise ValueError(f"unknown directive '@{command}'")
+            except ValueError as e:
+                raise ValueError(f"Line {number}: {e}") from None
+            continue
+        if stripped.startswith('@@'):
+            line = line.replace('@@', '@', 1)
+        items.append((line.encode('utf-8') + line_ending, line_delay))
+    return items
+
+
+def script_job(path, line_ending=b'\r\n', line_delay=0.0):
+    with open(path, 'r', encoding='utf-8') as f:
+        items = parse_script(f.read(), line_ending, line_delay)
+    return TransmitJob(os.path.basename(path), items, sum(len(data) for data, _ in items))
+
+
+class Transmitter:
+    def __init__(self, ser, stall_timeout=10.0):
+        self.ser = ser
+        self.stall_timeout = stall_timeout  # espera máxima pelo CTS antes de desistir
+        self.jobs = queue.Queue()
+        self.finished = queue.Queue()  # trabalhos concluídos, para a interface
+        self.current = None
+        self.bytes_written = 0
+        self.bytes_out = None  # metrics.Counter opcional
+        self.running = False
+        self.thread = None
+
+    def submit(self, job):
+        self.jobs.put(job)
+        if not self.running:
+            self.start()
+        return job
+
+    def pending(self):
+        return self.jobs.qsize()
+
+    @property
+    def busy(self):
+        return self.current is not None or not self.jobs.empty()
+
+    def cancel(self):
+        # Cancela o trabalho em andamento e os que estão na fila
+        while True:
+            try:
+                job = self.jobs.get_nowait()
+            except queue.Empty:
+                break
+            job.cancel()
+            job.finished = time.monotonic()
+            self.finished.put(job)
+        job = self.current
+        if job is not None:
+            job.cancel()
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name=f"Transmitter-{self.ser.port}", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=2):
+        self.running = False
+        self.cancel()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+        self.thread = None
+
+    def run(self):
+        while self.running:
+            try:
+                job = self.jobs.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            self.current = job
+            job.started = time.monotonic()
+            try:
+                for data, delay in job.items:
+                    if job.cancelled.is_set():
+                        break
+                    if data:
+                        self.write(job, data)
+                    if delay > 0 and job.cancelled.wait(delay):
+                        break
+            except Exception as e:
+                logging.error(f"Error transmitting {job.name}: {e}")
+                job.error = e
+            job.finished = time.monotonic()
+            self.current = None
+            self.finished.put(job)
+
+    def write(self, job, data):
+        self.wait_clear_to_send(job)
+        if job.cancelled.is_set():
+            return
+        # Com write_timeout na porta, um XOFF ou CTS segurado além do limite vira
+        # SerialTimeoutException; não há nova tentativa porque não se sabe
+        # quanto do bloco chegou a sair
+        written = self.ser.write(data)
+        written = len(data) if written is None else written
+        job.sent += written
+        self.bytes_written += written
+        if self.bytes_out is not None:
+            self.bytes_out.inc(written)
+
+    def wait_clear_to_send(self, job):
+        # Com RTS/CTS, espera o outro lado liberar antes de entregar o bloco ao driver
+        if not getattr(self.ser, 'rtscts', False):
+            return
+        deadline = time.monotonic() + self.stall_timeout
+        while not self.ser.cts:
+            if time.monotonic() > deadline:
+                raise serial.SerialTimeoutException(f"CTS held low for {self.stall_timeout:g} s")
+            if job.cancelled.wait(0.01):
+                return
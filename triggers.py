@@ -0,0 +1,335 @@
+import os
+import re
+import time
+import logging
+import operator
+from collections import deque
+from datetime import datetime
+
+from recorder import CaptureRecorder, CAPTURE_EXTENSION
+from settings import escaped_bytes
+
+
+# Gatilhos sobre o fluxo recebido. Uma regra por linha:
+#   text FALHA\r\n        bytes literais (escapes como no settings.json)
+#   hex 01 83             bytes em hexadecimal
+#   regex ERR[0-9]+       expressão regular aplicada a cada linha recebida
+#   CH1 > 100             limiar em um canal do gráfico (>, <, >=, <=), na subida
+# Os padrões de bytes são procurados todos de uma vez (Aho-Corasick) e o estado
+# continua de uma leitura para a outra, então um padrão partido entre dois
+# blocos também dispara. Ao disparar, os últimos 'pre' segundos guardados em
+# memória e os 'post' segundos seguintes vão para um .slzcap, que pode ser
+# aberto pelo replay como qualquer captura.
+
+THRESHOLD = re.compile(r'^(\S+)\s*(>=|<=|>|<)\s*(\S+)$')
+OPERATORS = {'>': operator.gt, '<': operator.lt, '>=': operator.ge, '<=': operator.le}
+
+
+class AhoCorasick:
+    # Autômato determinístico: uma tabela de 256 transições por estado, com as
+    # falhas já resolvidas, para o laço por byte ser só uma indexação
+    def __init__(self, patterns):
+        self.patterns = [bytes(pattern) for pattern in patterns]
+        if not all(self.patterns):
+            raise ValueError("Empty trigger pattern")
+        goto = [{}]
+        outputs = [[]]
+        for index, pattern in enumerate(self.patterns):
+            state = 0
+            for byte in pattern:
+                if byte not in goto[state]:
+                    goto.append({})
+                    outputs.append([])
+                    goto[state][byte] = len(goto) - 1
+                state = goto[state][byte]
+            outputs[state].append(index)
+
+        # Estados em largura: a transição que falta é a do estado de falha
+        self.delta = [None] * len(goto)
+        self.delta[0] = [goto[0].get(byte, 0) for byte in range(256)]
+        fail = [0] * len(goto)
+        order = list(goto[0].values())
+        position = 0
+        while position < len(order):
+            state = order[position]
+            position += 1
+            row = list(self.delta[fail[state]])
+            for byte, target in goto[state].items():
+                row[byte] = target
+                fail[target] = self.delta[fail[state]][byte]
+                outputs[target] = outputs[target] + outputs[fail[target]]
+                order.append(target)
+            self.delta[state] = row
+        self.outputs = [tuple(output) for output in outputs]
+
+        # No estado inicial, pula direto para o próximo byte que começa algum padrão
+        first = sorted(set(pattern[0] for pattern in self.patterns))
+        self.first = re.compile(b'[' + b''.join(re.escape(bytes([byte])) for byte in first) + b']')
+        self.state = 0
+        self.offset = 0  # bytes vistos antes do bloco atual
+
+    def reset(self):
+        self.state = 0
+        self.offset = 0
+
+    def feed(self, data):
+        # Retorna [(índice do padrão, fim no fluxo)], com o fim exclusivo
+        matches = []
+        delta = self.delta
+        outputs = self.outputs
+        search = self.first.search
+        state = self.state
+        position = 0
+        size = len(data)
+        while position < size:
+            if not state:
+                found = search(data, position)
+                if found is None:
+                    break
+                position = found.start()
+            state = delta[state][data[position]]
+            position += 1
+            if outputs[state]:
+                end = self.offset + position
+                matches.extend((index, end) for index in outputs[state])
+        self.state = state
+        self.offset += size
+        return matches
+
+
+class Rule:
+    def __init__(self, text, kind, pattern=None, channel=None, compare=None, value=None):
+        self.text = text
+        self.kind = kind  # 'bytes', 'regex' ou 'threshold'
+        self.pattern = pattern
+        self.channel = channel
+        self.compare = compare
+        self.value = value
+
+    def __repr__(self):
+        return f"Rule({self.text!r})"
+
+
+def parse_rule(line):
+    text = line.strip()
+    kind, _, argument = text.partition(' ')
+    kind = kind.lower()
+    try:
+        if kind == 'text' and argument:
+            return Rule(text, 'bytes', escaped_bytes(argument))
+        if kind == 'hex' and argument:
+            return Rule(text, 'bytes', bytes.fromhex(argument))
+        if kind == 'regex' and argument:
+            return Rule(text, 'regex', re.compile(argument.encode('utf-8')))
+        match = THRESHOLD.match(text)
+        if match:
+            channel, symbol, value = match.groups()
+            return Rule(text, 'threshold', channel=channel, compare=OPERATORS[symbol], value=float(value))
+    except (ValueError, re.error, UnicodeError) as e:
+        raise ValueError(f"Invalid trigger rule '{text}': {e}") from None
+    raise ValueError(f"Invalid trigger rule '{text}'")
+
+
+def parse_rules(lines):
+    # Linhas vazias e comentários (#) são ignorados
+    return [parse_rule(line) for line in lines if line.strip() and not line.strip().startswith('#')]
+
+
+def safe_name(text, limit=40):
+    return re.sub(r'[^\w.-]+', '_', text).strip('_')[:limit] or 'trigger'
+
+
+class TriggerEvent:
+    def __init__(self, rule, timestamp, port, path):
+        self.rule = rule
+        self.timestamp = timestamp  # monotônico, como os blocos recebidos
+        self.time = time.time()
+        self.port = port
+        self.path = path
+
+
+class TriggerEngine:
+    # Um por porta; chamado na mesma thread que entrega os blocos recebidos
+    def __init__(self, rules, port='', pre=5.0, post=5.0, directory='captures', max_bytes=16 * 1024 * 1024, max_length=60.0, max_line=65536):
+        self.port = port
+        self.pre = pre
+        self.post = post
+        self.directory = directory
+        self.max_bytes = max_bytes  # limite do anel de pré-disparo
+        self.max_length = max_length  # uma captura não é estendida além disso
+        self.max_line = max_line
+
+        self.byte_rules = [rule for rule in rules if rule.kind == 'bytes']
+        self.regex_rules = [rule for rule in rules if rule.kind == 'regex']
+        self.threshold_rules = [rule for rule in rules if rule.kind == 'threshold']
+        self.matcher = AhoCorasick([rule.pattern for rule in self.byte_rules]) if self.byte_rules else None
+        self.pending_line = b''
+        self.above = {}  # regra de limiar -> condição na última amostra
+        self.channels = {}  # regra de limiar -> índice do canal
+
+        self.ring = deque()  # (instante, dados) dos últimos 'pre' segundos
+        self.ring_bytes = 0
+        self.recorder = None
+        self.capture_path = None
+        self.capture_start = None
+        self.capture_end = None
+        self.events = []  # disparos ainda não lidos pela interface
+        self.fired = 0
+        self.captures = 0
+
+    @property
+    def rules(self):
+        return self.byte_rules + self.regex_rules + self.threshold_rules
+
+    def feed(self, timestamp, data):
+        data = bytes(data)
+        if self.recorder is not None:
+            self.recorder.write(timestamp, data, self.port)
+        self.remember(timestamp, data)
+        hits = []
+        if self.matcher is not None:
+            hits.extend(self.byte_rules[index] for index, _ in self.matcher.feed(data))
+        if self.regex_rules:
+            hits.extend(self.match_lines(data))
+        # Um disparo por regra por bloco
+        for rule in dict.fromkeys(hits):
+            self.fire(rule, timestamp)
+        self.tick(timestamp)
+
+    def match_lines(self, data):
+        lines = (self.pending_line + data).split(b'\n')
+        self.pending_line = lines.pop()
+        if len(self.pending_line) > self.max_line:
+            self.pending_line = b''
+        for line in lines:
+            for rule in self.regex_rules:
+                if rule.pattern.search(line):
+                    yield rule
+
+    def feed_values(self, timestamp, values, channel_name):
+        # values: bloco (amostras, canais) do ChannelParser; dispara na subida da condição
+        for rule in self.threshold_rules:
+            index = self.channel_index(rule, values.shape[1], channel_name)
+            if index is None:
+                continue
+            state = rule.compare(values[:, index], rule.value)  # NaN nunca satisfaz
+            if not len(state):
+                continue
+            rising = state[0] and not self.above.get(rule, False)
+            if rising or (state[1:] & ~state[:-1]).any():
+                self.fire(rule, timestamp)
+            self.above[rule] = bool(state[-1])
+        self.tick(timestamp)
+
+    def channel_index(self, rule, width, channel_name):
+        index = self.channels.get(rule)
+        if index is not None and index < width:
+            return index
+        wanted = rule.channel.lower()
+        for index in range(width):
+            if channel_name(index).lower() == wanted:
+                self.channels[rule] = index
+                return index
+        return None
+
+    def remember(self, timestamp, data):
+        self.ring.append((timestamp, data))
+        self.ring_bytes += len(data)
+        limit = timestamp - self.pre
+        while self.ring and (self.ring[0][0] < limit or self.ring_bytes > self.max_bytes):
+            self.ring_bytes -= len(self.ring.popleft()[1])
+
+    def fire(self, rule, timestamp):
+        self.fired += 1
+        if self.recorder is not None and timestamp - self.capture_start < self.max_length:
+            # Outro disparo durante o pós-disparo: a mesma captura continua
+            self.capture_end = max(self.capture_end, timestamp + self.post)
+        else:
+            self.close_capture()
+            self.open_capture(rule, timestamp)
+        event = TriggerEvent(rule, timestamp, self.port, self.capture_path)
+        self.events.append(event)
+        logging.info(f"Trigger '{rule.text}' on {self.port}: {self.capture_path}")
+        return event
+
+    def open_capture(self, rule, timestamp):
+        # Milissegundos e o contador: duas capturas no mesmo segundo não se sobrescrevem
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')[:-3]
+        path = os.path.join(self.directory, f"{safe_name(self.port)}-{stamp}-{self.captures + 1}-{safe_name(rule.text)}{CAPTURE_EXTENSION}")
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            self.recorder = CaptureRecorder(path)
+        except OSError as e:
+            logging.error(f"Error creating trigger capture {path}: {e}")
+            self.recorder = None
+            self.capture_path = None
+            return
+        # O anel vai até o último bloco recebido; um limiar pode disparar depois dele
+        for chunk_time, data in self.ring:
+            if chunk_time >= timestamp - self.pre:
+                self.recorder.write(chunk_time, data, self.port)
+        self.capture_path = path
+        self.capture_start = timestamp
+        self.capture_end = timestamp + self.post
+        self.captures += 1
+
+    def tick(self, now=None):
+        # Fecha a captura depois do pós-disparo, mesmo que a porta fique em silêncio
+        now = time.monotonic() if now is None else now
+        if self.recorder is not None and now >= self.capture_end:
+            self.close_capture()
+
+    def close_capture(self):
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+
+    def take_events(self):
+        events, self.events = self.events, []
+        return events
+
+    def close(self):
+        self.close_capture()
+
+
+class TriggerPanel:
+    # Edição das regras e lista dos disparos de todas as portas
+    def __init__(self, master, translate, rules, pre, post, apply):
+        # Tk só aqui: o motor também roda no cli.py, sem interface
+        import tkinter as tk
+        from tkinter import ttk
+
+        self.translate = translate
+        self.apply = apply  # apply(linhas, pré, pós) -> True se as regras foram aceitas
+
+        ttk.Label(master, text=translate('trigger_rules')).pack(padx=5, pady=(5, 0), anchor=tk.W)
+        self.text = tk.Text(master, height=6, font=("Courier", 10))
+        self.text.pack(padx=5, pady=5, fill=tk.X)
+        self.text.insert('1.0', '\n'.join(rules))
+
+        options = ttk.Frame(master)
+        options.pack(padx=5, fill=tk.X)
+        self.pre = tk.StringVar(value=str(pre))
+        self.post = tk.StringVar(value=str(post))
+        ttk.Label(options, text=translate('trigger_pre')).pack(side=tk.LEFT, padx=5)
+        ttk.Entry(options, textvariable=self.pre, width=6).pack(side=tk.LEFT, padx=5)
+        ttk.Label(options, text=translate('trigger_post')).pack(side=tk.LEFT, padx=5)
+        ttk.Entry(options, textvariable=self.post, width=6).pack(side=tk.LEFT, padx=5)
+        ttk.Button(options, text=translate('apply'), command=self.submit).pack(side=tk.LEFT, padx=5)
+
+        columns = ('port', 'rule', 'file')
+        self.tree = ttk.Treeview(master, columns=columns, height=8)
+        self.tree.heading('#0', text=translate('trigger_time'))
+        self.tree.column('#0', width=140)
+        for column, width in zip(columns, (90, 160, 300)):
+            self.tree.heading(column, text=translate(f'trigger_{column}'))
+            self.tree.column(column, width=width)
+        self.tree.pack(padx=5, pady=5, fill=tk.BOTH, expand=True)
+
+    def submit(self):
+        lines = self.text.get('1.0', 'end').splitlines()
+        self.apply([line.strip() for line in lines if line.strip()], self.pre.get(), self.post.get())
+
+    def add_event(self, event):
+        stamp = datetime.fromtimestamp(event.time).strftime('%Y-%m-%d %H:%M:%S')
+        self.tree.insert('', 0, text=stamp, values=(event.port, event.rule.text, event.path or ''))